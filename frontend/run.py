@@ -5,8 +5,7 @@ from werkzeug.utils import secure_filename
 from flask import Flask, flash, request, redirect, url_for, render_template, session
 
 from ms_package.startup import DATA_DIR
-from ms_package.reader import Reader
-from ms_package.peptide_prediction import PeptideSearch
+from ms_package.pipeline import SearchPipeline
 from ms_package.protein_prediction import ProteinSearch
 
 
@@ -27,10 +26,13 @@ def home():
         file_type = request.form['file_type']
         import_message, import_check = toggle_file_type(file_type)
         if import_check:  # Both File(s) imported
-            rel_vals = get_values(session['ms_files'])
-            hits, peptide_hits = get_peptide_hits(session['fasta_file'], session['ms_files'])
+            pipeline = SearchPipeline(session['fasta_file'], session['ms_files'], cache=True)
+            tic = get_tic(pipeline)
+            rel_vals = get_values(pipeline)
+            hits, peptide_hits = get_peptide_hits(pipeline)
             prtns = get_proteins(hits)
-            return render_template('template.html', values=rel_vals, hits=peptide_hits, protein=prtns, import_msg=import_message)
+            return render_template('template.html', tic=tic, values=rel_vals, hits=peptide_hits, protein=prtns,
+                                   import_msg=import_message)
         else:
             return render_template('template.html', import_msg=import_message)
 
@@ -116,16 +118,24 @@ def check_uploads():
     return True if n_files == 2 else False
 
 
-def get_values(file):
-    relevant_values = Reader(file)
-    values = relevant_values.analyse_spectrum()
+def get_values(pipeline):
+    values = pipeline.get_summary()
     rel_vals = values.to_html(header="true", table_id="table", index=False, justify="justify-all")
     return rel_vals
 
 
-def get_peptide_hits(fasta_file, ms_file):
-    peptides = PeptideSearch(fasta_file, ms_file)
-    hits = peptides.peptide_wrapper()[0]
+def get_tic(pipeline, width=1000, height=250):
+    tic = pipeline.get_tic()
+    if tic.empty:
+        return None
+    time, intensity = tic['retention_time'], tic['tic']
+    x = (time - time.min()) / max(time.max() - time.min(), 1e-9) * width
+    y = height - intensity / max(intensity.max(), 1e-9) * height
+    return ' '.join(f'{px:.1f},{py:.1f}' for px, py in zip(x, y))
+
+
+def get_peptide_hits(pipeline):
+    hits = pipeline.peptide_wrapper()[0]
     peptide_hits = hits.to_html(header="true", table_id="table", index=False)
     return hits, peptide_hits
 
@@ -0,0 +1,30 @@
+"""Compares files per second of the batch mode with a single worker and with one worker per core.
+
+Usage: python benchmarks/batch_benchmark.py [n_files] [n_spectra] [n_peaks]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from ms_package.batch import BatchReader
+from synthetic import write_mzml
+
+
+def main(n_files: int = 16, n_spectra: int = 1000, n_peaks: int = 500):
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(n_files):
+            write_mzml(os.path.join(directory, f'run_{number:03d}.mzML'), n_spectra=n_spectra, n_peaks=n_peaks,
+                       seed=number)
+        timings = dict()
+        for workers in sorted({1, os.cpu_count()}):
+            start = time.perf_counter()
+            BatchReader(directory, workers=workers).analyse()
+            timings[workers] = time.perf_counter() - start
+            print(f'{workers} workers: {n_files / timings[workers]:.2f} files/s, '
+                  f'speedup {timings[1] / timings[workers]:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,56 @@
+"""Compares peaks per second of the struct based and the NumPy based binary array decoding.
+
+Usage: python benchmarks/decode_benchmark.py [n_spectra] [n_peaks]
+"""
+
+import base64
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from unittest import mock
+
+from ms_package.reader import Reader
+from synthetic import write_mzml
+
+
+def struct_decode_array(encoded_data: str, compression: str, data_type: str) -> tuple:
+    """Previous decoding of a binary array into a tuple of Python floats."""
+    decoded_data = base64.standard_b64decode(encoded_data)
+    if compression == 'zlib compression':
+        decoded_data = zlib.decompress(decoded_data)
+    if data_type == '32-bit float':
+        return struct.unpack('<%sf' % (len(decoded_data) // 4), decoded_data)
+    return struct.unpack('<%sd' % (len(decoded_data) // 8), decoded_data)
+
+
+def time_decode(reader: Reader, decode_array) -> float:
+    """Times decode_decompress of an already parsed reader with the given array decoder. The decoder is patched on
+    the class, as decode_values calls cls.decode_array, and the reader decodes in-process with a single worker."""
+    with mock.patch.object(Reader, 'decode_array', staticmethod(decode_array)):
+        start = time.perf_counter()
+        reader.decode_decompress()
+        return time.perf_counter() - start
+
+
+def main(n_spectra: int = 5000, n_peaks: int = 1000):
+    with tempfile.TemporaryDirectory() as directory:
+        for compression in (False, True):
+            path = os.path.join(directory, 'synthetic.mzML')
+            write_mzml(path, n_spectra=n_spectra, n_peaks=n_peaks, compression=compression)
+            reader = Reader(path)
+            spectrum_dict = reader.get_spectrum_dict(reader.get_spectrum_list(reader.parse_file()))
+            reader.get_compression(spectrum_dict)
+            reader.get_binary_spectrum_values(spectrum_dict)
+            n_total = n_spectra * n_peaks
+            before = time_decode(reader, struct_decode_array)
+            after = time_decode(reader, Reader.decode_array)
+            print(f'{"zlib" if compression else "no"} compression, {n_spectra} spectra x {n_peaks} peaks: '
+                  f'struct {n_total / before:,.0f} peaks/s, numpy {n_total / after:,.0f} peaks/s, '
+                  f'speedup {before / after:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,47 @@
+"""Compares file size and wall time of reading the same mzML file uncompressed and gzip-compressed.
+
+The files are written to the given directory, so the benchmark measures the storage the data actually lives on.
+
+Usage: python benchmarks/gzip_benchmark.py [directory] [n_spectra] [n_peaks]
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from ms_package.reader import Reader
+from synthetic import write_mzml
+
+
+def time_read(path: str, stream: bool) -> float:
+    """Times spectrum value extraction of a file, streamed or parsed as a whole."""
+    reader = Reader(path)
+    start = time.perf_counter()
+    if stream:
+        reader.stream_spectrum()
+    else:
+        reader.analyse_spectrum()
+    return time.perf_counter() - start
+
+
+def main(directory: str = None, n_spectra: int = 5000, n_peaks: int = 1000):
+    with tempfile.TemporaryDirectory(dir=directory) as directory:
+        path = os.path.join(directory, 'synthetic.mzML')
+        write_mzml(path, n_spectra=n_spectra, n_peaks=n_peaks, compression=True)
+        with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        size, gzipped_size = os.path.getsize(path), os.path.getsize(path + '.gz')
+        print(f'{n_spectra} spectra x {n_peaks} peaks: mzML {size / 1e6:,.1f} MB, '
+              f'mzML.gz {gzipped_size / 1e6:,.1f} MB ({size / gzipped_size:.1f}x smaller)')
+        for stream in (True, False):
+            plain = time_read(path, stream)
+            compressed = time_read(path + '.gz', stream)
+            print(f'{"stream_spectrum" if stream else "analyse_spectrum"}: mzML {plain:.2f} s, '
+                  f'mzML.gz {compressed:.2f} s ({compressed / plain:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None, *(int(arg) for arg in sys.argv[2:4]))
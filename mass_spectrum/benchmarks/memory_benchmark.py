@@ -0,0 +1,59 @@
+"""Compares the memory held per million peaks by the decoded spectra of a run in the three storage layouts: tuples of
+Python floats (the original struct based decoding), one NumPy array per spectrum and array type (the default
+spectrum_data dictionary) and one contiguous buffer per array type (Reader(compact=True)).
+
+Usage: python benchmarks/memory_benchmark.py [n_spectra] [n_peaks] [precision]
+"""
+
+import os
+import sys
+import struct
+import tempfile
+import tracemalloc
+
+from ms_package.peaks import PeakBuffer
+from ms_package.reader import Reader
+from synthetic import write_mzml
+
+
+def traced(build) -> tuple:
+    """Returns the result of build and the bytes it still holds once built."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main(n_spectra: int = 2000, n_peaks: int = 500, precision: int = 32):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'synthetic.mzML')
+        write_mzml(path, n_spectra=n_spectra, n_peaks=n_peaks, precision=precision)
+        reader = Reader(path)
+        spectrum_dict = reader.get_spectrum_dict(reader.get_spectrum_list(reader.parse_file()))
+        reader.get_compression(spectrum_dict)
+        reader.get_binary_spectrum_values(spectrum_dict)
+        decoded = dict(reader.iter_decoded())
+        n_total = sum(len(data['mz']) for data in decoded.values() if data['mz'] is not None)
+        code = 'f' if precision == 32 else 'd'
+
+        def tuples():
+            return {key: {name: struct.unpack(f'<{len(array)}{code}', array.tobytes()) if array is not None else None
+                          for name, array in data.items()} for key, data in decoded.items()}
+
+        def arrays():
+            return {key: {name: array.copy() if array is not None else None for name, array in data.items()}
+                    for key, data in decoded.items()}
+
+        def compact():
+            return PeakBuffer.from_items(decoded.items())
+
+        print(f'{n_spectra} spectra, {n_total} peaks, {precision}-bit float:')
+        for name, build in (('tuples of Python floats', tuples), ('NumPy array per spectrum', arrays),
+                            ('contiguous PeakBuffer', compact)):
+            _, size = traced(build)
+            print(f'  {name}: {size / n_total * 1e6 / 1024 ** 2:,.1f} MiB per million peaks')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
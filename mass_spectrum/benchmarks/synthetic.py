@@ -0,0 +1,64 @@
+"""Writes synthetic mzML files for the benchmarks."""
+
+import base64
+import zlib
+
+import numpy as np
+
+
+def write_mzml(path: str, n_spectra: int = 5000, n_peaks: int = 1000, compression: bool = True,
+               precision: int = 32, seed: int = 0):
+    """Writes an mzML file of random centroided spectra in the layout of the test data, including the base peak,
+    total ion current and observed m/z range userParams.
+
+    Parameters
+    ----------
+    path: str
+        output file path
+    n_spectra: int
+        number of spectra to write
+    n_peaks: int
+        number of peaks per spectrum
+    compression: bool
+        when True, binary arrays are zlib compressed
+    precision: int
+        32 or 64 bit floats
+    seed: int
+        seed of the random generator
+    """
+    rng = np.random.default_rng(seed)
+    dtype = '<f4' if precision == 32 else '<f8'
+    data_type = '32-bit float' if precision == 32 else '64-bit float'
+    compression_name = 'zlib compression' if compression else 'no compression'
+
+    def encode(values):
+        raw = np.asarray(values, dtype=dtype).tobytes()
+        if compression:
+            raw = zlib.compress(raw)
+        return base64.standard_b64encode(raw).decode()
+
+    with open(path, 'w') as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                   '<mzML xmlns="http://psi.hupo.org/ms/mzml" version="1.1.0">\n<run id="synthetic">\n'
+                   f'<spectrumList count="{n_spectra}">\n')
+        for index in range(n_spectra):
+            mz = np.sort(rng.uniform(300, 2000, n_peaks))
+            intensity = rng.uniform(10, 1e6, n_peaks)
+            base_peak = int(np.argmax(intensity))
+            file.write(f'<spectrum index="{index}" id="scan={index + 1}" defaultArrayLength="{n_peaks}">\n'
+                       '<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="1"/>\n')
+            for name, value in (('base peak m/z', mz[base_peak]), ('base peak intensity', intensity[base_peak]),
+                                ('total ion current', intensity.sum()), ('lowest observed m/z', mz[0]),
+                                ('highest observed m/z', mz[-1])):
+                file.write(f'<userParam name="{name}" value="{float(value)}" type="xsd:double"/>\n')
+            file.write('<scanList count="1"><scan><cvParam cvRef="MS" accession="MS:1000016" name="scan start time" '
+                       f'value="{index * 0.5}" unitName="second"/></scan></scanList>\n'
+                       '<binaryDataArrayList count="2">\n')
+            for values, array_name in ((mz, 'm/z array'), (intensity, 'intensity array')):
+                file.write('<binaryDataArray>\n'
+                           f'<cvParam cvRef="MS" name="{data_type}" value=""/>\n'
+                           f'<cvParam cvRef="MS" name="{compression_name}" value=""/>\n'
+                           f'<cvParam cvRef="MS" name="{array_name}" value=""/>\n'
+                           f'<binary>{encode(values)}</binary>\n</binaryDataArray>\n')
+            file.write('</binaryDataArrayList>\n</spectrum>\n')
+        file.write('</spectrumList>\n</run>\n</mzML>\n')
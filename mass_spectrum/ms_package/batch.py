@@ -0,0 +1,196 @@
+import os
+import glob
+import logging
+import argparse
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from ms_package.reader import Reader
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MS_EXTENSIONS = ('.mzML', '.mzXML', '.mzML.gz', '.mzXML.gz')
+
+
+class BatchReader:
+    """Extracts the spectrum values of many mzML/mzXML files, one file per worker process."""
+
+    def __init__(self, path: str, workers: int = 1, stream: bool = False, cache: bool = False, decode: bool = True):
+        """
+        parameters:
+            path = directory of input files or glob pattern, e.g. 'runs/*.mzML'
+            workers = number of files processed at the same time, each in its own process
+            stream = when True, files are read with Reader.stream_spectrum
+            cache = when True, decoded spectra are reused from and stored in the spectrum cache
+            decode = when False, binary arrays are only decoded for spectra without declared values
+        """
+        self.path = path
+        self.workers = workers
+        self.stream = stream
+        self.cache = cache
+        self.decode = decode
+        self.paths = None  # input files, set in get_paths
+        self.summaries = None  # dataframe of the spectrum values of each successfully processed file
+        self.failed = None  # error message of each file that could not be processed
+
+    def get_paths(self) -> List[str]:
+        """Collects the mzML/mzXML files of the input directory or glob pattern, gzip-compressed ones included.
+
+        Returns
+        -------
+        paths: List[str]
+            sorted paths of the input files
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if no mzML or mzXML file is found
+        """
+        if os.path.isdir(self.path):
+            candidates = [os.path.join(self.path, name) for name in os.listdir(self.path)]
+        else:
+            candidates = glob.glob(self.path)
+        paths = sorted(path for path in candidates if os.path.isfile(path) and path.endswith(MS_EXTENSIONS))
+        if not paths:
+            logger.warning(f'No mzML or mzXML files found for: {self.path}')
+            raise argparse.ArgumentTypeError('Please pass a directory or glob pattern matching .mzML or .mzXML files.')
+        self.paths = paths
+        return paths
+
+    @staticmethod
+    def analyse_file(path: str, stream: bool, cache: bool, decode: bool) -> pd.DataFrame:
+        """Extracts the spectrum values of a single file, run inside a worker process.
+
+        Parameters
+        ----------
+        path: str
+            path of the input file
+        stream: bool
+            when True, the file is read with Reader.stream_spectrum
+        cache: bool
+            when True, the spectrum cache is used
+        decode: bool
+            when False, binary arrays are only decoded for spectra without declared values
+
+        Returns
+        -------
+        summary: pd.DataFrame
+            dataframe of the spectrum values of the file
+        """
+        reader = Reader(path, cache=cache)
+        if stream:
+            return reader.stream_spectrum()
+        return reader.analyse_spectrum(decode=decode)
+
+    def iter_results(self) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+        """Processes the input files in a bounded pool of worker processes and yields every file as soon as it is
+        done, so callers can report progress. Files that fail are logged and yielded with None.
+
+        Yields
+        -------
+        result: Tuple[str, Optional[pd.DataFrame]]
+            path of the input file and dataframe of its spectrum values, None if the file could not be processed
+        """
+        paths = self.paths if self.paths is not None else self.get_paths()
+        self.summaries = dict()
+        self.failed = dict()
+        if self.workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(paths))) as executor:
+                futures = {executor.submit(self.analyse_file, path, self.stream, self.cache, self.decode): path
+                           for path in paths}
+                for future in as_completed(futures):
+                    try:
+                        summary, error = future.result(), None
+                    except Exception as exception:
+                        summary, error = None, exception
+                    yield self.collect(futures[future], summary, error)
+        else:
+            for path in paths:
+                try:
+                    summary, error = self.analyse_file(path, self.stream, self.cache, self.decode), None
+                except Exception as exception:
+                    summary, error = None, exception
+                yield self.collect(path, summary, error)
+
+    def collect(self, path: str, summary: Optional[pd.DataFrame],
+                error: Optional[Exception]) -> Tuple[str, Optional[pd.DataFrame]]:
+        """Stores the outcome of one input file and logs progress.
+
+        Parameters
+        ----------
+        path: str
+            path of the input file
+        summary: Optional[pd.DataFrame]
+            dataframe of the spectrum values, None if the file could not be processed
+        error: Optional[Exception]
+            exception raised while processing the file, None on success
+
+        Returns
+        -------
+        result: Tuple[str, Optional[pd.DataFrame]]
+            path of the input file and dataframe of its spectrum values, None if the file could not be processed
+        """
+        done = len(self.summaries) + len(self.failed) + 1
+        if error is not None:
+            self.failed[path] = str(error)
+            logger.warning(f'[{done}/{len(self.paths)}] Failed to process {path}: {error}')
+            return path, None
+        self.summaries[path] = summary
+        logger.info(f'[{done}/{len(self.paths)}] Processed {path}')
+        return path, summary
+
+    def analyse(self) -> pd.DataFrame:
+        """Processes all input files and combines their spectrum values into one dataframe.
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            spectrum values of all files in path order, with the file name in the first column
+        """
+        for _ in self.iter_results():
+            pass
+        return self.combine()
+
+    def combine(self) -> pd.DataFrame:
+        """Combines the spectrum values of the processed files into one dataframe with a 'file' column.
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            spectrum values of all files in path order, with the file name in the first column
+        """
+        frames = [summary.assign(file=os.path.basename(path)).reset_index(drop=True)
+                  for path, summary in sorted(self.summaries.items())]
+        if not frames:
+            return pd.DataFrame(columns=['file'])
+        combined = pd.concat(frames, ignore_index=True)
+        return combined[['file'] + [column for column in combined.columns if column != 'file']]
+
+    def write(self, output: str, split: bool = False) -> List[str]:
+        """Writes the spectrum values of the processed files as CSV, either one combined table or one table per input
+        file named after it.
+
+        Parameters
+        ----------
+        output: str
+            path of the combined CSV file, or output directory when split is True
+        split: bool
+            when True, one CSV file per input file is written into the output directory
+
+        Returns
+        -------
+        written: List[str]
+            paths of the written files
+        """
+        if not split:
+            self.combine().to_csv(output, index=False)
+            return [output]
+        os.makedirs(output, exist_ok=True)
+        written = list()
+        for path, summary in sorted(self.summaries.items()):
+            target = os.path.join(output, os.path.basename(path) + '.csv')
+            summary.to_csv(target, index=False)
+            written.append(target)
+        return written
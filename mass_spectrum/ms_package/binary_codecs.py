@@ -0,0 +1,209 @@
+import zlib
+import logging
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# PSI-MS accession: (name, little-endian dtype) of the binary data array types
+DATA_TYPES = {'MS:1000521': ('32-bit float', np.dtype('<f4')),
+              'MS:1000523': ('64-bit float', np.dtype('<f8')),
+              'MS:1000519': ('32-bit integer', np.dtype('<i4')),
+              'MS:1000522': ('64-bit integer', np.dtype('<i8'))}
+
+# PSI-MS accession: (name, decoding steps in the order they are applied)
+COMPRESSIONS = {'MS:1000576': ('no compression', ()),
+                'MS:1000574': ('zlib compression', ('zlib',)),
+                'MS:1002312': ('MS-Numpress linear prediction compression', ('linear',)),
+                'MS:1002313': ('MS-Numpress positive integer compression', ('pic',)),
+                'MS:1002314': ('MS-Numpress short logged float compression', ('slof',)),
+                'MS:1002746': ('MS-Numpress linear prediction compression followed by zlib compression',
+                               ('zlib', 'linear')),
+                'MS:1002747': ('MS-Numpress positive integer compression followed by zlib compression',
+                               ('zlib', 'pic')),
+                'MS:1002748': ('MS-Numpress short logged float compression followed by zlib compression',
+                               ('zlib', 'slof'))}
+
+# PSI-MS accession: key of the array in the spectrum data
+ARRAY_TYPES = {'MS:1000514': 'mz', 'MS:1000515': 'intensity', 'MS:1000595': 'time', 'MS:1000516': 'charge',
+               'MS:1000517': 'signal_to_noise', 'MS:1000617': 'wavelength', 'MS:1000786': 'non_standard',
+               'MS:1000820': 'flow_rate', 'MS:1000821': 'pressure', 'MS:1000822': 'temperature'}
+ARRAY_NAMES = {'m/z array': 'mz', 'intensity array': 'intensity', 'time array': 'time', 'charge array': 'charge',
+               'signal to noise array': 'signal_to_noise', 'wavelength array': 'wavelength',
+               'non-standard data array': 'non_standard', 'flow rate array': 'flow_rate',
+               'pressure array': 'pressure', 'temperature array': 'temperature'}
+
+# cvParam names resolve to the same entries as their accessions, for files written without accessions
+DATA_TYPE_NAMES = {name: accession for accession, (name, _) in DATA_TYPES.items()}
+COMPRESSION_NAMES = {name: accession for accession, (name, _) in COMPRESSIONS.items()}
+
+
+def classify_param(accession: str, name: str) -> Tuple[str, str]:
+    """Classifies a binaryDataArray cvParam by its accession, or by its name if the accession is unknown.
+
+    Parameters
+    ----------
+    accession: str
+        accession attribute of the cvParam
+    name: str
+        name attribute of the cvParam
+
+    Returns
+    -------
+    param: Tuple[str, str]
+        kind of the param ('data_type', 'compression', 'array' or None) and its canonical value
+    """
+    if accession in DATA_TYPES or name in DATA_TYPE_NAMES:
+        return 'data_type', DATA_TYPES[accession if accession in DATA_TYPES else DATA_TYPE_NAMES[name]][0]
+    if accession in COMPRESSIONS or name in COMPRESSION_NAMES:
+        return 'compression', COMPRESSIONS[accession if accession in COMPRESSIONS else COMPRESSION_NAMES[name]][0]
+    if accession in ARRAY_TYPES:
+        return 'array', ARRAY_TYPES[accession]
+    if name in ARRAY_NAMES:
+        return 'array', ARRAY_NAMES[name]
+    return None, None
+
+
+def decode_fixed_point(data: bytes) -> float:
+    """Reads the big-endian fixed point that starts numpress linear and slof data."""
+    return float(np.frombuffer(data[:8], dtype='>f8')[0])
+
+
+def decode_half_bytes(data: bytes) -> np.ndarray:
+    """Decodes the numpress variable length integers stored as half bytes.
+
+    Every integer starts with a head half byte. Heads up to 8 give the number of leading zero half bytes, heads above
+    8 the number of leading 0xf half bytes minus 8, and the remaining half bytes follow, least significant first. The
+    integer boundaries are found in one pass over the head lengths, the values are then assembled with NumPy.
+
+    Parameters
+    ----------
+    data: bytes
+        half byte encoded integers
+
+    Returns
+    -------
+    values: np.ndarray
+        decoded values as int64, interpreted as signed 32-bit integers
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    half_bytes = np.empty(2 * len(raw), dtype=np.int64)
+    half_bytes[0::2] = raw >> 4
+    half_bytes[1::2] = raw & 0xf
+    leading = np.where(half_bytes <= 8, half_bytes, half_bytes - 8)
+    lengths = (9 - leading).tolist()  # head plus the stored half bytes
+    end = len(half_bytes)
+    if end and half_bytes[-1] == 0:
+        end -= 1  # a zero low half byte at the end is padding
+    starts = list()
+    position = 0
+    while position < end:
+        starts.append(position)
+        position += lengths[position]
+    if position > len(half_bytes):
+        logger.warning('Corrupt numpress data, last integer is truncated.')
+        raise ValueError('Corrupt numpress data, last integer is truncated.')
+    starts = np.array(starts, dtype=np.int64)
+    heads = half_bytes[starts]
+    n = leading[starts]
+    padded = np.concatenate([half_bytes, np.zeros(8, dtype=np.int64)])
+    stored = padded[starts[:, None] + 1 + np.arange(8)]
+    stored[np.arange(8) >= (8 - n)[:, None]] = 0
+    values = (stored << (4 * np.arange(8))).sum(axis=1)
+    ones = heads > 8
+    values[ones] |= (0xffffffff << (4 * (8 - n[ones]))) & 0xffffffff
+    return values.astype(np.uint32).view(np.int32).astype(np.int64)
+
+
+def decode_linear(data: bytes) -> np.ndarray:
+    """Decodes MS-Numpress linear prediction compressed data. The second order prediction is undone with two cumulative
+    sums over the residuals."""
+    if len(data) <= 8:
+        return np.zeros(0)
+    fixed_point = decode_fixed_point(data)
+    first = np.frombuffer(data[8:16], dtype='<u4').astype(np.int64)
+    if len(first) < 2:
+        return first / fixed_point
+    residuals = decode_half_bytes(data[16:])
+    steps = (first[1] - first[0]) + np.cumsum(residuals)
+    values = np.concatenate([first, first[1] + np.cumsum(steps)])
+    return values / fixed_point
+
+
+def decode_pic(data: bytes) -> np.ndarray:
+    """Decodes MS-Numpress positive integer compressed data."""
+    return decode_half_bytes(data).astype(np.uint32).astype(np.float64)
+
+
+def decode_slof(data: bytes) -> np.ndarray:
+    """Decodes MS-Numpress short logged float compressed data."""
+    if len(data) <= 8:
+        return np.zeros(0)
+    fixed_point = decode_fixed_point(data)
+    return np.exp(np.frombuffer(data[8:], dtype='<u2') / fixed_point) - 1
+
+
+def decode_zlib(data: bytes) -> bytes:
+    """Decompresses zlib compressed data."""
+    return zlib.decompress(data)
+
+
+DECODERS: Dict[str, Callable] = {'zlib': decode_zlib, 'linear': decode_linear, 'pic': decode_pic,
+                                 'slof': decode_slof}
+
+
+def decode(data: bytes, compression: str, dtype: np.dtype) -> np.ndarray:
+    """Decompresses a base64 decoded binary array with the decoding steps registered for its compression.
+
+    Parameters
+    ----------
+    data: bytes
+        base64 decoded content of a binary element
+    compression: str
+        compression accession or name, no compression if None
+    dtype: np.dtype
+        dtype of the uncompressed values, numpress compressed values are always float64
+
+    Returns
+    -------
+    values: np.ndarray
+        decoded values
+    """
+    accession = compression if compression in COMPRESSIONS else COMPRESSION_NAMES.get(compression, 'MS:1000576')
+    for step in COMPRESSIONS[accession][1]:
+        data = DECODERS[step](data)
+    if isinstance(data, np.ndarray):
+        return data
+    return np.frombuffer(data, dtype=dtype)
+
+
+def get_dtype(data_type: str) -> np.dtype:
+    """Returns the little-endian dtype of a data type accession or name."""
+    return DATA_TYPES[data_type if data_type in DATA_TYPES else DATA_TYPE_NAMES[data_type]][1]
+
+
+def combine_compressions(compressions: list) -> str:
+    """Combines the compression cvParams of a binary data array into one compression name. Some writers list a
+    numpress compression and 'zlib compression' as two cvParams instead of the combined term.
+
+    Parameters
+    ----------
+    compressions: list
+        canonical names of the compression cvParams of the array
+
+    Returns
+    -------
+    compression: str
+        canonical name of the combined compression
+    """
+    compressions = [name for name in compressions if name != 'no compression']
+    if not compressions:
+        return 'no compression'
+    if len(compressions) == 2 and 'zlib compression' in compressions:
+        numpress = [name for name in compressions if name != 'zlib compression'][0]
+        combined = f'{numpress} followed by zlib compression'
+        if combined in COMPRESSION_NAMES:
+            return combined
+    return compressions[0]
@@ -0,0 +1,133 @@
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+NORMALIZATIONS = (None, 'max', 'sum', 'l2')
+
+
+def bin_peaks(mz: np.ndarray, intensity: np.ndarray, offsets: np.ndarray, bin_width: float = 1.0,
+              mz_range: Optional[Tuple[float, float]] = None, normalize: Optional[str] = None) -> sparse.csr_matrix:
+    """Bins the peaks of a concatenated peak buffer into a CSR sparse matrix of spectra x m/z bins. The intensities
+    of peaks falling into the same bin are summed. Only occupied bins are stored, so memory grows with the number of
+    peaks and not with the number of bins.
+
+    Parameters
+    ----------
+    mz: np.ndarray
+        concatenated m/z values
+    intensity: np.ndarray
+        concatenated intensity values
+    offsets: np.ndarray
+        start of every spectrum in the buffer followed by the total number of peaks
+    bin_width: float
+        width of the m/z bins
+    mz_range: Optional[Tuple[float, float]]
+        lowest and highest binned m/z, peaks outside are dropped, the m/z range of all peaks if None
+    normalize: Optional[str]
+        None, or 'max', 'sum' or 'l2' to scale every spectrum to a base peak, total or euclidean norm of 1
+
+    Returns
+    -------
+    matrix: scipy.sparse.csr_matrix
+        float32 matrix with one row per spectrum and one column per bin starting at mz_range[0]
+    """
+    if normalize not in NORMALIZATIONS:
+        raise ValueError(f'normalize must be one of {NORMALIZATIONS}, got {normalize!r}')
+    n = len(offsets) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    if mz_range is None:
+        mz_range = (float(mz.min()), float(mz.max())) if len(mz) else (0.0, 0.0)
+    n_bins = int(np.floor((mz_range[1] - mz_range[0]) / bin_width)) + 1
+    bins = np.floor((mz - mz_range[0]) / bin_width).astype(np.int64)
+    inside = (bins >= 0) & (bins < n_bins)
+    rows, bins, values = rows[inside], bins[inside], np.asarray(intensity, dtype=np.float64)[inside]
+
+    cells = rows * n_bins + bins
+    if len(cells) and (np.diff(cells) < 0).any():  # peaks are only unsorted if a spectrum is not sorted by m/z
+        order = np.argsort(cells, kind='stable')
+        cells, values = cells[order], values[order]
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) if len(cells) else np.zeros(0, dtype=np.int64)
+    data = np.add.reduceat(values, starts) if len(cells) else np.zeros(0)
+    cells = cells[starts]
+    row_of_cell = cells // n_bins
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_of_cell, minlength=n), out=indptr[1:])
+
+    if normalize is not None and len(data):
+        filled = np.flatnonzero(np.diff(indptr) > 0)
+        if normalize == 'max':
+            norms = np.maximum.reduceat(data, indptr[filled])
+        elif normalize == 'sum':
+            norms = np.add.reduceat(data, indptr[filled])
+        else:
+            norms = np.sqrt(np.add.reduceat(data ** 2, indptr[filled]))
+        norms[norms == 0] = 1.0
+        data = data / np.repeat(norms, np.diff(indptr)[filled])
+    return sparse.csr_matrix((data.astype(np.float32), (cells % n_bins).astype(np.int32), indptr), shape=(n, n_bins))
+
+
+class SpectrumMatrix:
+    """Binned spectra of a run as CSR sparse matrix, together with the spectrum ids of the rows and the m/z bins of
+    the columns."""
+
+    def __init__(self, matrix: sparse.csr_matrix, keys: List[int], bin_width: float, mz_start: float):
+        """
+        parameters:
+            matrix = spectra x bins CSR matrix of the binned intensities
+            keys = spectrum id of every row
+            bin_width = width of the m/z bins
+            mz_start = lower edge of the first bin
+        """
+        self.matrix = matrix
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.bin_width = bin_width
+        self.mz_start = mz_start
+
+    def __repr__(self) -> str:
+        return (f'SpectrumMatrix({self.matrix.shape[0]} spectra x {self.matrix.shape[1]} bins, '
+                f'{self.matrix.nnz} stored values)')
+
+    @property
+    def bin_mz(self) -> np.ndarray:
+        """Lower m/z edge of every bin."""
+        return self.mz_start + self.bin_width * np.arange(self.matrix.shape[1])
+
+    def save(self, path: str, compressed: bool = True):
+        """Saves the matrix with its spectrum ids and bins in a single .npz file.
+
+        Parameters
+        ----------
+        path: str
+            path of the .npz file
+        compressed: bool
+            when True, the arrays are zip compressed
+        """
+        save = np.savez_compressed if compressed else np.savez
+        save(path, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+             shape=np.array(self.matrix.shape), keys=self.keys, bins=np.array([self.bin_width, self.mz_start]))
+        logger.info(f'Saved {self} to {path}')
+
+    @classmethod
+    def load(cls, path: str) -> 'SpectrumMatrix':
+        """Loads a matrix saved with save.
+
+        Parameters
+        ----------
+        path: str
+            path of the .npz file
+
+        Returns
+        -------
+        matrix: SpectrumMatrix
+            the saved binned spectra
+        """
+        with np.load(path) as arrays:
+            matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                       shape=tuple(arrays['shape']))
+            bin_width, mz_start = arrays['bins'].tolist()
+            return cls(matrix, arrays['keys'], bin_width, mz_start)
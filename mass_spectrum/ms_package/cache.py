@@ -0,0 +1,286 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from ms_package.startup import DATA_DIR
+from ms_package.peaks import PeakBuffer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class DiskCache:
+    """Size-bounded on-disk cache with one directory per entry, keyed by the content hash of input files. The total
+    size of the cache is bounded by max_size, least recently used entries are evicted first.
+    """
+
+    default_dir = 'cache'  # directory under DATA_DIR used if no cache_dir is given
+
+    def __init__(self, cache_dir: str = None, max_size: int = 2 * 1024 ** 3):
+        """
+        parameters:
+            cache_dir = directory of the cache, defaults to DATA_DIR/<default_dir>
+            max_size = maximum size of the cache in bytes
+        """
+        self.cache_dir = str(cache_dir) if cache_dir is not None else os.path.join(DATA_DIR, self.default_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def hashes_path(self) -> str:
+        """Path of the file that remembers the content hash of already hashed input files."""
+        return os.path.join(self.cache_dir, 'hashes.json')
+
+    def file_key(self, path: str) -> str:
+        """Returns the cache key of a file, made of the SHA-1 hash and the size of its content. The hash is
+        remembered per path, size and modification time so unchanged files are not read again.
+
+        Parameters
+        ----------
+        path: str
+            path of the input file
+
+        Returns
+        -------
+        key: str
+            cache key of the file
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        try:
+            with open(self.hashes_path) as file:
+                hashes = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            hashes = dict()
+        known = hashes.get(path)
+        if known is not None and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+            return known['key']
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha1.update(chunk)
+        key = f'{sha1.hexdigest()}-{stat.st_size}'
+        hashes[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'key': key}
+        # written to a temporary file first so concurrent readers never see a partially written file
+        descriptor, temporary = tempfile.mkstemp(dir=self.cache_dir, prefix='hashes.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(hashes, file)
+            os.replace(temporary, self.hashes_path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return key
+
+    def temporary_dir(self) -> str:
+        """Creates a uniquely named directory in the cache to write a new entry to, so concurrent stores of the same
+        key do not interfere. Names ending in .tmp are not listed as entries."""
+        return tempfile.mkdtemp(dir=self.cache_dir, suffix='.tmp')
+
+    def publish(self, temporary: str, directory: str):
+        """Moves a completely written entry from its temporary directory into place. Keys are derived from the
+        content, so if another process published the same key in the meantime its entry is kept and the temporary
+        directory is removed."""
+        try:
+            os.replace(temporary, directory)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+
+    def entry_dir(self, key: str) -> str:
+        """Returns the directory of a cache entry."""
+        return os.path.join(self.cache_dir, key)
+
+    def size(self) -> int:
+        """Returns the total size of all cache entries in bytes."""
+        return sum(size for _, _, size in self.entries())
+
+    def entries(self) -> list:
+        """Returns the key, last use time and size of every cache entry."""
+        entries = list()
+        for name in os.listdir(self.cache_dir):
+            directory = self.entry_dir(name)
+            if not os.path.isdir(directory) or name.endswith('.tmp'):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(directory))
+            entries.append((name, os.stat(directory).st_mtime, size))
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is smaller than max_size."""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for name, _, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(self.entry_dir(name), ignore_errors=True)
+            total -= size
+            logger.info(f'Evicted {name} from {self.cache_dir}')
+
+
+class SpectrumCache(DiskCache):
+    """Stores decoded spectra and spectrum values of parsed files in a columnar on-disk cache.
+
+    Every cached file gets its own directory named after the hash and size of the file content. The peaks of all
+    spectra are concatenated into one m/z and one intensity .npy file plus an offsets array, so a cached run is
+    loaded with memory-mapped np.load calls instead of parsing and decoding the file again.
+    """
+
+    default_dir = 'spectra'
+
+    def store(self, key: str, file_format: str, spectrum_data: Mapping, summary: pd.DataFrame):
+        """Writes the decoded spectra and spectrum values of a file to the cache and evicts old entries if the cache
+        grows over max_size.
+
+        Parameters
+        ----------
+        key: str
+            cache key of the file
+        file_format: str
+            'mzml' or 'mzxml'
+        spectrum_data: Mapping
+            decoded m/z and intensity values as in Reader.spectrum_data, a dictionary or PeakBuffer
+        summary: pd.DataFrame
+            spectrum values as in Reader.summary
+        """
+        if not isinstance(spectrum_data, PeakBuffer):
+            spectrum_data = PeakBuffer.from_items(spectrum_data.items())
+        ids, has_data, offsets = spectrum_data.keys_array, spectrum_data.has_data, spectrum_data.offsets
+        mz, intensity = spectrum_data.mz, spectrum_data.intensity
+        summary_ids = summary.index.to_numpy(dtype=np.int64)
+        columns = list(summary.columns)
+        summary_values = summary.to_numpy(dtype=np.float64)
+
+        directory = self.entry_dir(key)
+        temporary = self.temporary_dir()
+        for name, array in (('ids', ids), ('has_data', has_data), ('offsets', offsets), ('mz', mz),
+                            ('intensity', intensity), ('summary_ids', summary_ids), ('summary', summary_values)):
+            np.save(os.path.join(temporary, f'{name}.npy'), array)
+        with open(os.path.join(temporary, 'meta.json'), 'w') as file:
+            json.dump({'format': file_format, 'columns': columns}, file)
+        self.publish(temporary, directory)
+        logger.info(f'Cached {len(ids)} spectra under {directory}')
+        self.evict()
+
+    def load(self, key: str) -> Optional[Tuple[str, PeakBuffer, pd.DataFrame]]:
+        """Loads a cache entry. The peak arrays are memory-mapped, every spectrum is a view into them.
+
+        Parameters
+        ----------
+        key: str
+            cache key of the file
+
+        Returns
+        -------
+        entry: Optional[Tuple[str, PeakBuffer, pd.DataFrame]]
+            file format, memory-mapped spectrum data and dataframe of the spectrum values, None if the file is not cached
+        """
+        directory = self.entry_dir(key)
+        if not os.path.isdir(directory):
+            return None
+        with open(os.path.join(directory, 'meta.json')) as file:
+            meta = json.load(file)
+        file_format, columns = meta['format'], meta['columns']
+        spectrum_data = PeakBuffer(*(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                                     for name in ('ids', 'has_data', 'offsets', 'mz', 'intensity')))
+        summary = pd.DataFrame(np.load(os.path.join(directory, 'summary.npy')), columns=columns,
+                               index=pd.Index(np.load(os.path.join(directory, 'summary_ids.npy'))))
+        summary[columns[0]] = summary[columns[0]].astype(np.int64)
+        os.utime(directory)  # marks the entry as recently used
+        return file_format, spectrum_data, summary
+
+
+class SearchCache(DiskCache):
+    """Stores peptide search results on disk, keyed by the content hashes of the FASTA and mzML file and the search
+    parameters, so repeated searches of the same input are loaded instead of run again. Every entry is a single
+    compressed .npz file of the hit table columns and the hit sequences.
+    """
+
+    default_dir = 'searches'
+
+    def __init__(self, cache_dir: str = None, max_size: int = 256 * 1024 ** 2):
+        """
+        parameters:
+            cache_dir = directory of the cache, defaults to DATA_DIR/searches
+            max_size = maximum size of the cache in bytes
+        """
+        super().__init__(cache_dir, max_size)
+
+    def search_key(self, fasta_path: str, mzml_path: str, parameters: Dict) -> str:
+        """Returns the cache key of a search, the SHA-1 hash of both input file keys and the search parameters.
+
+        Parameters
+        ----------
+        fasta_path: str
+            path of the FASTA file
+        mzml_path: str
+            path of the mzML file
+        parameters: Dict
+            JSON serializable search parameters
+
+        Returns
+        -------
+        key: str
+            cache key of the search
+        """
+        content = json.dumps({'fasta': self.file_key(fasta_path), 'mzml': self.file_key(mzml_path),
+                              'parameters': parameters}, sort_keys=True, default=str)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def store(self, key: str, peptide_df: pd.DataFrame, peptide_list: List[str]):
+        """Writes the results of a search to the cache and evicts old entries if the cache grows over max_size.
+
+        Parameters
+        ----------
+        key: str
+            cache key of the search
+        peptide_df: pd.DataFrame
+            peptide hit table as returned by PeptideSearch.peptide_wrapper
+        peptide_list: List[str]
+            peptide hit sequences as returned by PeptideSearch.peptide_wrapper
+        """
+        directory = self.entry_dir(key)
+        temporary = self.temporary_dir()
+        columns = {f'column{position}': peptide_df[column].to_numpy() if is_numeric_dtype(peptide_df[column])
+                   else peptide_df[column].to_numpy(dtype=str) for position, column in enumerate(peptide_df.columns)}
+        np.savez_compressed(os.path.join(temporary, 'hits.npz'), names=np.array(peptide_df.columns, dtype=str),
+                            sequences=np.array(peptide_list, dtype=str), **columns)
+        self.publish(temporary, directory)
+        logger.info(f'Cached {len(peptide_df)} peptide hits under {directory}')
+        self.evict()
+
+    def load(self, key: str) -> Optional[Tuple[pd.DataFrame, List[str]]]:
+        """Loads the results of a cached search.
+
+        Parameters
+        ----------
+        key: str
+            cache key of the search
+
+        Returns
+        -------
+        entry: Optional[Tuple[pd.DataFrame, List[str]]]
+            peptide hit table and hit sequences, None if the search is not cached
+        """
+        directory = self.entry_dir(key)
+        if not os.path.isdir(directory):
+            return None
+        with np.load(os.path.join(directory, 'hits.npz')) as arrays:
+            names = arrays['names'].tolist()
+            # text columns are passed as lists to get the string dtype pandas infers for the search results
+            columns = [arrays[f'column{position}'] for position in range(len(names))]
+            peptide_df = pd.DataFrame({name: column.tolist() if column.dtype.kind == 'U' else column
+                                       for name, column in zip(names, columns)}, columns=names)
+            peptide_list = arrays['sequences'].tolist()
+        os.utime(directory)  # marks the entry as recently used
+        return peptide_df, peptide_list
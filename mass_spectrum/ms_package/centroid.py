@@ -0,0 +1,73 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# spectrum representation cvParams of mzML spectra
+PROFILE_SPECTRUM = 'MS:1000128'
+CENTROID_SPECTRUM = 'MS:1000127'
+
+
+def centroid_peaks(mz: np.ndarray, intensity: np.ndarray, offsets: np.ndarray,
+                   min_intensity: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Centroids the profile spectra of a concatenated peak buffer in bulk. Every local intensity maximum of a
+    spectrum becomes one peak, its m/z and intensity are the vertex of the parabola through the maximum and its two
+    neighbours, which handles the uneven m/z spacing of profile data.
+
+    Parameters
+    ----------
+    mz: np.ndarray
+        concatenated m/z values, sorted within every spectrum
+    intensity: np.ndarray
+        concatenated intensity values
+    offsets: np.ndarray
+        start of every spectrum in the buffer followed by the total number of points
+    min_intensity: float
+        local maxima below this intensity are dropped as noise
+
+    Returns
+    -------
+    centroids: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        concatenated centroid m/z and intensity values and the offsets of the centroided spectra
+    """
+    mz = np.asarray(mz, dtype=np.float64)
+    intensity = np.asarray(intensity, dtype=np.float64)
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    filled = lengths > 0
+    first, last = offsets[:-1][filled], offsets[1:][filled] - 1
+    # neighbours outside of the spectrum count as zero intensity
+    left = np.empty_like(intensity)
+    left[1:] = intensity[:-1]
+    left[first] = 0.0
+    right = np.empty_like(intensity)
+    right[:-1] = intensity[1:]
+    right[last] = 0.0
+    apex = np.flatnonzero((intensity > left) & (intensity >= right) & (intensity > min_intensity))
+
+    centroid_mz = mz[apex].copy()
+    centroid_intensity = intensity[apex].copy()
+    inner = np.ones(len(apex), dtype=bool)
+    inner[np.isin(apex, first) | np.isin(apex, last)] = False  # maxima on the spectrum edge keep the raw point
+    center = apex[inner]
+    x0, x1, x2 = mz[center - 1], mz[center], mz[center + 1]
+    y0, y1, y2 = intensity[center - 1], intensity[center], intensity[center + 1]
+    numerator = (x1 - x0) ** 2 * (y1 - y2) - (x1 - x2) ** 2 * (y1 - y0)
+    denominator = (x1 - x0) * (y1 - y2) - (x1 - x2) * (y1 - y0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vertex = x1 - 0.5 * numerator / denominator
+        # Lagrange form of the parabola evaluated at its vertex
+        height = (y0 * (vertex - x1) * (vertex - x2) / ((x0 - x1) * (x0 - x2))
+                  + y1 * (vertex - x0) * (vertex - x2) / ((x1 - x0) * (x1 - x2))
+                  + y2 * (vertex - x0) * (vertex - x1) / ((x2 - x0) * (x2 - x1)))
+    valid = np.isfinite(vertex) & (vertex >= x0) & (vertex <= x2) & np.isfinite(height)
+    centroid_mz[np.flatnonzero(inner)[valid]] = vertex[valid]
+    centroid_intensity[np.flatnonzero(inner)[valid]] = np.maximum(height[valid], y1[valid])
+
+    counts = np.bincount(np.searchsorted(offsets, apex, side='right') - 1, minlength=n)
+    centroid_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=centroid_offsets[1:])
+    return centroid_mz, centroid_intensity, centroid_offsets
@@ -1,7 +1,13 @@
+import os
 import click
 import ms_package.startup
 from ms_package.reader import Reader
+from ms_package.batch import BatchReader
+from ms_package.export import write_table
 from ms_package.peptide_prediction import PeptideSearch
+from ms_package.pipeline import SearchPipeline
+from ms_package.peptide_db import PeptideDatabase
+from ms_package.library_search import LibrarySearch
 from ms_package.protein_prediction import ProteinSearch
 import logging
 
@@ -15,29 +21,298 @@ def main():
     pass
 
 
+def search_options(command):
+    """Adds the options of the search parameters exposed by PeptideSearch to a command."""
+    options = [
+        click.option('--precursor-tolerance', default=None, type=float, help='Precursor mass tolerance.'),
+        click.option('--precursor-unit', default=None, type=click.Choice(['ppm', 'Da']),
+                     help='Unit of the precursor mass tolerance.'),
+        click.option('--fragment-tolerance', default=None, type=float, help='Fragment mass tolerance.'),
+        click.option('--fragment-unit', default=None, type=click.Choice(['ppm', 'Da']),
+                     help='Unit of the fragment mass tolerance.'),
+        click.option('--enzyme', default=None, help='Enzyme of the in-silico digestion, e.g. Trypsin or Lys-C.'),
+        click.option('--missed-cleavages', default=None, type=int, help='Number of allowed missed cleavages.'),
+        click.option('--fixed-mod', 'fixed_mods', multiple=True,
+                     help='Fixed modification, e.g. "Carbamidomethyl (C)", may be repeated.'),
+        click.option('--variable-mod', 'variable_mods', multiple=True,
+                     help='Variable modification, e.g. "Oxidation (M)", may be repeated.'),
+        click.option('--top-hits', default=None, type=int, help='Number of peptide hits reported per spectrum.'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def get_search_parameters(precursor_tolerance: float = None, precursor_unit: str = None,
+                          fragment_tolerance: float = None, fragment_unit: str = None, enzyme: str = None,
+                          missed_cleavages: int = None, fixed_mods: tuple = (), variable_mods: tuple = (),
+                          top_hits: int = None) -> dict:
+    """Collects the search parameters passed with search_options, the OpenMS defaults are kept for the others."""
+    parameters = {'precursor_tolerance': precursor_tolerance, 'precursor_tolerance_unit': precursor_unit,
+                  'fragment_tolerance': fragment_tolerance, 'fragment_tolerance_unit': fragment_unit,
+                  'enzyme': enzyme, 'missed_cleavages': missed_cleavages,
+                  'fixed_modifications': list(fixed_mods) or None,
+                  'variable_modifications': list(variable_mods) or None, 'top_hits': top_hits}
+    return {name: value for name, value in parameters.items() if value is not None}
+
+
 @main.command()
 @click.argument('path')
 @click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the paths to STDOUT.")
-def get_spectrum_values(path: str, verbose: bool = False):
-    """Generates dataframe consisting of the spectrum values from the input mzml/mzxml file."""
+@click.option('--stream', default=False, is_flag=True, help="When used, reads the file one spectrum at a time.")
+@click.option('-w', '--workers', default=1, type=int, help="Number of processes used to decode the spectra.")
+@click.option('-c', '--cache', default=False, is_flag=True, help="When used, reuses decoded spectra of earlier runs.")
+@click.option('-s', '--summary-only', default=False, is_flag=True, help="When used, skips decoding the binary arrays.")
+@click.option('-m', '--max-memory', default=None, type=int,
+              help="MiB of decoded spectra kept in memory, the rest is spilled to a memory-mapped file.")
+@click.option('--compact', default=False, is_flag=True, help="When used, keeps decoded spectra in contiguous buffers.")
+@click.option('-o', '--output', default=None, help="Parquet, Feather or CSV file to save the spectrum values.")
+@click.option('-p', '--peaks-output', default=None,
+              help="Parquet or Feather file of all peaks (spectra_id, m/z, intensity), written while streaming.")
+@click.option('--row-group-size', default=1 << 17, type=int,
+              help="Number of peaks per row group of --peaks-output.")
+def get_spectrum_values(path: str, verbose: bool = False, stream: bool = False, workers: int = 1,
+                        cache: bool = False, summary_only: bool = False, max_memory: int = None, compact: bool = False,
+                        output: str = None, peaks_output: str = None, row_group_size: int = 1 << 17):
+    """Generates dataframe consisting of the spectrum values from the input mzml/mzxml file, optionally gzipped."""
+    reader = Reader(path=path, workers=workers, cache=cache,
+                    max_memory=max_memory * 1024 ** 2 if max_memory is not None else None, compact=compact)
+    if peaks_output:
+        data = reader.export(output, peaks_output=peaks_output, row_group_size=row_group_size)
+    elif stream:
+        data = reader.stream_spectrum()
+    else:
+        data = reader.analyse_spectrum(decode=not summary_only)
+    if output and not peaks_output:
+        write_table(data, output)
+    if verbose:
+        click.echo(data)
+        rss = reader.report_memory()
+        if rss is not None:
+            click.echo(f'Peak RSS: {rss / 1024 ** 2:.1f} MiB', err=True)
+
+
+@main.command()
+@click.argument('path')
+@click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the combined table to STDOUT.")
+@click.option('--stream', default=False, is_flag=True, help="When used, reads each file one spectrum at a time.")
+@click.option('-w', '--workers', default=os.cpu_count(), type=int, help="Number of files processed at the same time.")
+@click.option('-c', '--cache', default=False, is_flag=True, help="When used, reuses decoded spectra of earlier runs.")
+@click.option('-s', '--summary-only', default=False, is_flag=True, help="When used, skips decoding the binary arrays.")
+@click.option('-o', '--output', default=None, help="CSV file of the combined table, or directory when --split is used.")
+@click.option('--split', default=False, is_flag=True, help="When used, writes one CSV file per input file.")
+def batch_spectrum_values(path: str, verbose: bool = False, stream: bool = False, workers: int = 1,
+                          cache: bool = False, summary_only: bool = False, output: str = None, split: bool = False):
+    """Generates the spectrum values of every mzml/mzxml file of a directory or glob pattern."""
+    if split and not output:
+        raise click.UsageError('--split requires an output directory given with --output.')
+    batch = BatchReader(path=path, workers=workers, stream=stream, cache=cache, decode=not summary_only)
+    paths = batch.get_paths()
+    with click.progressbar(batch.iter_results(), length=len(paths), label='Processing files',
+                           item_show_func=lambda result: os.path.basename(result[0]) if result else None) as results:
+        for _ in results:
+            pass
+    for failed, error in batch.failed.items():
+        click.echo(f'Failed to process {failed}: {error}', err=True)
+    if output:
+        batch.write(output, split=split)
+    if verbose:
+        click.echo(batch.combine())
+
+
+@main.command()
+@click.argument('path')
+@click.option('-o', '--output', default=None, help="Parquet, Feather or CSV file to save the spectrum metadata.")
+@click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the metadata to STDOUT.")
+def scan_headers(path: str, output: str = None, verbose: bool = False):
+    """Reads retention time, MS level, precursor and spectrum type of every spectrum without decoding any peaks."""
+    data = Reader(path=path).scan_headers()
+    if output:
+        write_table(data, output)
+    if verbose:
+        click.echo(data)
+
+
+@main.command()
+@click.argument('path')
+@click.option('-m', '--mz', multiple=True, type=float, help="Target m/z, repeatable. The TIC is extracted if omitted.")
+@click.option('--ppm', default=10.0, type=float, help="Half width of the m/z window in ppm.")
+@click.option('--rt-start', default=None, type=float, help="First retention time in seconds.")
+@click.option('--rt-end', default=None, type=float, help="Last retention time in seconds.")
+@click.option('--ms-level', default=1, type=int, help="MS level of the spectra, 0 for all levels.")
+@click.option('-o', '--output', default=None, help="File path to save the chromatograms as CSV.")
+@click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the chromatograms to STDOUT.")
+def extract_xic(path: str, mz: tuple, ppm: float = 10.0, rt_start: float = None, rt_end: float = None,
+                ms_level: int = 1, output: str = None, verbose: bool = False):
+    """Extracts ion chromatograms of target m/z values, or the total ion chromatogram, from the input file."""
+    rt_range = None
+    if rt_start is not None or rt_end is not None:
+        rt_range = (rt_start if rt_start is not None else float('-inf'), rt_end if rt_end is not None else float('inf'))
     reader = Reader(path=path)
-    data = reader.analyse_spectrum()
+    data = reader.extract_xic(list(mz), ppm=ppm, rt_range=rt_range, ms_level=ms_level or None)
+    if output:
+        data.to_csv(output, index=False)
+    if verbose:
+        click.echo(data)
+
+
+@main.command()
+@click.argument('path')
+@click.option('--rt-start', default=None, type=float, help="First retention time in seconds.")
+@click.option('--rt-end', default=None, type=float, help="Last retention time in seconds.")
+@click.option('-o', '--output', default=None, help="Parquet, Feather or CSV file to save the chromatogram.")
+@click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the chromatogram to STDOUT.")
+def extract_tic(path: str, rt_start: float = None, rt_end: float = None, output: str = None, verbose: bool = False):
+    """Reads the total ion chromatogram stored in the input file, or sums the spectra if the file has none."""
+    rt_range = None
+    if rt_start is not None or rt_end is not None:
+        rt_range = (rt_start if rt_start is not None else float('-inf'), rt_end if rt_end is not None else float('inf'))
+    data = Reader(path=path).get_tic(rt_range=rt_range)
+    if output:
+        write_table(data, output)
+    if verbose:
+        click.echo(data)
+
+
+@main.command()
+@click.argument('path')
+@click.option('-i', '--chromatogram-id', 'ids', multiple=True,
+              help="Id of a chromatogram, repeatable. All chromatograms are extracted if omitted.")
+@click.option('-o', '--output', default=None, help="Parquet, Feather or CSV file to save the chromatograms.")
+@click.option('-v', '--verbose', default=False, is_flag=True, help="When used, will print the chromatograms to STDOUT.")
+def extract_chromatograms(path: str, ids: tuple, output: str = None, verbose: bool = False):
+    """Extracts the chromatograms stored in the input mzML file, e.g. TIC and SRM traces."""
+    data = Reader(path=path).get_chromatogram_frame(list(ids))
+    if output:
+        write_table(data, output)
     if verbose:
         click.echo(data)
 
 
+@main.command()
+@click.argument('path')
+@click.argument('output')
+@click.option('--min-intensity', default=0.0, type=float, help="Local maxima below this intensity are dropped.")
+def centroid(path: str, output: str, min_intensity: float = 0.0):
+    """Centroids the profile spectra of the input file and writes them as mzML."""
+    Reader(path=path).write_centroided(output, min_intensity=min_intensity)
+
+
+@main.command()
+@click.argument('path')
+@click.argument('output')
+@click.option('-b', '--bin-width', default=1.0, type=float, help="Width of the m/z bins.")
+@click.option('-n', '--normalize', default=None, type=click.Choice(['max', 'sum', 'l2']),
+              help="Scales every spectrum to a base peak, total or euclidean norm of 1.")
+def bin_spectra(path: str, output: str, bin_width: float = 1.0, normalize: str = None):
+    """Bins all spectra of the input file into a sparse matrix saved as .npz file."""
+    Reader(path=path).bin_spectra(bin_width=bin_width, normalize=normalize).save(output)
+
+
 @main.command()
 @click.argument('fasta_path')
 @click.argument('mzml_path')
 @click.option('-v', '--verbose', default=False, is_flag=True, help='When used, will print to STDOUT.')
-def peptide_info(fasta_path: str, mzml_path: str, verbose: bool = False):
+@click.option('--centroid', default=False, is_flag=True, help='When used, centroids profile spectra before the search.')
+@click.option('-w', '--workers', default=1, type=int, help='Number of processes searching spectrum shards.')
+@click.option('--shards', default=None, type=int, help='Number of spectrum shards, one per worker by default.')
+@click.option('--shard-by', default='mz', type=click.Choice(['mz', 'round_robin']),
+              help='Splits the spectra by precursor m/z range or round-robin.')
+@click.option('-c', '--cache', default=False, is_flag=True,
+              help='When used, search results are cached and repeated searches are loaded from the cache.')
+@click.option('--prefilter', default=False, is_flag=True,
+              help='When used, spectra without candidate peptides in the peptide index are not searched.')
+@search_options
+def peptide_info(fasta_path: str, mzml_path: str, verbose: bool = False, centroid: bool = False, workers: int = 1,
+                 shards: int = None, shard_by: str = 'mz', cache: bool = False, prefilter: bool = False,
+                 **search_parameters):
     """Generates dataframe consisting of peptide properties and list of peptide hit sequences"""
-    search = PeptideSearch(fasta_path=fasta_path, mzml_path=mzml_path)
+    search = PeptideSearch(fasta_path=fasta_path, mzml_path=mzml_path, centroid=centroid, workers=workers,
+                           shards=shards, shard_by=shard_by, cache=cache,
+                           parameters=get_search_parameters(**search_parameters), prefilter=prefilter)
     info = search.peptide_wrapper()[0]
     if verbose:
         click.echo(info)
 
 
+@main.command()
+@click.argument('fasta_path')
+@click.argument('mzml_path')
+@click.option('-o', '--output', default=None, help='Parquet, Feather or CSV file to save the spectrum values.')
+@click.option('-p', '--peptide-output', default=None, help='Parquet, Feather or CSV file to save the peptide hits.')
+@click.option('-v', '--verbose', default=False, is_flag=True, help='When used, will print to STDOUT.')
+@click.option('--centroid', default=False, is_flag=True, help='When used, centroids profile spectra before the search.')
+@click.option('-w', '--workers', default=1, type=int, help='Number of processes searching spectrum shards.')
+@click.option('--shards', default=None, type=int, help='Number of spectrum shards, one per worker by default.')
+@click.option('--shard-by', default='mz', type=click.Choice(['mz', 'round_robin']),
+              help='Splits the spectra by precursor m/z range or round-robin.')
+@click.option('-c', '--cache', default=False, is_flag=True,
+              help='When used, search results are cached and repeated searches are loaded from the cache.')
+@click.option('--prefilter', default=False, is_flag=True,
+              help='When used, spectra without candidate peptides in the peptide index are not searched.')
+@search_options
+def search_pipeline(fasta_path: str, mzml_path: str, output: str = None, peptide_output: str = None,
+                    verbose: bool = False, centroid: bool = False, workers: int = 1, shards: int = None,
+                    shard_by: str = 'mz', cache: bool = False, prefilter: bool = False, **search_parameters):
+    """Extracts the spectrum values and searches the peptides of the input file on a single in-memory parse."""
+    pipeline = SearchPipeline(fasta_path=fasta_path, mzml_path=mzml_path, centroid=centroid, workers=workers,
+                              shards=shards, shard_by=shard_by, cache=cache,
+                              parameters=get_search_parameters(**search_parameters), prefilter=prefilter)
+    values, info, _ = pipeline.run()
+    if output:
+        write_table(values, output)
+    if peptide_output:
+        write_table(info, peptide_output)
+    if verbose:
+        click.echo(values)
+        click.echo(info)
+
+
+@main.command()
+@click.argument('fasta_path')
+@click.option('--enzyme', default='Trypsin', help='Enzyme of the in-silico digestion, e.g. Trypsin or Lys-C.')
+@click.option('--missed-cleavages', default=1, type=int, help='Number of allowed missed cleavages.')
+@click.option('--min-length', default=7, type=int, help='Minimum peptide length.')
+@click.option('--max-length', default=40, type=int, help='Maximum peptide length.')
+@click.option('--fixed-mod', 'fixed_mods', multiple=True, default=('Carbamidomethyl (C)',),
+              help='Fixed modification, e.g. "Carbamidomethyl (C)", may be repeated.')
+@click.option('-m', '--mass', 'masses', multiple=True, type=float,
+              help='Neutral precursor mass to look candidate peptides up for, may be repeated.')
+@click.option('--ppm', default=10.0, type=float, help='Precursor mass tolerance in ppm of the lookups.')
+@click.option('-v', '--verbose', default=False, is_flag=True, help='When used, will print to STDOUT.')
+def peptide_index(fasta_path: str, enzyme: str = 'Trypsin', missed_cleavages: int = 1, min_length: int = 7,
+                  max_length: int = 40, fixed_mods: tuple = ('Carbamidomethyl (C)',), masses: tuple = (),
+                  ppm: float = 10.0, verbose: bool = False):
+    """Builds the precursor mass index of the in-silico digestion of a FASTA file, reused by later searches."""
+    index = PeptideDatabase().get_index(fasta_path, enzyme, missed_cleavages, min_length, max_length, list(fixed_mods))
+    if verbose:
+        click.echo(index)
+    for mass in masses:
+        click.echo(f'{mass}: {", ".join(index.get_sequences(index.get_candidates(mass, ppm)))}')
+
+
+@main.command()
+@click.argument('library_path')
+@click.argument('mzml_path')
+@click.option('-t', '--tolerance', default=10.0, type=float, help='Precursor m/z tolerance.')
+@click.option('-u', '--unit', default='ppm', type=click.Choice(['ppm', 'Da']), help='Unit of the precursor tolerance.')
+@click.option('-b', '--bin-width', default=0.02, type=float, help='Width of the m/z bins fragments are compared in.')
+@click.option('--min-score', default=0.0, type=float, help='Matches with a lower cosine similarity are dropped.')
+@click.option('--top-n', default=1, type=int, help='Number of best matches reported per spectrum.')
+@click.option('-o', '--output', default=None, help='File path to save the library matches.')
+@click.option('-v', '--verbose', default=False, is_flag=True, help='When used, will print to STDOUT.')
+def library_info(library_path: str, mzml_path: str, tolerance: float = 10.0, unit: str = 'ppm', bin_width: float = 0.02,
+                 min_score: float = 0.0, top_n: int = 1, output: str = None, verbose: bool = False):
+    """Generates dataframe of the best spectral library matches of the spectra of the input file."""
+    search = LibrarySearch(library_path=library_path, mzml_path=mzml_path, precursor_tolerance=tolerance,
+                           tolerance_unit=unit, bin_width=bin_width, min_score=min_score, top_n=top_n)
+    info = search.library_wrapper()[0]
+    if output:
+        info.to_csv(output, index=False)
+    if verbose:
+        click.echo(info)
+
+
 @main.command()
 @click.option('-f', '--fasta', default=None, help='FASTA file of protein, submitted along MZML file')
 @click.option('-m', '--mzml', default=None, help='MZML file containing spectrum information, submitted along FASTA file')
@@ -45,7 +320,10 @@ def peptide_info(fasta_path: str, mzml_path: str, verbose: bool = False):
 @click.option('-v', '--verbose', default=False, is_flag=True, help='When used, prints table to STDOUT.')
 @click.option('-s', '--sequence', default=False, is_flag=True, help='Option to print protein sequence.')
 @click.option('-o', '--output', default=None, help='File path to save protein information')
-def protein_info(fasta: str, mzml: str, peptide: list,  output: str, verbose: bool = False, sequence: bool = False):
+@click.option('-c', '--cache', default=False, is_flag=True,
+              help='When used, peptide search results are cached and repeated searches are loaded from the cache.')
+def protein_info(fasta: str, mzml: str, peptide: list,  output: str, verbose: bool = False, sequence: bool = False,
+                 cache: bool = False):
     """Generates dataframe of peptide mapping to get proteins.
     """
     info = None
@@ -56,9 +334,8 @@ def protein_info(fasta: str, mzml: str, peptide: list,  output: str, verbose: bo
         raise ImportError("Please load either a Peptide list OR a FASTA and MZML file, not all 3!")
 
     if fasta and mzml:
-        pep_search = PeptideSearch(fasta_path=fasta, mzml_path=mzml)
-        info = pep_search.peptide_wrapper()[0]
-        peptide_list = pep_search.peptide_wrapper()[1]
+        pep_search = PeptideSearch(fasta_path=fasta, mzml_path=mzml, cache=cache)
+        info, peptide_list = pep_search.peptide_wrapper()
         pro_search = ProteinSearch(peptide_list)
         pro_search.get_proteins()
         ans_with_seq = pro_search.ans_df
@@ -0,0 +1,163 @@
+import os
+import argparse
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# output formats by file extension, Feather files are Arrow IPC files
+EXPORT_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather', '.csv': 'csv'}
+PEAK_COLUMNS = ['spectra_id', 'm/z', 'intensity']
+
+
+def get_format(path: str) -> str:
+    """Returns the output format of a file path from its extension.
+
+    Parameters
+    ----------
+    path: str
+        path of the output file
+
+    Returns
+    -------
+    file_format: str
+        'parquet', 'feather' or 'csv'
+
+    Raises
+    -------
+    argparse.ArgumentTypeError: if the extension is not one of EXPORT_FORMATS
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in EXPORT_FORMATS:
+        logger.warning(f'The output format of {path} is not valid.')
+        raise argparse.ArgumentTypeError(f'Please pass an output file of {", ".join(EXPORT_FORMATS)} format.')
+    return EXPORT_FORMATS[extension]
+
+
+def write_table(df: pd.DataFrame, path: str) -> str:
+    """Writes a dataframe as Parquet, Feather or CSV file depending on the extension of the path. The index is
+    dropped, as in DataFrame.to_csv(index=False).
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        table to write
+    path: str
+        path of the output file
+
+    Returns
+    -------
+    path: str
+        path of the written file
+    """
+    file_format = get_format(path)
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path)
+    logger.info(f'Wrote {len(df)} rows to {path}')
+    return path
+
+
+class PeakWriter:
+    """Writes the long-format peak table (spectrum id, m/z, intensity) of a run to a Parquet or Feather file while
+    the spectra are decoded. Peaks are buffered until a row group is full, so at most row_group_size peaks are held
+    in memory, however large the export is. Values are written as float64, the widest precision of mzML/mzXML arrays.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 1 << 17):
+        """
+        parameters:
+            path = path of the .parquet or .feather output file
+            row_group_size = number of peaks written per Parquet row group or Arrow record batch
+        """
+        self.path = str(path)
+        self.row_group_size = row_group_size
+        self.format = get_format(self.path)
+        if self.format == 'csv':
+            logger.warning('The peak table is only written as Parquet or Feather.')
+            raise argparse.ArgumentTypeError('Please pass a peak output file of .parquet or .feather format.')
+        self.pending = list()  # buffered (spectrum id, m/z, intensity) arrays of the next row group
+        self.size = 0  # number of buffered peaks
+        self.peaks = 0  # number of written peaks
+        self.row_groups = 0  # number of written row groups
+        self.writer = None  # ParquetWriter or Arrow IPC file writer, opened on the first row group
+
+    def __repr__(self) -> str:
+        return f'PeakWriter({self.path}, {self.peaks} peaks in {self.row_groups} row groups)'
+
+    def __enter__(self) -> 'PeakWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, spectra_id: int, mz: Optional[np.ndarray], intensity: Optional[np.ndarray]):
+        """Buffers the peaks of one spectrum and writes a row group once row_group_size peaks are buffered.
+
+        Parameters
+        ----------
+        spectra_id: int
+            id of the spectrum, the spectra_id of the summary table
+        mz: Optional[np.ndarray]
+            decoded m/z values, None for empty spectra
+        intensity: Optional[np.ndarray]
+            decoded intensity values, None for empty spectra
+        """
+        if mz is None or len(mz) == 0:
+            return
+        self.pending.append((np.full(len(mz), spectra_id, dtype=np.int64), mz, intensity))
+        self.size += len(mz)
+        while self.size >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Writes up to row_group_size buffered peaks as one row group."""
+        if not self.size:
+            return
+        ids, mz, intensity = (np.concatenate(columns) for columns in zip(*self.pending))
+        count = min(self.size, self.row_group_size)
+        self.write_row_group(ids[:count], mz[:count], intensity[:count])
+        self.pending = [(ids[count:], mz[count:], intensity[count:])] if count < self.size else list()
+        self.size -= count
+
+    def write_row_group(self, ids: np.ndarray, mz: np.ndarray, intensity: np.ndarray):
+        """Writes one row group, opening the output file on the first call."""
+        import pyarrow as pa
+        schema = pa.schema([(PEAK_COLUMNS[0], pa.int64()), (PEAK_COLUMNS[1], pa.float64()),
+                            (PEAK_COLUMNS[2], pa.float64())])
+        batch = pa.record_batch([pa.array(ids), pa.array(mz, type=pa.float64()),
+                                 pa.array(intensity, type=pa.float64())], schema=schema)
+        if self.writer is None:
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.path, schema)
+            else:
+                self.writer = pa.ipc.new_file(self.path, schema,
+                                              options=pa.ipc.IpcWriteOptions(compression='lz4'))
+        if self.format == 'parquet':
+            self.writer.write_table(pa.Table.from_batches([batch]), row_group_size=len(ids))
+        else:
+            self.writer.write_batch(batch)
+        self.peaks += len(ids)
+        self.row_groups += 1
+
+    def close(self):
+        """Writes the remaining buffered peaks and closes the output file. A run without peaks still produces a file
+        with the peak table columns."""
+        self.flush()
+        if self.writer is None:
+            self.write_row_group(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+        self.writer.close()
+        logger.info(f'Wrote {self}')
@@ -0,0 +1,191 @@
+import re
+import logging
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+from ms_package.centroid import PROFILE_SPECTRUM, CENTROID_SPECTRUM
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# xs:duration of mzXML retentionTime attributes, e.g. PT1M3.5S
+DURATION = re.compile(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?')
+SCAN_START_TIME = 'MS:1000016'
+MS_LEVEL = 'MS:1000511'
+SELECTED_ION_MZ = 'MS:1000744'
+CHARGE_STATE = 'MS:1000041'
+MINUTE_UNITS = ('UO:0000031', 'minute')
+
+HEADER_COLUMNS = ['spectra_id', 'retention_time', 'ms_level', 'precursor_m/z', 'precursor_charge', 'spectrum_type',
+                  'peaks_count']
+
+# start tag pattern and end tag of a spectrum, start and end tag of its encoded payloads
+SPECTRUM_TAGS = {'mzml': (re.compile(rb'<spectrum\s'), b'</spectrum>', b'<binary', b'</binary>'),
+                 'mzxml': (re.compile(rb'<scan\s'), b'</scan>', b'<peaks', b'</peaks>')}
+HEADER_ACCESSION = re.compile(rb'accession\s*=\s*["\'](' + '|'.join(
+    [MS_LEVEL, SCAN_START_TIME, SELECTED_ION_MZ, CHARGE_STATE, PROFILE_SPECTRUM, CENTROID_SPECTRUM]).encode() +
+                              rb')["\']')
+ATTRIBUTE = re.compile(rb'([\w:]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+PARAM_VALUE = re.compile(rb'\svalue\s*=\s*["\']([^"\']*)')
+PARAM_UNIT = re.compile(rb'\sunit(?:Accession|Name)\s*=\s*["\'](' + '|'.join(MINUTE_UNITS).encode() + rb')["\']')
+PRECURSOR_MZ = re.compile(rb'<precursorMz\b([^>]*)>\s*([^<]*?)\s*</precursorMz>')
+
+
+def parse_duration(value: str) -> float:
+    """Converts an xs:duration, e.g. PT1M3.5S, to seconds.
+
+    Parameters
+    ----------
+    value: str
+        retentionTime attribute of an mzXML scan
+
+    Returns
+    -------
+    seconds: float
+        duration in seconds, NaN if the value is empty or not a duration
+    """
+    match = DURATION.fullmatch(value or '')
+    if match is None or not any(match.groups()):
+        return np.nan
+    days, hours, minutes, seconds = (float(group) if group else 0.0 for group in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def get_attributes(tag: bytes) -> Dict[str, str]:
+    """Returns the attributes of a raw XML start tag."""
+    return {name.decode(): (double if double or not single else single).decode()
+            for name, double, single in ATTRIBUTE.findall(tag)}
+
+
+def iter_header_segments(file, file_format: str, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Scans the raw bytes of an mzML/mzXML file and yields the header of every spectrum in document order, i.e. the
+    bytes from its start tag up to its end tag or the start tag of a nested scan. Encoded payloads are skipped with
+    bytes.find as they stream by, so neither the payloads nor the XML structure are ever parsed.
+
+    Parameters
+    ----------
+    file: file object
+        input file opened in binary mode
+    file_format: str
+        'mzml' or 'mzxml'
+    chunk_size: int
+        number of bytes read at a time
+
+    Yields
+    -------
+    segment: bytes
+        header of a spectrum without the content of its <binary> (mzML) or <peaks> (mzXML) elements
+    """
+    start_pattern, end_tag, open_tag, close_tag = SPECTRUM_TAGS[file_format]
+    buffer = b''  # raw bytes not scanned for payloads yet
+    metadata = b''  # bytes without payloads not split into spectra yet
+    inside = False  # True while the buffer starts within a payload
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        parts, position = list(), 0
+        while True:
+            if inside:
+                end = buffer.find(close_tag, position)
+                if end < 0:
+                    position = max(position, len(buffer) - len(close_tag))  # keeps a closing tag split by the chunk
+                    break
+                position, inside = end, False
+                continue
+            start = buffer.find(open_tag, position)
+            if start < 0:
+                split = len(buffer) if not chunk else max(position, len(buffer) - len(open_tag))
+                parts.append(buffer[position:split])
+                position = split
+                break
+            tag_end = buffer.find(b'>', start)
+            if tag_end < 0:
+                parts.append(buffer[position:start])
+                position = start
+                break
+            parts.append(buffer[position:tag_end + 1])
+            position = tag_end + 1
+            # <binaryDataArray> and <binaryDataArrayList> share the prefix, self-closing tags have no payload
+            if buffer[start + len(open_tag):start + len(open_tag) + 1] in b'> \t\r\n' \
+                    and buffer[tag_end - 1:tag_end] != b'/':
+                inside = True
+        buffer = buffer[position:]
+        metadata += b''.join(parts)
+
+        position = 0
+        while True:
+            match = start_pattern.search(metadata, position)
+            if match is None:
+                position = len(metadata) if not chunk else max(position, len(metadata) - len(end_tag))
+                break
+            following = start_pattern.search(metadata, match.end())
+            end = metadata.find(end_tag, match.end())
+            ends = [index for index in (following.start() if following else -1, end) if index >= 0]
+            if not ends:
+                if not chunk:
+                    yield metadata[match.start():]
+                    position = len(metadata)
+                else:
+                    position = match.start()
+                break
+            yield metadata[match.start():min(ends)]
+            position = min(ends)
+        metadata = metadata[position:]
+        if not chunk:
+            break
+
+
+def read_header(segment: bytes, file_format: str) -> Tuple[int, float, int, float, int, str, int]:
+    """Reads the metadata of a spectrum header yielded by iter_header_segments, following the rules of
+    Reader.get_scan_metadata and Reader.get_precursor.
+
+    Parameters
+    ----------
+    segment: bytes
+        header of the spectrum
+    file_format: str
+        'mzml' or 'mzxml'
+
+    Returns
+    -------
+    header: Tuple[int, float, int, float, int, str, int]
+        spectrum id, retention time in seconds, MS level, precursor m/z and charge, spectrum type ('profile',
+        'centroid' or '' if not declared) and number of peaks, with NaN or 0 for missing values
+    """
+    attributes = get_attributes(segment[:segment.find(b'>') + 1])
+    if file_format == 'mzxml':
+        precursor_mz, charge = np.nan, 0
+        precursor = PRECURSOR_MZ.search(segment)
+        if precursor is not None and precursor.group(2):
+            precursor_mz = float(precursor.group(2))
+            charge = int(get_attributes(precursor.group(1)).get('precursorCharge') or 0)
+        spectrum_type = {'0': 'profile', '1': 'centroid'}.get(attributes.get('centroided'), '')
+        return (int(attributes['num']), parse_duration(attributes.get('retentionTime')),
+                int(attributes.get('msLevel') or 0), precursor_mz, charge, spectrum_type,
+                int(attributes.get('peaksCount') or 0))
+
+    retention_time, ms_level, precursor_mz, charge, spectrum_type = np.nan, 0, np.nan, 0, ''
+    selected_start = segment.find(b'<selectedIon')
+    selected_end = segment.find(b'</selectedIon>', selected_start) if selected_start >= 0 else -1
+    for match in HEADER_ACCESSION.finditer(segment):
+        accession = match.group(1).decode()
+        param = segment[segment.rfind(b'<', 0, match.start()):segment.find(b'>', match.end()) + 1]
+        value = PARAM_VALUE.search(param)
+        if accession == MS_LEVEL:
+            ms_level = int(value.group(1))
+        elif accession == SCAN_START_TIME and np.isnan(retention_time):
+            retention_time = float(value.group(1))
+            if PARAM_UNIT.search(param):
+                retention_time *= 60
+        elif accession in (SELECTED_ION_MZ, CHARGE_STATE):
+            if not selected_start <= match.start() < selected_end:
+                continue  # only the first selected ion is read
+            if accession == SELECTED_ION_MZ:
+                precursor_mz = float(value.group(1))
+            else:
+                charge = int(float(value.group(1)))
+        elif not spectrum_type:
+            spectrum_type = 'profile' if accession == PROFILE_SPECTRUM else 'centroid'
+    return (int(attributes['index']), retention_time, ms_level, precursor_mz, charge, spectrum_type,
+            int(attributes.get('defaultArrayLength') or 0))
@@ -0,0 +1,150 @@
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class SpectrumIndex:
+    """Retention time and m/z range index over the decoded peaks of a run.
+
+    Spectra are sorted by retention time, so an RT window is found with two binary searches. The lowest and highest
+    m/z of every spectrum skip spectra that cannot contain a target, and the peaks of the remaining spectra are
+    binary searched per spectrum instead of being scanned.
+    """
+
+    def __init__(self, keys: List[int], retention_times: np.ndarray, ms_levels: np.ndarray, mz: np.ndarray,
+                 intensity: np.ndarray, offsets: np.ndarray):
+        """
+        parameters:
+            keys = spectrum ids in file order
+            retention_times = scan start time of every spectrum in seconds, NaN where missing
+            ms_levels = MS level of every spectrum, 0 where missing
+            mz = concatenated m/z values of all spectra
+            intensity = concatenated intensity values of all spectra
+            offsets = start of every spectrum in the peak buffer followed by the total number of peaks
+        """
+        mz, intensity = self.sort_segments(mz, intensity, offsets)
+        order = np.argsort(retention_times, kind='stable')  # spectra without retention time are placed last
+        self.keys = np.asarray(keys, dtype=np.int64)[order]
+        self.retention_times = np.asarray(retention_times, dtype=np.float64)[order]
+        self.ms_levels = np.asarray(ms_levels, dtype=np.int64)[order]
+        self.starts = offsets[:-1][order]
+        self.ends = offsets[1:][order]
+        self.mz = mz
+        self.intensity = intensity
+        self.mz_min = np.full(len(order), np.inf)
+        self.mz_max = np.full(len(order), -np.inf)
+        filled = self.ends > self.starts
+        self.mz_min[filled] = mz[self.starts[filled]]
+        self.mz_max[filled] = mz[self.ends[filled] - 1]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def sort_segments(mz: np.ndarray, intensity: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorts the peaks of every spectrum by m/z, only touching the buffer if a spectrum is unsorted."""
+        descending = np.flatnonzero(np.diff(mz) < 0) + 1
+        if not np.isin(descending, offsets).all():
+            segment = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+            order = np.lexsort((mz, segment))
+            mz, intensity = mz[order], intensity[order]
+        return mz, intensity
+
+    def select(self, rt_range: Optional[Tuple[float, float]] = None, ms_level: Optional[int] = None) -> np.ndarray:
+        """Returns the positions of the spectra inside a retention time window with binary searches.
+
+        Parameters
+        ----------
+        rt_range: Optional[Tuple[float, float]]
+            first and last retention time in seconds, all spectra if None
+        ms_level: Optional[int]
+            only spectra of this MS level are selected, all levels if None
+
+        Returns
+        -------
+        rows: np.ndarray
+            positions of the selected spectra in retention time order
+        """
+        if rt_range is None:
+            rows = np.arange(len(self.keys))
+        else:
+            start = np.searchsorted(self.retention_times, rt_range[0], side='left')
+            end = np.searchsorted(self.retention_times, rt_range[1], side='right')
+            rows = np.arange(start, end)
+        if ms_level is not None:
+            rows = rows[self.ms_levels[rows] == ms_level]
+        return rows
+
+    def extract_xic(self, targets: List[float], ppm: float = 10.0, rt_range: Optional[Tuple[float, float]] = None,
+                    ms_level: Optional[int] = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Extracts the ion chromatograms of several target m/z values at once. The intensity of every target is
+        summed over the peaks within target ± ppm in every selected spectrum.
+
+        Parameters
+        ----------
+        targets: List[float]
+            target m/z values
+        ppm: float
+            half width of the m/z window in parts per million of the target
+        rt_range: Optional[Tuple[float, float]]
+            first and last retention time in seconds, the whole run if None
+        ms_level: Optional[int]
+            MS level of the spectra, all levels if None
+
+        Returns
+        -------
+        xic: Tuple[np.ndarray, np.ndarray, np.ndarray]
+            spectrum ids and retention times of the selected spectra, and an array of shape (targets, spectra)
+            of the extracted intensities
+        """
+        targets = np.asarray(targets, dtype=np.float64)
+        bounds = np.empty(2 * len(targets))
+        bounds[0::2] = targets * (1 - ppm * 1e-6)
+        bounds[1::2] = targets * (1 + ppm * 1e-6)
+        rows = self.select(rt_range, ms_level)
+        intensities = np.zeros((len(targets), len(rows)))
+        if len(targets) == 0 or len(rows) == 0:
+            return self.keys[rows], self.retention_times[rows], intensities
+        overlap = (self.mz_max[rows] >= bounds.min()) & (self.mz_min[rows] <= bounds.max())  # m/z range index
+        columns = np.flatnonzero(overlap)
+        indices = np.empty((len(columns), 2 * len(targets)), dtype=np.int64)
+        for position, row in enumerate(rows[columns]):
+            start, end = self.starts[row], self.ends[row]
+            indices[position] = start + np.searchsorted(self.mz[start:end], bounds, side='left')
+        lows, highs = indices[:, 0::2], indices[:, 1::2]
+        padded = np.append(self.intensity, 0.0)  # reduceat indices may point one past the last peak
+        sums = np.add.reduceat(padded, indices.ravel())[0::2].reshape(lows.shape)
+        sums[highs <= lows] = 0.0  # empty windows
+        intensities[:, columns] = sums.T
+        return self.keys[rows], self.retention_times[rows], intensities
+
+    def extract_tic(self, rt_range: Optional[Tuple[float, float]] = None,
+                    ms_level: Optional[int] = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Extracts the total ion chromatogram from the summed intensities of the selected spectra.
+
+        Parameters
+        ----------
+        rt_range: Optional[Tuple[float, float]]
+            first and last retention time in seconds, the whole run if None
+        ms_level: Optional[int]
+            MS level of the spectra, all levels if None
+
+        Returns
+        -------
+        tic: Tuple[np.ndarray, np.ndarray, np.ndarray]
+            spectrum ids, retention times and total ion current of the selected spectra
+        """
+        rows = self.select(rt_range, ms_level)
+        totals = np.zeros(len(rows))
+        filled = self.ends[rows] > self.starts[rows]
+        if filled.any():
+            padded = np.append(self.intensity, 0.0)
+            indices = np.empty(2 * filled.sum(), dtype=np.int64)
+            indices[0::2] = self.starts[rows][filled]
+            indices[1::2] = self.ends[rows][filled]
+            totals[filled] = np.add.reduceat(padded, indices)[0::2]
+        return self.keys[rows], self.retention_times[rows], totals
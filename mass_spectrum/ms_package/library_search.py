@@ -0,0 +1,273 @@
+import re
+import logging
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ms_package.reader import Reader
+from ms_package.binning import bin_peaks
+from ms_package.summary import concatenate_peaks
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+LIBRARY_COLUMNS = ['Spectrum ID', 'Peptide ID m/z', 'Peptide ID rt', 'Peptide hit sequence', 'Peptide hit score']
+
+
+class LibrarySearch:
+    """Matches experimental MS2 spectra of an mzML/mzXML file against a spectral library (MSP, mzML or mzXML).
+
+    Library spectra are sorted by precursor m/z, so the candidates of every query are found with two binary
+    searches. Queries and candidates are binned on a common m/z grid and all candidate pairs of a batch are scored
+    at once with the cosine similarity of their sparse binned vectors.
+    """
+
+    def __init__(self, library_path: str, mzml_path: str, precursor_tolerance: float = 10.0,
+                 tolerance_unit: str = 'ppm', bin_width: float = 0.02, min_score: float = 0.0, top_n: int = 1,
+                 batch_size: int = 100000):
+        """
+        parameters:
+            library_path = file path of the spectral library, .msp, .mzML or .mzXML
+            mzml_path = file path of the input mzml/mzxml file consisting of mass spectrums
+            precursor_tolerance = maximum precursor m/z difference of a query and a library spectrum
+            tolerance_unit = 'ppm' or 'Da'
+            bin_width = width of the m/z bins the fragment peaks are compared in
+            min_score = matches with a lower cosine similarity are dropped
+            top_n = number of best matches reported per query spectrum
+            batch_size = number of candidate pairs scored at a time
+        """
+        self.library_path = str(library_path)
+        self.mzml_path = str(mzml_path)
+        self.precursor_tolerance = precursor_tolerance
+        self.tolerance_unit = tolerance_unit
+        self.bin_width = bin_width
+        self.min_score = min_score
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.library = None  # library spectra sorted by precursor m/z, set in read_library
+
+    @staticmethod
+    def read_msp(library_path: str) -> List[Dict]:
+        """Reads the spectra of an MSP spectral library. The precursor m/z is taken from the PrecursorMZ field or
+        the Parent value of the Comment field, the charge from the Charge field or the /charge suffix of the Name.
+
+        Parameters
+        ----------
+        library_path: str
+            file path of the MSP library
+
+        Returns
+        -------
+        spectra: List[Dict]
+            one dictionary per library spectrum with 'name', 'precursor_mz', 'charge', 'mz' and 'intensity'
+        """
+        spectra = list()
+        entry = None
+        with open(library_path) as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                field, separator, value = line.partition(':')
+                if separator and not field[0].isdigit():
+                    field = field.strip().lower()
+                    value = value.strip()
+                    if field == 'name':
+                        entry = {'name': value, 'precursor_mz': np.nan, 'charge': 0, 'peaks': list()}
+                        spectra.append(entry)
+                        suffix = re.search(r'/(\d+)', value)
+                        if suffix:
+                            entry['charge'] = int(suffix.group(1))
+                    elif entry is None:
+                        continue
+                    elif field in ('precursormz', 'precursor_mz'):
+                        entry['precursor_mz'] = float(value)
+                    elif field == 'charge':
+                        entry['charge'] = int(value.strip('+'))
+                    elif field == 'comment' and np.isnan(entry['precursor_mz']):
+                        parent = re.search(r'\bParent=([\d.]+)', value)
+                        if parent:
+                            entry['precursor_mz'] = float(parent.group(1))
+                elif entry is not None:
+                    values = line.replace(',', ' ').split()
+                    entry['peaks'].append((float(values[0]), float(values[1])))
+        for entry in spectra:
+            peaks = np.array(entry.pop('peaks'), dtype=np.float64).reshape(-1, 2)
+            entry['mz'], entry['intensity'] = peaks[:, 0], peaks[:, 1]
+        return spectra
+
+    @staticmethod
+    def read_spectra(path: str, names: bool = False) -> List[Dict]:
+        """Reads the MS2 spectra of an mzML/mzXML file with their precursors, streaming the file once.
+
+        Parameters
+        ----------
+        path: str
+            file path of the mzml/mzxml file
+        names: bool
+            when True, the spectrum title or native id is read as name of every spectrum
+
+        Returns
+        -------
+        spectra: List[Dict]
+            one dictionary per spectrum with a precursor, with 'key', 'name', 'precursor_mz', 'charge',
+            'retention_time', 'mz' and 'intensity'
+        """
+        reader = Reader(path)
+        spectra = list()
+        for key, spectrum in reader.iter_spectra():
+            precursor_mz, charge = reader.get_precursor(spectrum)
+            if np.isnan(precursor_mz):
+                continue
+            retention_time, _ = reader.get_scan_metadata(spectrum)
+            data = reader.decode_element(spectrum)
+            name = None
+            if names:
+                title = next((param.get('value') for param in spectrum.findall('cvParam')
+                              if param.get('accession') == 'MS:1000796'), None)
+                name = title or spectrum.get('id') or str(key)
+            spectra.append({'key': key, 'name': name, 'precursor_mz': precursor_mz, 'charge': charge,
+                            'retention_time': retention_time,
+                            'mz': data['mz'] if data['mz'] is not None else np.zeros(0),
+                            'intensity': data['intensity'] if data['intensity'] is not None else np.zeros(0)})
+        return spectra
+
+    def read_library(self) -> Dict[str, np.ndarray]:
+        """Reads the spectral library and sorts it by precursor m/z.
+
+        Returns
+        -------
+        library: Dict[str, np.ndarray]
+            names, precursor m/z, charges and peaks of the library spectra in precursor m/z order
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if the library is neither .msp, .mzML nor .mzXML
+        """
+        if self.library is not None:
+            return self.library
+        if self.library_path.lower().endswith('.msp'):
+            spectra = self.read_msp(self.library_path)
+        elif Reader(self.library_path).check_extension():
+            spectra = self.read_spectra(self.library_path, names=True)
+        else:
+            logger.warning('The spectral library format is not valid, MSP, mzML or mzXML file is required.')
+            raise argparse.ArgumentTypeError('Please pass a spectral library of .msp, .mzML or .mzXML format.')
+        spectra = [spectrum for spectrum in spectra if not np.isnan(spectrum['precursor_mz'])]
+        spectra.sort(key=lambda spectrum: spectrum['precursor_mz'])
+        self.library = {'names': np.array([spectrum['name'] for spectrum in spectra], dtype=object),
+                        'precursor_mz': np.array([spectrum['precursor_mz'] for spectrum in spectra]),
+                        'charge': np.array([spectrum['charge'] for spectrum in spectra], dtype=np.int64),
+                        'peaks': [(spectrum['mz'], spectrum['intensity']) for spectrum in spectra]}
+        logger.info(f'Indexed {len(spectra)} library spectra of {self.library_path}')
+        return self.library
+
+    def get_candidates(self, precursor_mz: np.ndarray, charge: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds the library spectra within the precursor tolerance of every query with binary searches. Spectra
+        with different known charges are not compared.
+
+        Parameters
+        ----------
+        precursor_mz: np.ndarray
+            precursor m/z of the queries
+        charge: np.ndarray
+            precursor charge of the queries, 0 if unknown
+
+        Returns
+        -------
+        candidates: Tuple[np.ndarray, np.ndarray]
+            query and library positions of every candidate pair
+        """
+        library = self.read_library()
+        if self.tolerance_unit == 'ppm':
+            tolerance = precursor_mz * self.precursor_tolerance * 1e-6
+        else:
+            tolerance = np.full(len(precursor_mz), float(self.precursor_tolerance))
+        lows = np.searchsorted(library['precursor_mz'], precursor_mz - tolerance, side='left')
+        highs = np.searchsorted(library['precursor_mz'], precursor_mz + tolerance, side='right')
+        counts = highs - lows
+        queries = np.repeat(np.arange(len(precursor_mz)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = np.repeat(lows, counts) + np.arange(counts.sum()) - first
+        library_charge = library['charge'][candidates]
+        same_charge = (charge[queries] == 0) | (library_charge == 0) | (charge[queries] == library_charge)
+        return queries[same_charge], candidates[same_charge]
+
+    def score(self, query_peaks: List[Tuple[np.ndarray, np.ndarray]], queries: np.ndarray,
+              candidates: np.ndarray) -> np.ndarray:
+        """Scores candidate pairs with the cosine similarity of their binned, square root scaled intensities.
+
+        Parameters
+        ----------
+        query_peaks: List[Tuple[np.ndarray, np.ndarray]]
+            m/z and intensity arrays of the queries
+        queries: np.ndarray
+            query position of every candidate pair
+        candidates: np.ndarray
+            library position of every candidate pair
+
+        Returns
+        -------
+        scores: np.ndarray
+            cosine similarity of every candidate pair
+        """
+        library = self.read_library()
+        query_buffer = concatenate_peaks(query_peaks)
+        library_buffer = concatenate_peaks(library['peaks'])
+        peaks = np.concatenate([query_buffer[0], library_buffer[0]])
+        mz_range = (float(peaks.min()), float(peaks.max())) if len(peaks) else (0.0, 0.0)
+        query_matrix = bin_peaks(query_buffer[0], np.sqrt(query_buffer[1]), query_buffer[2], self.bin_width,
+                                 mz_range, normalize='l2')
+        library_matrix = bin_peaks(library_buffer[0], np.sqrt(library_buffer[1]), library_buffer[2], self.bin_width,
+                                   mz_range, normalize='l2')
+        scores = np.zeros(len(queries))
+        for start in range(0, len(queries), self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            products = query_matrix[queries[batch]].multiply(library_matrix[candidates[batch]])
+            scores[batch] = np.asarray(products.sum(axis=1)).ravel()
+        return scores
+
+    def library_search(self) -> pd.DataFrame:
+        """Searches every MS2 spectrum of the input file against the spectral library.
+
+        Returns
+        -------
+        library_df : pd.DataFrame
+            Dataframe with the best library matches of every query spectrum, ordered by query and score.
+        """
+        queries = self.read_spectra(self.mzml_path)
+        precursor_mz = np.array([query['precursor_mz'] for query in queries])
+        charge = np.array([query['charge'] for query in queries], dtype=np.int64)
+        positions, candidates = self.get_candidates(precursor_mz, charge)
+        scores = self.score([(query['mz'], query['intensity']) for query in queries], positions, candidates)
+        keep = scores >= self.min_score
+        positions, candidates, scores = positions[keep], candidates[keep], scores[keep]
+        order = np.lexsort((-scores, positions))
+        positions, candidates, scores = positions[order], candidates[order], scores[order]
+        first = np.r_[0, np.flatnonzero(positions[1:] != positions[:-1]) + 1] if len(positions) else np.zeros(0, int)
+        rank = np.arange(len(positions)) - np.repeat(first, np.diff(np.r_[first, len(positions)]))
+        top = rank < self.top_n
+        positions, candidates, scores = positions[top], candidates[top], scores[top]
+        logger.info(f'Matched {len(np.unique(positions))} of {len(queries)} query spectra against the library.')
+        return pd.DataFrame({'Spectrum ID': [queries[position]['key'] for position in positions],
+                             'Peptide ID m/z': np.round(precursor_mz[positions], 2),
+                             'Peptide ID rt': np.round([queries[position]['retention_time'] for position in positions],
+                                                       2),
+                             'Peptide hit sequence': self.library['names'][candidates],
+                             'Peptide hit score': np.round(scores, 2)}, columns=LIBRARY_COLUMNS)
+
+    def library_wrapper(self) -> Tuple[pd.DataFrame, list]:
+        """
+        Wrapper function to create a dataframe with library matches, in the layout of PeptideSearch.peptide_wrapper
+        Returns
+        ----------
+        library_df : dataframe
+            Dataframe of library hits.
+        peptide_list : list
+            List of the names of the matched library spectra.
+        """
+        library_df = self.library_search()
+        library_df.insert(0, 'Hit_id', np.arange(len(library_df)))
+        return library_df, list(library_df['Peptide hit sequence'])
@@ -0,0 +1,106 @@
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class PeakBuffer(Mapping):
+    """Read-only mapping of spectrum ids to decoded m/z and intensity arrays, stored as one contiguous buffer per
+    array type in the precision of the file plus an int64 offsets array. Every spectrum is a zero-copy view into the
+    buffers, so a run costs 8 (32-bit) or 16 (64-bit) bytes per peak and a few bytes per spectrum.
+    """
+
+    def __init__(self, keys: np.ndarray, has_data: np.ndarray, offsets: np.ndarray, mz: np.ndarray,
+                 intensity: np.ndarray):
+        """
+        parameters:
+            keys = spectrum ids in file order
+            has_data = False for spectra without binary arrays, returned with None values
+            offsets = start of every spectrum in the buffers followed by the total number of peaks
+            mz = concatenated m/z values of all spectra
+            intensity = concatenated intensity values of all spectra
+        """
+        self.keys_array = keys
+        self.has_data = has_data
+        self.offsets = offsets
+        self.mz = mz
+        self.intensity = intensity
+        self.positions = {key: position for position, key in enumerate(keys.tolist())}
+
+    def __repr__(self) -> str:
+        return (f'PeakBuffer({len(self)} spectra, {len(self.mz)} peaks, {self.mz.dtype}/{self.intensity.dtype}, '
+                f'{self.nbytes / 1e6:.1f} MB)')
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.positions)
+
+    def __getitem__(self, key) -> Dict[str, Optional[np.ndarray]]:
+        position = self.positions[key]
+        if not self.has_data[position]:
+            return {'mz': None, 'intensity': None}
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return {'mz': self.mz[start:end], 'intensity': self.intensity[start:end]}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays of the buffer."""
+        return sum(array.nbytes for array in (self.keys_array, self.has_data, self.offsets, self.mz, self.intensity))
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[int, Dict[str, Optional[np.ndarray]]]],
+                   capacity: int = 1 << 16) -> 'PeakBuffer':
+        """Builds a buffer from (spectrum id, decoded arrays) pairs, e.g. straight from a decoding generator. The
+        buffers grow geometrically, so the decoded arrays of a spectrum can be freed as soon as it is appended.
+
+        Parameters
+        ----------
+        items: Iterable[Tuple[int, Dict[str, Optional[np.ndarray]]]]
+            spectrum ids and dictionaries with the decoded 'mz' and 'intensity' values
+        capacity: int
+            initial number of peaks of the buffers
+
+        Returns
+        -------
+        buffer: PeakBuffer
+            the compact buffer of all spectra
+        """
+        keys, has_data, lengths = list(), list(), list()
+        buffers = {'mz': None, 'intensity': None}
+        size = 0
+        for key, data in items:
+            keys.append(key)
+            has_data.append(data['mz'] is not None)
+            length = len(data['mz']) if data['mz'] is not None else 0
+            lengths.append(length)
+            if length == 0:
+                continue
+            for name, buffer in buffers.items():
+                array = data[name]
+                dtype = array.dtype.newbyteorder('=')
+                if buffer is None:
+                    buffer = np.empty(max(capacity, length), dtype=dtype)
+                elif np.result_type(buffer.dtype, dtype) != buffer.dtype:
+                    buffer = buffer.astype(np.result_type(buffer.dtype, dtype))
+                if size + length > len(buffer):
+                    grown = np.empty(max(2 * len(buffer), size + length), dtype=buffer.dtype)
+                    grown[:size] = buffer[:size]
+                    buffer = grown
+                buffer[size:size + length] = array
+                buffers[name] = buffer
+            size += length
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        for name, buffer in buffers.items():
+            if buffer is None:
+                buffers[name] = np.zeros(0)
+            else:
+                buffer.resize(size, refcheck=False)  # releases the unused capacity without copying
+        mz, intensity = buffers['mz'], buffers['intensity']
+        return cls(np.array(keys, dtype=np.int64), np.array(has_data, dtype=bool), offsets, mz, intensity)
@@ -0,0 +1,395 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import argparse
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ms_package.cache import DiskCache
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# monoisotopic masses of the amino acid residues
+RESIDUE_MASSES = {'G': 57.02146372, 'A': 71.03711379, 'S': 87.03202841, 'P': 97.05276385, 'V': 99.06841391,
+                  'T': 101.04767847, 'C': 103.00918478, 'L': 113.08406398, 'I': 113.08406398, 'N': 114.04292744,
+                  'D': 115.02694303, 'Q': 128.05857751, 'K': 128.09496302, 'E': 129.04259309, 'M': 131.04048491,
+                  'H': 137.05891186, 'F': 147.06841391, 'U': 150.95363559, 'R': 156.10111103, 'Y': 163.06332853,
+                  'W': 186.07931295, 'O': 237.14772686}
+WATER_MASS = 18.0105646837
+PROTON_MASS = 1.007276466771
+C13_MASS_DIFFERENCE = 1.0033548378
+# enzymes of the OpenMS protease database without a cleavage rule of their own
+UNSPECIFIC_CLEAVAGE = 'unspecific cleavage'
+NO_CLEAVAGE = 'no cleavage'
+
+
+def read_fasta(fasta_path: str) -> Iterator[Tuple[str, str]]:
+    """Reads the proteins of a FASTA file.
+
+    Parameters
+    ----------
+    fasta_path: str
+        file path of the FASTA file
+
+    Yields
+    -------
+    protein: Tuple[str, str]
+        accession, i.e. the first word of the header, and upper case sequence of every protein
+    """
+    accession, lines = None, list()
+    with open(fasta_path) as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('>'):
+                if accession is not None:
+                    yield accession, ''.join(lines).upper()
+                accession, lines = (line[1:].split() or [''])[0], list()
+            elif line and accession is not None:
+                lines.append(line.rstrip('*'))
+    if accession is not None:
+        yield accession, ''.join(lines).upper()
+
+
+def get_cleavage(enzyme: str) -> Optional[re.Pattern]:
+    """Returns the cleavage rule of an enzyme of the OpenMS protease database, e.g. (?<=[KRX])(?!P) for Trypsin.
+
+    Parameters
+    ----------
+    enzyme: str
+        name of the enzyme
+
+    Returns
+    -------
+    cleavage: Optional[re.Pattern]
+        pattern matching the cleavage sites, None for unspecific cleavage
+
+    Raises
+    -------
+    argparse.ArgumentTypeError: if the enzyme is unknown
+    """
+    import pyopenms
+    names = list()
+    pyopenms.ProteaseDB().getAllNames(names)
+    names = [name.decode() if isinstance(name, bytes) else name for name in names]
+    if enzyme not in names:
+        logger.warning(f'The enzyme {enzyme} is not valid.')
+        raise argparse.ArgumentTypeError(f'Please pass an enzyme of {", ".join(sorted(names))}.')
+    if enzyme == UNSPECIFIC_CLEAVAGE:
+        return None
+    if enzyme == NO_CLEAVAGE:
+        return re.compile(r'(?!)')  # never matches
+    regex = pyopenms.ProteaseDB().getEnzyme(enzyme).getRegEx()
+    return re.compile(regex.decode() if isinstance(regex, bytes) else regex)
+
+
+def digest(sequence: str, cleavage: Optional[re.Pattern], missed_cleavages: int = 1, min_length: int = 7,
+           max_length: int = 40) -> List[str]:
+    """Digests a protein sequence in silico.
+
+    Parameters
+    ----------
+    sequence: str
+        protein sequence
+    cleavage: Optional[re.Pattern]
+        pattern matching the cleavage sites as returned by get_cleavage, None for unspecific cleavage
+    missed_cleavages: int
+        maximum number of uncleaved sites within a peptide
+    min_length: int
+        shorter peptides are dropped
+    max_length: int
+        longer peptides are dropped
+
+    Returns
+    -------
+    peptides: List[str]
+        peptide sequences in order of their position in the protein
+    """
+    if cleavage is None:
+        return [sequence[start:start + length] for start in range(len(sequence))
+                for length in range(min_length, min(max_length, len(sequence) - start) + 1)]
+    sites = sorted({0, len(sequence)} | {match.start() for match in cleavage.finditer(sequence)
+                                         if 0 < match.start() < len(sequence)})
+    peptides = list()
+    for first in range(len(sites) - 1):
+        for last in range(first + 1, min(first + missed_cleavages + 2, len(sites))):
+            if min_length <= sites[last] - sites[first] <= max_length:
+                peptides.append(sequence[sites[first]:sites[last]])
+    return peptides
+
+
+def get_modification(name: str) -> Tuple[str, float, bool]:
+    """Looks a modification up in the OpenMS modification database.
+
+    Parameters
+    ----------
+    name: str
+        full name of the modification, e.g. 'Carbamidomethyl (C)'
+
+    Returns
+    -------
+    modification: Tuple[str, float, bool]
+        residue the modification is specific to ('X' for any), monoisotopic mass difference and whether the
+        modification is restricted to a peptide or protein terminus
+    """
+    import pyopenms
+    modification = pyopenms.ModificationsDB().getModification(name)
+    origin = modification.getOrigin()
+    origin = origin.decode() if isinstance(origin, bytes) else str(origin)
+    terminal = modification.getTermSpecificity() != pyopenms.ResidueModification.TermSpecificity.ANYWHERE
+    return origin, modification.getDiffMonoMass(), terminal
+
+
+def get_residue_masses(fixed_modifications: Sequence[str] = ()) -> np.ndarray:
+    """Returns a lookup table of residue masses by ASCII code with the fixed residue modifications applied, NaN for
+    letters without a defined mass, e.g. ambiguous residues. Terminal modifications are not applied.
+
+    Parameters
+    ----------
+    fixed_modifications: Sequence[str]
+        full names of the fixed modifications
+
+    Returns
+    -------
+    residue_masses: np.ndarray
+        array of 256 monoisotopic residue masses
+    """
+    residue_masses = np.full(256, np.nan)
+    for residue, mass in RESIDUE_MASSES.items():
+        residue_masses[ord(residue)] = mass
+    for name in fixed_modifications:
+        origin, difference, terminal = get_modification(name)
+        if terminal or origin not in RESIDUE_MASSES:
+            logger.info(f'The terminal modification {name} is not applied to the peptide masses.')
+            continue
+        residue_masses[ord(origin)] += difference
+    return residue_masses
+
+
+def compute_masses(residues: np.ndarray, offsets: np.ndarray, residue_masses: np.ndarray) -> np.ndarray:
+    """Computes the monoisotopic masses of concatenated peptide sequences with one segment reduction.
+
+    Parameters
+    ----------
+    residues: np.ndarray
+        concatenated ASCII codes of the peptide sequences, uint8
+    offsets: np.ndarray
+        start of every peptide followed by the total number of residues
+    residue_masses: np.ndarray
+        lookup table of residue masses by ASCII code, as returned by get_residue_masses
+
+    Returns
+    -------
+    masses: np.ndarray
+        neutral monoisotopic mass of every peptide, NaN for peptides with residues without a defined mass
+    """
+    if len(offsets) < 2:
+        return np.zeros(0)
+    return np.add.reduceat(residue_masses[residues], offsets[:-1]) + WATER_MASS
+
+
+class PeptideIndex:
+    """Precursor mass index of the peptides of a FASTA in-silico digestion.
+
+    The unique peptides are sorted by monoisotopic mass, so the candidates of a precursor are found with two binary
+    searches. Sequences are stored as one contiguous byte buffer plus an offsets array; a saved index is loaded as
+    memory maps and can be shared by any number of searches against the same proteome.
+    """
+
+    def __init__(self, masses: np.ndarray, offsets: np.ndarray, residues: np.ndarray, proteins: np.ndarray,
+                 accessions: List[str]):
+        """
+        parameters:
+            masses = sorted neutral monoisotopic masses of the peptides
+            offsets = start of every peptide in residues followed by the total number of residues
+            residues = concatenated ASCII codes of the peptide sequences in mass order
+            proteins = position in accessions of the first protein of every peptide
+            accessions = accessions of the proteins of the FASTA file
+        """
+        self.masses = masses
+        self.offsets = offsets
+        self.residues = residues
+        self.proteins = proteins
+        self.accessions = accessions
+
+    def __repr__(self) -> str:
+        return f'PeptideIndex({len(self)} peptides of {len(self.accessions)} proteins)'
+
+    def __len__(self) -> int:
+        return len(self.masses)
+
+    def get_sequence(self, position: int) -> str:
+        """Returns the sequence of the peptide at a position of the index."""
+        return self.residues[self.offsets[position]:self.offsets[position + 1]].tobytes().decode()
+
+    def get_sequences(self, positions: Sequence[int]) -> List[str]:
+        """Returns the sequences of the peptides at positions of the index."""
+        return [self.get_sequence(position) for position in positions]
+
+    def get_bounds(self, masses: np.ndarray, tolerances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds the candidate ranges of many neutral masses at once with binary searches.
+
+        Parameters
+        ----------
+        masses: np.ndarray
+            neutral precursor masses
+        tolerances: np.ndarray
+            absolute mass tolerances in Da
+
+        Returns
+        -------
+        bounds: Tuple[np.ndarray, np.ndarray]
+            first and one past the last index position of the candidates of every mass
+        """
+        masses = np.asarray(masses, dtype=np.float64)
+        lows = np.searchsorted(self.masses, masses - tolerances, side='left')
+        highs = np.searchsorted(self.masses, masses + tolerances, side='right')
+        return lows, highs
+
+    def get_candidates(self, mass: float, tolerance: float = 10.0, unit: str = 'ppm') -> np.ndarray:
+        """Returns the index positions of the peptides within the tolerance of a neutral precursor mass.
+
+        Parameters
+        ----------
+        mass: float
+            neutral monoisotopic precursor mass
+        tolerance: float
+            mass tolerance
+        unit: str
+            'ppm' or 'Da'
+
+        Returns
+        -------
+        candidates: np.ndarray
+            index positions of the candidates, in mass order
+        """
+        if unit not in ('ppm', 'Da'):
+            raise ValueError(f"unit must be 'ppm' or 'Da', got {unit!r}")
+        tolerance = mass * tolerance * 1e-6 if unit == 'ppm' else tolerance
+        lows, highs = self.get_bounds(np.array([mass]), np.array([tolerance]))
+        return np.arange(lows[0], highs[0])
+
+    @classmethod
+    def build(cls, fasta_path: str, enzyme: str = 'Trypsin', missed_cleavages: int = 1, min_length: int = 7,
+              max_length: int = 40, fixed_modifications: Sequence[str] = ()) -> 'PeptideIndex':
+        """Digests all proteins of a FASTA file and indexes the unique peptides by mass.
+
+        Parameters
+        ----------
+        fasta_path: str
+            file path of the FASTA file
+        enzyme: str
+            enzyme of the OpenMS protease database
+        missed_cleavages: int
+            maximum number of uncleaved sites within a peptide
+        min_length: int
+            shorter peptides are dropped
+        max_length: int
+            longer peptides are dropped
+        fixed_modifications: Sequence[str]
+            full names of the fixed modifications applied to the residue masses
+
+        Returns
+        -------
+        index: PeptideIndex
+            the index of the peptides, held in memory
+        """
+        cleavage = get_cleavage(enzyme)
+        accessions, first_protein = list(), dict()
+        for position, (accession, sequence) in enumerate(read_fasta(fasta_path)):
+            accessions.append(accession)
+            for peptide in digest(sequence, cleavage, missed_cleavages, min_length, max_length):
+                first_protein.setdefault(peptide, position)
+        peptides = list(first_protein)
+        lengths = np.fromiter((len(peptide) for peptide in peptides), dtype=np.int64, count=len(peptides))
+        offsets = np.zeros(len(peptides) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        residues = np.frombuffer(''.join(peptides).encode('ascii', errors='replace'), dtype=np.uint8)
+        masses = compute_masses(residues, offsets, get_residue_masses(fixed_modifications))
+        proteins = np.fromiter(first_protein.values(), dtype=np.int32, count=len(peptides))
+
+        order = np.argsort(masses, kind='stable')
+        order = order[~np.isnan(masses[order])]  # peptides with ambiguous residues have no mass
+        lengths = lengths[order]
+        sorted_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=sorted_offsets[1:])
+        starts = np.repeat(offsets[:-1][order] - sorted_offsets[:-1], lengths)
+        sorted_residues = residues[np.arange(sorted_offsets[-1]) + starts]
+        index = cls(masses[order], sorted_offsets, sorted_residues, proteins[order], accessions)
+        logger.info(f'Built {index} of {fasta_path} with {enzyme} and {missed_cleavages} missed cleavages.')
+        return index
+
+    def save(self, directory: str):
+        """Saves the index as .npy files and a JSON file of the protein accessions."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ('masses', 'offsets', 'residues', 'proteins'):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'accessions.json'), 'w') as file:
+            json.dump(self.accessions, file)
+
+    @classmethod
+    def load(cls, directory: str) -> 'PeptideIndex':
+        """Loads a saved index with memory-mapped arrays."""
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                  for name in ('masses', 'offsets', 'residues', 'proteins')}
+        with open(os.path.join(directory, 'accessions.json')) as file:
+            accessions = json.load(file)
+        return cls(accessions=accessions, **arrays)
+
+
+class PeptideDatabase(DiskCache):
+    """Stores peptide indexes on disk, keyed by the content hash of the FASTA file and the digestion parameters, so
+    a proteome is digested once and its index is memory-mapped by every later search."""
+
+    default_dir = 'peptides'
+
+    def index_key(self, fasta_path: str, enzyme: str, missed_cleavages: int, min_length: int, max_length: int,
+                  fixed_modifications: Sequence[str]) -> str:
+        """Returns the key of an index, the SHA-1 hash of the FASTA file key and the digestion parameters."""
+        content = json.dumps({'fasta': self.file_key(fasta_path), 'enzyme': enzyme,
+                              'missed_cleavages': missed_cleavages, 'min_length': min_length,
+                              'max_length': max_length, 'fixed_modifications': sorted(fixed_modifications)},
+                             sort_keys=True)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def get_index(self, fasta_path: str, enzyme: str = 'Trypsin', missed_cleavages: int = 1, min_length: int = 7,
+                  max_length: int = 40, fixed_modifications: Sequence[str] = ()) -> PeptideIndex:
+        """Loads the index of a FASTA file and digestion, building and storing it on first use.
+
+        Parameters
+        ----------
+        fasta_path: str
+            file path of the FASTA file
+        enzyme: str
+            enzyme of the OpenMS protease database
+        missed_cleavages: int
+            maximum number of uncleaved sites within a peptide
+        min_length: int
+            shorter peptides are dropped
+        max_length: int
+            longer peptides are dropped
+        fixed_modifications: Sequence[str]
+            full names of the fixed modifications applied to the residue masses
+
+        Returns
+        -------
+        index: PeptideIndex
+            the memory-mapped index
+        """
+        parameters = (enzyme, missed_cleavages, min_length, max_length, list(fixed_modifications))
+        key = self.index_key(str(fasta_path), *parameters)
+        directory = self.entry_dir(key)
+        if not os.path.isdir(directory):
+            index = PeptideIndex.build(str(fasta_path), *parameters)
+            temporary = self.temporary_dir()
+            index.save(temporary)
+            self.publish(temporary, directory)
+            logger.info(f'Stored the peptide index of {fasta_path} under {directory}')
+            self.evict()
+            if not os.path.isdir(directory):  # the index alone is larger than max_size
+                return index
+        os.utime(directory)  # marks the entry as recently used
+        return PeptideIndex.load(directory)
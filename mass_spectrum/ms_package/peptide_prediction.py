@@ -3,23 +3,341 @@ from pyopenms import *
 import pandas as pd
 import numpy as np
 import logging
+import os
+import argparse
+import tempfile
+from contextlib import ExitStack
+from itertools import combinations_with_replacement
+from concurrent.futures import ProcessPoolExecutor
+
+from ms_package.startup import DATA_DIR
+from ms_package.reader import Reader
+from ms_package.cache import SearchCache
+from ms_package.centroid import centroid_peaks
+from ms_package.summary import concatenate_peaks
+from ms_package.peptide_db import PROTON_MASS, C13_MASS_DIFFERENCE, PeptideDatabase, PeptideIndex, \
+    get_modification
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+SHARD_MODES = ('mz', 'round_robin')
+PEPTIDE_COLUMNS = ['Hit_id', 'Peptide ID', 'Peptide ID m/z', 'Peptide ID rt', 'Peptide hit rank',
+                   'Peptide hit sequence', 'Peptide hit score', 'Peptide hit charge', 'Protein accessions']
+PREFILTER_MARGIN = 0.01  # Da added to the precursor tolerance of the prefilter, covers rounding of mass tables
+# SimpleSearchEngineAlgorithm parameters exposed by PeptideSearch, by keyword
+SEARCH_PARAMETERS = {'precursor_tolerance': 'precursor:mass_tolerance',
+                     'precursor_tolerance_unit': 'precursor:mass_tolerance_unit',
+                     'fragment_tolerance': 'fragment:mass_tolerance',
+                     'fragment_tolerance_unit': 'fragment:mass_tolerance_unit',
+                     'enzyme': 'enzyme',
+                     'missed_cleavages': 'peptide:missed_cleavages',
+                     'fixed_modifications': 'modifications:fixed',
+                     'variable_modifications': 'modifications:variable',
+                     'top_hits': 'report:top_hits'}
+
+
+def get_engine(parameters: Dict = None) -> SimpleSearchEngineAlgorithm:
+    """Creates a SimpleSearchEngineAlgorithm with the given search parameters in place of its defaults.
+
+    Parameters
+    ----------
+    parameters: Dict
+        values by SEARCH_PARAMETERS keyword, e.g. {'precursor_tolerance': 5.0, 'missed_cleavages': 2}
+
+    Returns
+    -------
+    engine: SimpleSearchEngineAlgorithm
+        the configured search engine
+
+    Raises
+    -------
+    argparse.ArgumentTypeError: if OpenMS rejects a value, e.g. an unknown enzyme or modification
+    """
+    engine = SimpleSearchEngineAlgorithm()
+    if not parameters:
+        return engine
+    param = engine.getParameters()
+    for name, value in parameters.items():
+        if isinstance(value, (list, tuple)):
+            value = [item.encode() for item in value]
+        elif isinstance(value, str):
+            value = value.encode()
+        param[SEARCH_PARAMETERS[name].encode()] = value
+    try:
+        engine.setParameters(param)
+    except RuntimeError as error:
+        logger.warning(f'The search parameters are not valid: {error}')
+        raise argparse.ArgumentTypeError(f'Please pass valid search parameters: {error}')
+    return engine
+
+
+def get_engine_parameters(parameters: Dict = None) -> Dict:
+    """Returns all SimpleSearchEngineAlgorithm parameters with the given search parameters in place of the defaults,
+    with the byte strings of older pyopenms versions decoded.
+
+    Parameters
+    ----------
+    parameters: Dict
+        values by SEARCH_PARAMETERS keyword
+
+    Returns
+    -------
+    engine_parameters: Dict
+        values by OpenMS parameter name, e.g. 'precursor:mass_tolerance'
+    """
+    def decode(value):
+        if isinstance(value, bytes):
+            return value.decode()
+        if isinstance(value, list):
+            return [decode(item) for item in value]
+        return value
+
+    return {decode(key): decode(value) for key, value in get_engine(parameters).getParameters().asDict().items()}
+
+
+def search_shard(shard_path: str, fasta_path: str, id_path: str, parameters: Dict = None) -> str:
+    """Searches one spectrum shard in a worker process. pyopenms identifications cannot be pickled, so they are
+    handed back to the parent process as idXML file.
+
+    Parameters
+    ----------
+    shard_path: str
+        mzML file of the shard
+    fasta_path: str
+        file path of the input fasta file
+    id_path: str
+        idXML file the protein and peptide identifications are stored in
+    parameters: Dict
+        search parameters by SEARCH_PARAMETERS keyword
+
+    Returns
+    -------
+    id_path: str
+        the written idXML file
+    """
+    protein_ids, peptide_ids = list(), list()
+    get_engine(parameters).search(shard_path, fasta_path, protein_ids, peptide_ids)
+    IdXMLFile().store(id_path, protein_ids, peptide_ids)
+    return id_path
+
 
 class PeptideSearch:
     """Compares experimental mass spectrums from
     mzml file and fasta file to obtain peptide and peptide values."""
 
-    def __init__(self, fasta_path: str, mzml_path: str):
+    def __init__(self, fasta_path: str, mzml_path: str, centroid: bool = False, workers: int = 1,
+                 shards: int = None, shard_by: str = 'mz', cache: bool = False, parameters: Dict = None,
+                 experiment: MSExperiment = None, prefilter: bool = False):
         """
         parameters:
             fasta_path = file path of input fasta file
             mzml_path = file path of input mzml file consisting of mass spectrums
+            centroid = when True, profile spectra are centroided before the search
+            workers = number of processes searching spectrum shards at the same time
+            shards = number of shards the MS2 spectra are split into, one per worker if None
+            shard_by = 'mz' for contiguous precursor m/z ranges or 'round_robin' to deal the spectra out in file order
+            cache = when True, search results are cached on disk and repeated searches are loaded from the cache
+            parameters = search parameters by SEARCH_PARAMETERS keyword, the OpenMS defaults are used for the others
+            experiment = the run of mzml_path already loaded with pyopenms, which is then centroided and sharded in
+                         memory instead of being read from disk again
+            prefilter = when True, MS2 spectra without any candidate peptide in the precursor mass index of the FASTA
+                        file are dropped before the search
         """
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f'shard_by must be one of {SHARD_MODES}, got {shard_by!r}')
+        unknown = set(parameters or ()) - set(SEARCH_PARAMETERS)
+        if unknown:
+            raise ValueError(f'parameters must be among {tuple(SEARCH_PARAMETERS)}, got {sorted(unknown)}')
         self.fasta_path = fasta_path
         self.mzml_path = mzml_path
+        self.centroid = centroid
+        self.workers = workers
+        self.shards = shards if shards is not None else workers
+        self.shard_by = shard_by
+        self.cache = SearchCache() if cache else None  # on-disk cache of search results, used by peptide_wrapper
+        self.parameters = dict(parameters or {})
+        self.experiment = experiment
+        self.search_experiment = None  # in-memory run of the search file, set in get_search_path
+        self.prefilter = prefilter
+
+    def get_parameters(self) -> Dict:
+        """Returns the parameters that change the search results: centroiding, the OpenMS version, all
+        SimpleSearchEngineAlgorithm parameters including the overridden ones and the columns of the hit table.
+        Workers and shards are left out, as a sharded search returns the results of a single search.
+
+        Returns
+        -------
+        parameters : dict
+            JSON serializable search parameters, part of the cache key of the search
+        """
+        return {'centroid': self.centroid, 'openms': str(VersionInfo.getVersion()),
+                'engine': get_engine_parameters(self.parameters), 'columns': PEPTIDE_COLUMNS}
+
+    def get_search_path(self) -> str:
+        """Returns the mzML file to search. With centroid set, a centroided copy of the input file is written under
+        DATA_DIR, which shrinks profile data by about an order of magnitude before the search. A run passed as
+        experiment is centroided in memory and kept as search_experiment for the shards.
+
+        Returns
+        -------
+        search_path : str
+            path of the mzML file passed to SimpleSearchEngineAlgorithm
+        """
+        if not self.centroid:
+            self.search_experiment = self.experiment
+            return self.mzml_path
+        directory = os.path.join(DATA_DIR, 'centroided')
+        os.makedirs(directory, exist_ok=True)
+        search_path = os.path.join(directory, os.path.basename(self.mzml_path).replace('.mzML', '.centroided.mzML'))
+        if self.experiment is None:
+            return Reader(self.mzml_path).write_centroided(search_path)
+        self.search_experiment = self.centroid_experiment(self.experiment)
+        MzMLFile().store(search_path, self.search_experiment)
+        logger.info(f'Wrote centroided spectra of {self.mzml_path} to {search_path}')
+        return search_path
+
+    @staticmethod
+    def centroid_experiment(experiment: MSExperiment) -> MSExperiment:
+        """Centroids the profile spectra of an in-memory run in a single bulk pass, like Reader.centroid_spectra.
+
+        Parameters
+        ----------
+        experiment: MSExperiment
+            run loaded with pyopenms, left unchanged
+
+        Returns
+        -------
+        centroided : MSExperiment
+            copy of the run with centroided profile spectra
+        """
+        centroided = MSExperiment(experiment)
+        spectra = centroided.getSpectra()
+        profile = [spectrum for spectrum in spectra if spectrum.getType() == SpectrumSettings.SpectrumType.PROFILE]
+        if not profile:
+            return centroided
+        mz, intensity, offsets = centroid_peaks(*concatenate_peaks([spectrum.get_peaks() for spectrum in profile]))
+        for position, spectrum in enumerate(profile):
+            start, end = offsets[position], offsets[position + 1]
+            spectrum.set_peaks((mz[start:end], intensity[start:end].astype(np.float32)))
+            spectrum.setType(SpectrumSettings.SpectrumType.CENTROID)
+        centroided.setSpectra(spectra)
+        logger.info(f'Centroided {len(profile)} profile spectra in memory.')
+        return centroided
+
+    def write_shards(self, search_path: str, directory: str) -> Tuple[List[str], Dict[str, int]]:
+        """Splits the MS2 spectra of the search file into shards, either into contiguous precursor m/z ranges of
+        equal size or round-robin. Every shard keeps its spectra in file order; MS1 spectra are not searched and
+        are left out.
+
+        Parameters
+        ----------
+        search_path: str
+            mzML file to search
+        directory: str
+            directory the shard mzML files are written to
+
+        Returns
+        -------
+        shard_paths : list
+            mzML file of every non-empty shard
+        positions : dict
+            position in the search file of every MS2 spectrum native id, used to merge the shard results
+        """
+        experiment = self.search_experiment
+        if experiment is None:
+            experiment = MSExperiment()
+            MzMLFile().load(search_path, experiment)
+        spectra = [spectrum for spectrum in experiment.getSpectra() if spectrum.getMSLevel() == 2]
+        positions = {str(spectrum.getNativeID()): position for position, spectrum in enumerate(spectra)}
+        if self.shard_by == 'mz':
+            precursor_mz = np.array([spectrum.getPrecursors()[0].getMZ() if spectrum.getPrecursors() else 0.0
+                                     for spectrum in spectra])
+            parts = np.array_split(np.argsort(precursor_mz, kind='stable'), self.shards)
+        else:
+            parts = [np.arange(shard, len(spectra), self.shards) for shard in range(self.shards)]
+        shard_paths = list()
+        for shard, part in enumerate(parts):
+            if not len(part):
+                continue
+            shard_experiment = MSExperiment()
+            shard_experiment.setSpectra([spectra[position] for position in np.sort(part)])
+            shard_path = os.path.join(directory, f'shard{shard}.mzML')
+            MzMLFile().store(shard_path, shard_experiment)
+            shard_paths.append(shard_path)
+        logger.info(f'Split {len(spectra)} MS2 spectra into {len(shard_paths)} shards by {self.shard_by}')
+        return shard_paths, positions
+
+    @staticmethod
+    def merge_results(results: List[Tuple[list, list]], positions: Dict[str, int]) -> Tuple[list, list]:
+        """Merges the identifications of the shards deterministically: peptide identifications are put back in
+        the order of their spectra in the search file and the protein hits of all shards are combined, in accession
+        order, into the first protein identification run, which all peptide identifications then refer to.
+
+        Parameters
+        ----------
+        results: list
+            protein ids and peptide ids of every shard
+        positions: dict
+            position of every MS2 spectrum native id in the search file
+
+        Returns
+        -------
+        protein_ids : list
+        peptide_ids : list
+            merged protein id and peptide id lists
+        """
+        def spectrum_order(peptide_id) -> Tuple[float, float, float]:
+            reference = peptide_id.getMetaValue('spectrum_reference') \
+                if peptide_id.metaValueExists('spectrum_reference') else None
+            if isinstance(reference, bytes):
+                reference = reference.decode()
+            return positions.get(reference, np.inf), peptide_id.getRT(), peptide_id.getMZ()
+
+        peptide_ids = sorted((peptide_id for _, shard_peptides in results for peptide_id in shard_peptides),
+                             key=spectrum_order)
+        runs = [protein_id for shard_proteins, _ in results for protein_id in shard_proteins]
+        if not runs:
+            return list(), peptide_ids
+        merged = runs[0]
+        hits = dict()
+        for run in runs:
+            for hit in run.getHits():
+                hits.setdefault(str(hit.getAccession()), hit)
+        merged.setHits([hits[accession] for accession in sorted(hits)])
+        for peptide_id in peptide_ids:
+            peptide_id.setIdentifier(merged.getIdentifier())
+        return [merged], peptide_ids
+
+    def sharded_search(self, search_path: str) -> Tuple[list, list]:
+        """Searches the shards of the search file in parallel worker processes and merges their identifications.
+        SimpleSearchEngineAlgorithm scores every spectrum on its own, so the merged result matches a single search
+        of the whole file.
+
+        Parameters
+        ----------
+        search_path: str
+            mzML file to search
+
+        Returns
+        -------
+        protein_ids : list
+        peptide_ids : list
+            merged protein id and peptide id lists
+        """
+        with tempfile.TemporaryDirectory(prefix='shards-') as directory:
+            shard_paths, positions = self.write_shards(search_path, directory)
+            id_paths = [shard_path.replace('.mzML', '.idXML') for shard_path in shard_paths]
+            with ProcessPoolExecutor(max_workers=max(1, min(self.workers, len(shard_paths)))) as executor:
+                written = list(executor.map(search_shard, shard_paths, [self.fasta_path] * len(shard_paths),
+                                            id_paths, [self.parameters] * len(shard_paths)))
+            results = list()
+            for id_path in written:
+                protein_ids, peptide_ids = list(), list()
+                IdXMLFile().load(id_path, protein_ids, peptide_ids)
+                results.append((protein_ids, peptide_ids))
+        logger.info(f'Searched {len(shard_paths)} shards with {self.workers} workers')
+        return self.merge_results(results, positions)
 
     def peptide_search(self) -> tuple[list, list]:
         """ This method uses SimpleSearchEngineAlgorithm that compares experimental spectrum data from mzml file
@@ -40,12 +358,168 @@ class PeptideSearch:
         if not self.mzml_path and self.fasta_path:
             logger.error('Input files are invalid')
         else:
-            SimpleSearchEngineAlgorithm().search(self.mzml_path, self.fasta_path, protein_ids, peptide_ids)
+            with ExitStack() as stack:
+                search_path = self.get_search_path()
+                if self.prefilter:
+                    directory = stack.enter_context(tempfile.TemporaryDirectory(prefix='prefilter-'))
+                    search_path = self.write_prefiltered(search_path, directory)
+                if self.shards > 1:
+                    protein_ids, peptide_ids = self.sharded_search(search_path)
+                else:
+                    get_engine(self.parameters).search(search_path, self.fasta_path, protein_ids, peptide_ids)
             logger.info('mzml file and fasta file exists')
             return protein_ids, peptide_ids
 
+    def get_peptide_index(self) -> PeptideIndex:
+        """Returns the precursor mass index of the FASTA file for the enzyme, missed cleavages, peptide lengths and
+        fixed modifications of the search, built once and memory-mapped from DATA_DIR/peptides afterwards."""
+        engine = get_engine_parameters(self.parameters)
+        return PeptideDatabase().get_index(self.fasta_path, engine['enzyme'], engine['peptide:missed_cleavages'],
+                                           engine['peptide:min_size'], engine['peptide:max_size'],
+                                           engine['modifications:fixed'])
+
+    def get_mass_shifts(self) -> np.ndarray:
+        """Returns every mass difference between a precursor and the unmodified peptide mass in the index that the
+        search engine can match: all combinations of up to the maximum number of variable modifications, the
+        optional terminal fixed modifications and the precursor isotopes of the search.
+
+        Returns
+        -------
+        mass_shifts : np.ndarray
+            unique mass differences in Da
+        """
+        engine = get_engine_parameters(self.parameters)
+        variable = [get_modification(name)[1] for name in engine['modifications:variable']]
+        shifts = {0.0}
+        for count in range(1, engine['modifications:variable_max_per_peptide'] + 1):
+            shifts.update(sum(combination) for combination in combinations_with_replacement(variable, count))
+        for name in engine['modifications:fixed']:
+            _, difference, terminal = get_modification(name)
+            if terminal:
+                shifts.update([shift + difference for shift in shifts])
+        isotopes = np.asarray(engine['precursor:isotopes'], dtype=np.float64) * C13_MASS_DIFFERENCE
+        return np.unique(np.add.outer(np.fromiter(shifts, dtype=np.float64), isotopes).ravel())
+
+    def filter_spectra(self, experiment: MSExperiment) -> MSExperiment:
+        """Keeps the MS2 spectra that have at least one candidate peptide within the precursor tolerance for any
+        charge, modification and isotope the search engine considers, found with binary searches in the peptide
+        index. The engine cannot match the dropped spectra, so the search results stay the same.
+
+        Parameters
+        ----------
+        experiment: MSExperiment
+            run to search
+
+        Returns
+        -------
+        filtered : MSExperiment
+            the MS2 spectra with candidates, in file order
+        """
+        index = self.get_peptide_index()
+        engine = get_engine_parameters(self.parameters)
+        unit, tolerance = engine['precursor:mass_tolerance_unit'], engine['precursor:mass_tolerance']
+        charges = np.arange(engine['precursor:min_charge'], engine['precursor:max_charge'] + 1)
+        shifts = self.get_mass_shifts()
+
+        spectra = [spectrum for spectrum in experiment.getSpectra()
+                   if spectrum.getMSLevel() == 2 and spectrum.getPrecursors()]
+        rows, masses, tolerances = list(), list(), list()
+        for row, spectrum in enumerate(spectra):
+            precursor = spectrum.getPrecursors()[0]
+            charge = precursor.getCharge()
+            for z in ([charge] if charge > 0 else charges):
+                mass = (precursor.getMZ() - PROTON_MASS) * z
+                rows.append(row)
+                masses.append(mass)
+                tolerances.append((precursor.getMZ() * tolerance * 1e-6 if unit == 'ppm' else tolerance) * z)
+        queries = np.repeat(np.array(masses), len(shifts)) - np.tile(shifts, len(masses))
+        lows, highs = index.get_bounds(queries, np.repeat(tolerances, len(shifts)) + PREFILTER_MARGIN)
+        matched = np.zeros(len(spectra), dtype=bool)
+        np.logical_or.at(matched, np.repeat(np.array(rows, dtype=np.int64), len(shifts)), highs > lows)
+
+        filtered = MSExperiment()
+        filtered.setSpectra([spectrum for spectrum, keep in zip(spectra, matched) if keep])
+        logger.info(f'Prefilter kept {int(matched.sum())} of {len(spectra)} MS2 spectra with candidate peptides.')
+        return filtered
+
+    def write_prefiltered(self, search_path: str, directory: str) -> str:
+        """Writes the MS2 spectra of the search file that have candidate peptides, see filter_spectra, and keeps them
+        as search_experiment for the shards.
+
+        Parameters
+        ----------
+        search_path: str
+            mzML file to search
+        directory: str
+            directory the filtered mzML file is written to
+
+        Returns
+        -------
+        filtered_path : str
+            path of the filtered mzML file
+        """
+        experiment = self.search_experiment
+        if experiment is None:
+            experiment = MSExperiment()
+            MzMLFile().load(search_path, experiment)
+        self.search_experiment = self.filter_spectra(experiment)
+        filtered_path = os.path.join(directory, 'prefiltered.mzML')
+        MzMLFile().store(filtered_path, self.search_experiment)
+        return filtered_path
+
     @staticmethod
-    def get_peptide_identification_values(peptide_ids) -> Dict:
+    def extract_hits(peptide_ids, top_n: int = None) -> Tuple[pd.DataFrame, list]:
+        """Extracts all peptide hits of the identifications in a single pass. The hits of every identification are
+        fetched once and written straight into preallocated column arrays, one row per hit.
+
+        Parameters
+        ----------
+        peptide_ids: list
+            List of peptide ids matched with theoretical data obtained from fasta file.
+        top_n: int
+            number of best hits kept per identification, all reported hits if None
+
+        Returns
+        -------
+        peptide_df : dataframe
+            Dataframe of PEPTIDE_COLUMNS with one row per hit, in identification and rank order.
+        peptide_list : list
+            peptide hit sequences of all rows.
+        """
+        if peptide_ids is None:
+            logger.error('SimpleSearchEngineAlgorithm did not identify any peptides')
+            peptide_ids = list()
+        hits = [peptide_id.getHits()[:top_n] for peptide_id in peptide_ids]
+        counts = np.fromiter((len(id_hits) for id_hits in hits), dtype=np.int64, count=len(hits))
+        size = int(counts.sum())
+        identification = np.repeat(np.arange(len(hits)), counts)
+        mz, rt = np.empty(len(hits)), np.empty(len(hits))
+        rank = np.arange(size) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        score, charge = np.empty(size), np.empty(size, dtype=np.int64)
+        sequence, accessions = np.empty(size, dtype=object), np.empty(size, dtype=object)
+        row = 0
+        for position, (peptide_id, id_hits) in enumerate(zip(peptide_ids, hits)):
+            mz[position], rt[position] = peptide_id.getMZ(), peptide_id.getRT()
+            for hit in id_hits:
+                sequence[row] = str(hit.getSequence())
+                score[row] = hit.getScore()
+                charge[row] = hit.getCharge()
+                evidences = [evidence.getProteinAccession() for evidence in hit.getPeptideEvidences()]
+                accessions[row] = ';'.join(dict.fromkeys(accession.decode() if isinstance(accession, bytes)
+                                                         else str(accession) for accession in evidences))
+                row += 1
+        peptide_df = pd.DataFrame({'Hit_id': np.arange(size), 'Peptide ID': identification,
+                                   'Peptide ID m/z': np.round(mz[identification], 2),
+                                   'Peptide ID rt': np.round(rt[identification], 2), 'Peptide hit rank': rank,
+                                   'Peptide hit sequence': sequence, 'Peptide hit score': np.round(score, 2),
+                                   'Peptide hit charge': charge, 'Protein accessions': accessions},
+                                  columns=PEPTIDE_COLUMNS)
+        peptide_list = sequence.tolist()
+        logger.info(f'Extracted {size} peptide hits of {len(hits)} identifications.')
+        return peptide_df, peptide_list
+
+    @classmethod
+    def get_peptide_identification_values(cls, peptide_ids) -> Dict:
         """ Gets peptide data corresponding to a single identified spectrum or feature.
         Each peptide hit stores the information of a specific peptide-to-spectrum match
         (e.g., the score and the peptide sequence)
@@ -58,26 +532,16 @@ class PeptideSearch:
         Returns
         -------
         peptide_info : dict
-            peptide information stored in dictionary.
+            peptide information of every hit stored in dictionary, by Hit_id.
 
         """
-        peptide_info = dict()
-        if peptide_ids is None:
-            logger.error('SimpleSearchEngineAlgorithm did not identify any peptides')
-        else:
-            for index, peptide_id in enumerate(peptide_ids):
-                peptide_subdict = dict()
-                peptide_subdict['Peptide ID m/z'] = float(round(peptide_id.getMZ(), 2))
-                peptide_subdict['Peptide ID rt'] = float(round(peptide_id.getRT(), 2))
-                for hit in peptide_id.getHits():
-                    peptide_subdict['Peptide hit sequence'] = str(hit.getSequence())
-                    peptide_subdict['Peptide hit score'] = float(round(hit.getScore(), 2))
-                peptide_info[index] = peptide_subdict
+        peptide_df = cls.extract_hits(peptide_ids)[0]
+        peptide_info = peptide_df.set_index('Hit_id').to_dict(orient='index')
         logger.info('Algorithm returned peptide properties stored in a dictionary')
         return peptide_info
 
-    @staticmethod
-    def get_sequence(peptide_ids) -> List:
+    @classmethod
+    def get_sequence(cls, peptide_ids) -> List:
         """ Stores the hit protein sequences in a list after comparing experimental and theoretical MS data.
 
         Parameters
@@ -90,13 +554,7 @@ class PeptideSearch:
         peptide_list : list
             peptide hit sequences stored in a list.
         """
-        peptide_list = []
-        if peptide_ids is not None:
-            for peptide_id in peptide_ids:
-                for hit in peptide_id.getHits():
-                    peptide_list.append(str(hit.getSequence()))
-                    logger.info('Hit peptide sequences are stored in a list')
-        return peptide_list
+        return cls.extract_hits(peptide_ids)[1]
 
     def peptide_wrapper(self) -> Tuple[pd.DataFrame, list]:
         """
@@ -108,13 +566,14 @@ class PeptideSearch:
         peptide_list : list
             List of peptide hits.
         """
+        if self.cache is not None:
+            key = self.cache.search_key(self.fasta_path, self.mzml_path, self.get_parameters())
+            cached = self.cache.load(key)
+            if cached is not None:
+                logger.info(f'Loaded peptide hits of {self.mzml_path} from the cache.')
+                return cached
         peptide_ids = self.peptide_search()[1]
-        peptide_info = self.get_peptide_identification_values(peptide_ids=peptide_ids)
-        peptide_df = pd.DataFrame.from_dict(peptide_info, orient='index', columns=['Peptide ID m/z',
-                                                                                   'Peptide ID rt',
-                                                                                   'Peptide hit sequence',
-                                                                                   'Peptide hit score'])
-
-        peptide_df.insert(0, 'Hit_id', np.arange(len(peptide_df)))
-        peptide_list = self.get_sequence(peptide_ids=peptide_ids)
+        peptide_df, peptide_list = self.extract_hits(peptide_ids)
+        if self.cache is not None:
+            self.cache.store(key, peptide_df, peptide_list)
         return peptide_df, peptide_list
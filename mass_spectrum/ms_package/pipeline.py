@@ -0,0 +1,189 @@
+import re
+import logging
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ms_package.reader import SPECTRUM_COLUMNS
+from ms_package.summary import SUMMARY_NAMES, fill_summary
+from ms_package.peptide_prediction import PeptideSearch
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MZXML_NATIVE_ID = re.compile(r'scan=(\d+)')
+
+
+class SearchPipeline:
+    """Runs the spectrum value extraction and the peptide search of an mzML file on a single parse.
+
+    The run is loaded once into an in-memory pyopenms MSExperiment, which is used for the spectrum values, the
+    total ion chromatogram, the in-memory centroiding and the sharding of the search, so no step parses the file
+    again in Python. SimpleSearchEngineAlgorithm only accepts file paths and reads its input natively.
+    """
+
+    def __init__(self, fasta_path: str, mzml_path: str, centroid: bool = False, workers: int = 1, shards: int = None,
+                 shard_by: str = 'mz', cache: bool = False, parameters: Dict = None, prefilter: bool = False):
+        """
+        parameters:
+            fasta_path = file path of input fasta file
+            mzml_path = file path of input mzml file consisting of mass spectrums
+            centroid = when True, profile spectra are centroided before the search
+            workers = number of processes searching spectrum shards at the same time
+            shards = number of shards the MS2 spectra are split into, one per worker if None
+            shard_by = 'mz' for contiguous precursor m/z ranges or 'round_robin' to deal the spectra out in file order
+            cache = when True, search results are cached on disk and repeated searches are loaded from the cache
+            parameters = search parameters by SEARCH_PARAMETERS keyword, the OpenMS defaults are used for the others
+            prefilter = when True, MS2 spectra without candidate peptides in the peptide index are not searched
+        """
+        self.fasta_path = str(fasta_path)
+        self.mzml_path = str(mzml_path)
+        self.format = 'mzxml' if self.mzml_path.lower().endswith('.mzxml') else 'mzml'
+        self.search = PeptideSearch(self.fasta_path, self.mzml_path, centroid=centroid, workers=workers,
+                                    shards=shards, shard_by=shard_by, cache=cache, parameters=parameters,
+                                    prefilter=prefilter)
+        self.experiment = None  # MSExperiment of the run, set in load_experiment
+        self.summary = None  # dataframe of the spectrum values, set in get_summary
+
+    def load_experiment(self):
+        """Loads the run into memory with pyopenms, once per pipeline.
+
+        Returns
+        -------
+        experiment: MSExperiment
+            the in-memory run
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if pyopenms cannot read the file
+        """
+        if self.experiment is not None:
+            return self.experiment
+        import pyopenms
+        experiment = pyopenms.MSExperiment()
+        file_class = pyopenms.MzXMLFile if self.format == 'mzxml' else pyopenms.MzMLFile
+        try:
+            file_class().load(self.mzml_path, experiment)
+        except RuntimeError as error:
+            logger.warning(f'pyopenms could not read {self.mzml_path}: {error}')
+            raise argparse.ArgumentTypeError(f'Please pass a valid mzML or mzXML file, {self.mzml_path} is not.')
+        logger.info(f'Loaded {experiment.getNrSpectra()} spectra of {self.mzml_path} into memory.')
+        self.experiment = experiment
+        self.search.experiment = experiment
+        return experiment
+
+    def get_keys(self) -> List[int]:
+        """Returns the spectrum ids of the run as used by Reader: the index of mzML spectra and the scan number of
+        mzXML scans."""
+        spectra = self.load_experiment().getSpectra()
+        if self.format == 'mzml':
+            return list(range(len(spectra)))
+        keys = list()
+        for position, spectrum in enumerate(spectra):
+            match = MZXML_NATIVE_ID.search(str(spectrum.getNativeID()))
+            keys.append(int(match.group(1)) if match else position + 1)
+        return keys
+
+    def get_spectrum_data(self) -> Dict[int, Dict]:
+        """Returns the peaks of every spectrum in the layout of Reader.spectrum_data.
+
+        Returns
+        -------
+        spectrum_data: Dict[int, Dict]
+            dictionary with spectrum ids as key and the 'mz' and 'intensity' values
+        """
+        spectra = self.load_experiment().getSpectra()
+        spectrum_data = dict()
+        for key, spectrum in zip(self.get_keys(), spectra):
+            mz, intensity = spectrum.get_peaks()
+            spectrum_data[key] = {'mz': mz, 'intensity': intensity}
+        return spectrum_data
+
+    def get_summary(self) -> pd.DataFrame:
+        """Creates the dataframe of base peak m/z, base peak intensity, total ion current, lowest and highest observed
+        m/z from the in-memory run, in the layout of Reader.analyse_spectrum. Values kept by pyopenms as meta values
+        are used as declared, the others are computed in bulk from the peaks.
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
+            lowest and highest observed m/z.
+        """
+        if self.summary is not None:
+            return self.summary
+        spectra = self.load_experiment().getSpectra()
+        keys = self.get_keys()
+        declared = np.full((len(spectra), 5), np.nan)
+        peaks = list()
+        for row, spectrum in enumerate(spectra):
+            for name, position in SUMMARY_NAMES.items():
+                if spectrum.metaValueExists(name):
+                    declared[row, position] = float(spectrum.getMetaValue(name))
+            peaks.append(spectrum.get_peaks() if np.isnan(declared[row]).any() else None)
+        summary = fill_summary(declared, peaks)
+        df_values = pd.DataFrame(np.round(summary, 2), index=pd.Index(keys, dtype=np.int64),
+                                 columns=SPECTRUM_COLUMNS[1:])
+        df_values.insert(0, 'spectra_id', np.arange(len(keys), dtype=np.int64))
+        self.summary = df_values
+        logger.info('Successfully gathered spectrum values.')
+        return df_values
+
+    def get_tic(self) -> pd.DataFrame:
+        """Returns the total ion chromatogram of the run, like Reader.get_tic: the total ion current chromatogram
+        stored in the file, trying the id 'TIC' first, or else the summed intensities of the spectra of all MS
+        levels.
+
+        Returns
+        -------
+        df_tic: pd.DataFrame
+            Dataframe with the retention time in seconds and the 'tic' intensity, in retention time order.
+        """
+        import pyopenms
+        experiment = self.load_experiment()
+        tic_type = pyopenms.ChromatogramSettings.ChromatogramType.TOTAL_ION_CURRENT_CHROMATOGRAM
+        chromatograms = sorted(experiment.getChromatograms(), key=lambda chromatogram: chromatogram.getNativeID()
+                               not in ('TIC', b'TIC'))
+        for chromatogram in chromatograms:
+            if chromatogram.getChromatogramType() == tic_type:
+                time, intensity = chromatogram.get_peaks()
+                return pd.DataFrame({'retention_time': time.astype(np.float64),
+                                     'tic': intensity.astype(np.float64)})
+        spectra = experiment.getSpectra()
+        retention_times = np.array([spectrum.getRT() for spectrum in spectra], dtype=np.float64)
+        totals = np.array([spectrum.get_peaks()[1].sum(dtype=np.float64) for spectrum in spectra])
+        order = np.argsort(retention_times, kind='stable')
+        return pd.DataFrame({'retention_time': retention_times[order], 'tic': totals[order]})
+
+    def peptide_wrapper(self) -> Tuple[pd.DataFrame, list]:
+        """Searches the run, using the in-memory experiment for centroiding and sharding. Cached searches are
+        loaded without loading the run.
+
+        Returns
+        ----------
+        peptide_df : dataframe
+            Dataframe of peptide hits.
+        peptide_list : list
+            List of peptide hits.
+        """
+        if self.search.centroid or self.search.shards > 1 or self.search.prefilter:
+            self.load_experiment()
+        return self.search.peptide_wrapper()
+
+    def run(self) -> Tuple[pd.DataFrame, pd.DataFrame, list]:
+        """Extracts the spectrum values and searches the run.
+
+        Returns
+        -------
+        df_values : pd.DataFrame
+            Dataframe of the spectrum values, as returned by get_summary.
+        peptide_df : dataframe
+            Dataframe of peptide hits.
+        peptide_list : list
+            List of peptide hits.
+        """
+        df_values = self.get_summary()
+        peptide_df, peptide_list = self.peptide_wrapper()
+        return df_values, peptide_df, peptide_list
@@ -1,45 +1,103 @@
 import xml.dom.minidom
+import xml.etree.ElementTree as ET
 from xml.dom import minidom as md
-from typing import List, Dict
+from xml.sax.saxutils import quoteattr, unescape
+from typing import List, Dict, Iterator, Tuple
+import os
+import re
+import gzip
+import json
+import hashlib
 import base64
-import zlib
-import struct
 import logging
+import numpy as np
 import pandas as pd
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
+from ms_package.startup import DATA_DIR
+from ms_package.cache import SpectrumCache
+from ms_package.spectrum import Spectrum
+from ms_package.index import SpectrumIndex
+from ms_package.centroid import PROFILE_SPECTRUM, centroid_peaks
+from ms_package.binning import SpectrumMatrix, bin_peaks
+from ms_package.spill import SpillStore, peak_rss
+from ms_package.peaks import PeakBuffer
+from ms_package.export import PeakWriter, write_table
+from ms_package.headers import HEADER_COLUMNS, SCAN_START_TIME, MS_LEVEL, SELECTED_ION_MZ, CHARGE_STATE, \
+    MINUTE_UNITS, iter_header_segments, parse_duration, read_header
+from ms_package.binary_codecs import classify_param, combine_compressions, decode, get_dtype
+from ms_package.summary import SUMMARY_ACCESSIONS, SUMMARY_NAMES, MZXML_SUMMARY_ATTRIBUTES, fill_summary, \
+    concatenate_peaks
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+TIC_CHROMATOGRAM = 'MS:1000235'
+TIME_ARRAY = 'MS:1000595'
+XSI_NAMESPACE = 'http://www.w3.org/2001/XMLSchema-instance'
+NAMESPACE_DECLARATION = re.compile(rb'xmlns:([A-Za-z_][\w.-]*)\s*=\s*(["\'])(.*?)\2', re.S)
+
+SPECTRUM_COLUMNS = ['spectra_id', 'base_peak_m/z', 'base_peak_intensity', 'total_ion_current', 'lowest_observed_m/z',
+                    'highest_observed_m/z']
+
 
 class Reader:
     """Parses the input mzml/mzXml file and extracts spectrum values."""
-    def __init__(self, path):
+    def __init__(self, path, workers: int = 1, cache: bool = False, max_memory: int = None, compact: bool = False):
         self.path = path  # path to input file
+        self.workers = workers  # number of processes used to decode the binary arrays
+        self.max_memory = max_memory  # bytes of decoded arrays kept in RAM before spilling to a memory-mapped file
+        self.compact = compact  # when True, decoded spectra are views into one contiguous buffer per array type
+        self.cache = SpectrumCache() if cache else None  # on-disk cache of decoded spectra, used by analyse_spectrum
         self.format = None  # can be 'mzml' or 'mzxml', set in check_extension
+        self.gzipped = False  # True for .mzML.gz and .mzXML.gz input files, set in check_extension
         self.compression = None  # contains compression dict for each spectrum
         self.binary_values = None  # contains binary values (m/z and intensity arrays) for each spectrum id
         self.spectrum_data = None  # decoded intensity and m/z array values
         self.values = None  # base peak m/z, base peak intensity, lowest and highest observed m/z and total ion current
+        self.summary = None  # dataframe of the spectrum values, set in get_summary
+        self.offsets = None  # byte offset of each spectrum id in the input file, set in get_offsets
+        self.spectra = None  # lazily decoded Spectrum objects, set in get_lazy_spectra
+        self.index = None  # retention time and m/z range index, set in get_index
+        self.chromatogram_offsets = None  # byte offset of each chromatogram id, set in get_chromatogram_offsets
+        self.centroided = None  # centroided m/z and intensity values of every spectrum, set in centroid_spectra
+        self.namespaces = None  # namespace prefixes declared on the root element, set in get_namespaces
 
     def check_extension(self) -> bool:
-        """Checks if the extension of the parsed file is either .mzML or .mzXML.
+        """Checks if the extension of the parsed file is either .mzML or .mzXML, optionally followed by .gz for
+        gzip-compressed files.
 
         Returns
         -------
         bool: True if extension is allowed
 
         """
-        if self.path.endswith('.mzML'):
+        self.gzipped = str(self.path).endswith('.gz')
+        path = str(self.path)[:-len('.gz')] if self.gzipped else str(self.path)
+        if path.endswith('.mzML'):
             self.format = 'mzml'
             return True
-        elif self.path.endswith('.mzXML'):
+        elif path.endswith('.mzXML'):
             self.format = 'mzxml'
             return True
         else:
             return False
 
+    def open_file(self):
+        """Opens the input file for binary reading. Gzip-compressed files are decompressed on the fly while they are
+        read, so no uncompressed copy is written. Byte offsets of compressed files refer to the decompressed stream.
+
+        Returns
+        -------
+        file:
+            file object of the input file, decompressing if the file is gzip-compressed
+        """
+        if self.gzipped:
+            return gzip.open(self.path, 'rb')
+        return open(self.path, 'rb')
+
     def parse_file(self) -> xml.dom.minidom.Document:
         """Parses the input file and creates minidom object.
 
@@ -53,7 +111,8 @@ class Reader:
         ValueError: if the input file has non-allowed extension
         """
         if self.check_extension():
-            parsed_file = md.parse(self.path)
+            with self.open_file() as file:
+                parsed_file = md.parse(file)
             logger.info(f'Successfully parsed file: {self.path}')
             return parsed_file
         else:
@@ -120,47 +179,72 @@ class Reader:
 
         """
         if self.format == 'mzxml':
-            logger.warning('Extracting compression types is only available for .mzML files.')
-            raise argparse.ArgumentTypeError('Extracting compression types is only available for .mzML files.')
+            compression_mzxml = dict()
+            for key in spectrum_dict:
+                peaks = spectrum_dict[key].getElementsByTagName('peaks')
+                attributes = peaks[0].getAttribute if peaks else (lambda name: '')
+                compression_mzxml[key] = {'peaks': self.get_peaks_compression(attributes('precision'),
+                                                                              attributes('compressionType'),
+                                                                              attributes('byteOrder'))}
+            self.compression = compression_mzxml
+            return
         compression_dict = dict()
         for key in spectrum_dict:
-            params = spectrum_dict[key].getElementsByTagName('binaryDataArray')
-            data = list()
-            for array in params:
-                p = array.getElementsByTagName('cvParam')
-                for e in p:
-                    data.append(e.getAttribute('name'))
-            compression_dict[key] = data
-        compression_list = list()
-        for key in compression_dict:
-            mz = compression_dict[key].index('m/z array')
-            intensity = compression_dict[key].index('intensity array')
-            length = len(compression_dict[key])
-            if mz < intensity:
-                mz_comp = compression_dict[key][:int(length/2)]
-                int_comp = compression_dict[key][int(length/2):]
-            else:
-                int_comp = compression_dict[key][:int(length/2)]
-                mz_comp = compression_dict[key][int(length/2):]
-            compression_list.append([mz_comp, int_comp])
-        dict_final = dict()
-        for key in compression_dict:
-            dict_final[key] = {'mz': dict(), 'intensity': dict()}
-            value_mz = compression_list[key][0]
-            value_int = compression_list[key][1]
-            for val in value_mz:
-                if 'float' in val or 'bit' in val:
-                    dict_final[key]['mz']['data_type'] = val
-                elif 'compression' in val:
-                    dict_final[key]['mz']['compression'] = val
-            for val in value_int:
-                if 'float' in val or 'bit' in val:
-                    dict_final[key]['intensity']['data_type'] = val
-                elif 'compression' in val:
-                    dict_final[key]['intensity']['compression'] = val
-        self.compression = dict_final
+            arrays = self.get_binary_arrays(spectrum_dict[key])
+            compression_dict[key] = {array_type: {name: value for name, value in params.items() if name != 'binary'}
+                                     for array_type, params in arrays.items()}
+        self.compression = compression_dict
         return
 
+    def get_binary_arrays(self, spectrum) -> Dict[str, Dict]:
+        """Classifies the binary data arrays of an mzML spectrum in a single pass over their cvParams. Data type,
+        compression and array type are looked up by accession in the codec registry, so any number of arrays and
+        MS-Numpress compressions are recognised.
+
+        Parameters
+        ----------
+        spectrum: xml.dom.minidom.Element or xml.etree.ElementTree.Element
+            parsed, streamed or randomly accessed spectrum
+
+        Returns
+        -------
+        arrays: Dict[str, Dict]
+            dictionary with the array type ('mz', 'intensity', ...) as key and the 'data_type', 'compression' and
+            encoded 'binary' content of the array as values
+        """
+        if isinstance(spectrum, ET.Element):
+            get = ET.Element.get
+            binary_arrays = spectrum.iter('binaryDataArray')
+        else:
+            get = xml.dom.minidom.Element.getAttribute
+            binary_arrays = spectrum.getElementsByTagName('binaryDataArray')
+        arrays = {'mz': dict(), 'intensity': dict()}
+        for array in binary_arrays:
+            if isinstance(array, ET.Element):
+                cv_params = array.iter('cvParam')
+                binary = array.find('binary')
+                binary = binary.text if binary is not None else None
+            else:
+                cv_params = array.getElementsByTagName('cvParam')
+                binary = array.getElementsByTagName('binary')
+                binary = binary[0].firstChild.nodeValue if binary and binary[0].firstChild is not None else None
+            params = dict()
+            array_type = None
+            compressions = list()
+            for param in cv_params:
+                kind, value = classify_param(get(param, 'accession'), get(param, 'name'))
+                if kind == 'array':
+                    array_type = value
+                elif kind == 'data_type':
+                    params['data_type'] = value
+                elif kind == 'compression':
+                    compressions.append(value)
+            params['compression'] = combine_compressions(compressions)
+            params['binary'] = binary
+            if array_type is not None:
+                arrays[array_type] = params
+        return arrays
+
     def get_binary_spectrum_values(self, spectrum_dict: Dict[int, xml.dom.minidom.Element]):
         """Extracts binary data arrays for each spectrum.
 
@@ -173,57 +257,289 @@ class Reader:
         -------
 
         """
-        if self.format == 'mzxml':
-            logger.warning('Binary data extraction is only available for .mzML files.')
-            raise argparse.ArgumentTypeError('Binary data extraction is only available for .mzML files.')
         vals = dict()
+        if self.format == 'mzxml':
+            for key in spectrum_dict:
+                peaks = spectrum_dict[key].getElementsByTagName('peaks')
+                if spectrum_dict[key].getAttribute('peaksCount') != '0' and peaks and peaks[0].firstChild is not None:
+                    vals[key] = {'peaks': peaks[0].firstChild.nodeValue}
+                else:
+                    vals[key] = {'peaks': None}
+            self.binary_values = vals
+            return
         for key in spectrum_dict:
             if spectrum_dict[key].getAttribute('defaultArrayLength') != '0':
-                mz_array, intensity_array = spectrum_dict[key].getElementsByTagName('binary')
-                vals[key] = {'mz': mz_array.firstChild.nodeValue,
-                             'intensity': intensity_array.firstChild.nodeValue}
+                arrays = self.get_binary_arrays(spectrum_dict[key])
+                vals[key] = {array_type: params.get('binary') for array_type, params in arrays.items()}
             else:
                 vals[key] = {'mz': None, 'intensity': None}
         self.binary_values = vals
         return
 
+    @staticmethod
+    def get_peaks_compression(precision: str, compression_type: str, byte_order: str) -> Dict[str, str]:
+        """Translates the attributes of an mzXML peaks element into the data type and compression names used for
+        mzML binary arrays.
+
+        Parameters
+        ----------
+        precision: str
+            'precision' attribute, '32' or '64'
+        compression_type: str
+            'compressionType' attribute, 'zlib' or 'none'
+        byte_order: str
+            'byteOrder' attribute, 'network' by default
+
+        Returns
+        -------
+        compression: Dict[str, str]
+            dictionary with 'data_type', 'compression' and 'byte_order'
+        """
+        return {'data_type': '64-bit float' if precision == '64' else '32-bit float',
+                'compression': 'zlib compression' if compression_type == 'zlib' else 'no compression',
+                'byte_order': byte_order or 'network'}
+
+    @staticmethod
+    def decode_array(encoded_data: str, compression: str, data_type: str, byte_order: str = 'little') -> np.ndarray:
+        """Decodes and decompresses a single base64 encoded binary array. The values are returned as a NumPy array
+        built with np.frombuffer over the decompressed buffer, so no per-value Python objects are created.
+
+        Parameters
+        ----------
+        encoded_data: str
+            base64 encoded content of a binary element
+        compression: str
+            compression cvParam name or accession, e.g. 'zlib compression' or 'MS:1002312'
+        data_type: str
+            data type cvParam name or accession, e.g. '32-bit float' or '64-bit float'
+        byte_order: str
+            'little' for mzML arrays, 'network' (big-endian) for mzXML peaks
+
+        Returns
+        -------
+        data: np.ndarray
+            read-only array of the decoded values in the precision of the file, float64 for MS-Numpress
+        """
+        decoded_data = base64.standard_b64decode(encoded_data)  # decodes the string
+        dtype = get_dtype(data_type)
+        if byte_order in ('network', 'big'):
+            dtype = dtype.newbyteorder('>')
+        return decode(decoded_data, compression, dtype)  # decompresses the data with the registered codec
+
+    @classmethod
+    def decode_peaks(cls, encoded_data: str, compression: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """Decodes the interleaved m/z-intensity pairs of an mzXML peaks element and splits them into strided views
+        of the decoded buffer.
+
+        Parameters
+        ----------
+        encoded_data: str
+            base64 encoded content of the peaks element
+        compression: Dict[str, str]
+            dictionary as returned by get_peaks_compression
+
+        Returns
+        -------
+        spectrum_data: Dict[str, np.ndarray]
+            dictionary with the 'mz' and 'intensity' arrays
+        """
+        pairs = cls.decode_array(encoded_data, compression['compression'], compression['data_type'],
+                                 compression['byte_order'])
+        return {'mz': pairs[0::2], 'intensity': pairs[1::2]}
+
+    @classmethod
+    def decode_values(cls, file_format: str, binary_values: Dict, compression: Dict) -> Dict:
+        """Decodes the binary values of a single spectrum.
+
+        Parameters
+        ----------
+        file_format: str
+            'mzml' or 'mzxml'
+        binary_values: Dict
+            entry of self.binary_values
+        compression: Dict
+            entry of self.compression
+
+        Returns
+        -------
+        spectrum_data: Dict
+            dictionary with the decoded 'mz' and 'intensity' values, None for empty spectra
+        """
+        if file_format == 'mzxml':
+            if binary_values['peaks'] is not None:
+                return cls.decode_peaks(binary_values['peaks'], compression['peaks'])
+            return {'mz': None, 'intensity': None}
+        encoded_mz_data, encoded_int_data = binary_values['mz'], binary_values['intensity']
+        if encoded_mz_data is not None or encoded_int_data is not None:
+            mz_data = cls.decode_array(encoded_mz_data, compression['mz']['compression'],
+                                       compression['mz']['data_type'])
+            int_data = cls.decode_array(encoded_int_data, compression['intensity']['compression'],
+                                        compression['intensity']['data_type'])
+            return {'mz': mz_data, 'intensity': int_data}
+        return {'mz': None, 'intensity': None}
+
+    @classmethod
+    def decode_chunk(cls, file_format: str, chunk: List[Tuple[int, Dict, Dict]]) -> List[Tuple[int, Dict]]:
+        """Decodes a chunk of spectra in a worker process.
+
+        Parameters
+        ----------
+        file_format: str
+            'mzml' or 'mzxml'
+        chunk: List[Tuple[int, Dict, Dict]]
+            list of spectrum id, binary values and compression of each spectrum
+
+        Returns
+        -------
+        decoded: List[Tuple[int, Dict]]
+            list of spectrum id and decoded values in the order of the chunk
+        """
+        return [(key, cls.decode_values(file_format, binary, compression)) for key, binary, compression in chunk]
+
+    def iter_decoded(self) -> Iterator[Tuple[int, Dict]]:
+        """Decodes the raw spectrum values in file order. When self.workers is larger than 1 the spectra are split
+        into chunks that are decoded in a process pool and yielded back in the original order.
+
+        Yields
+        -------
+        spectrum_data: Tuple[int, Dict]
+            spectrum id and a dictionary with the decoded 'mz' and 'intensity' values
+        """
+        keys = list(self.binary_values)
+        if self.workers > 1 and len(keys) > 1:
+            chunk_size = max(1, -(-len(keys) // (self.workers * 4)))  # a few chunks per worker to balance the load
+            chunks = [[(key, self.binary_values[key], self.compression[key]) for key in keys[i:i + chunk_size]]
+                      for i in range(0, len(keys), chunk_size)]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for decoded in executor.map(self.decode_chunk, repeat(self.format), chunks):
+                    yield from decoded
+            logger.info(f'Decoded {len(keys)} spectra with {self.workers} worker processes.')
+        else:
+            for key in keys:
+                yield key, self.decode_values(self.format, self.binary_values[key], self.compression[key])
+
     def decode_decompress(self):
-        """Takes the raw spectrum values and creates a dictionary of decoded and uncompressed m/z and intensity values."""
-        if self.format == 'mzxml':
-            logger.warning('Decoding binary arrays is only available for .mzML files.')
-            raise argparse.ArgumentTypeError('Decoding binary arrays is only available for .mzML files.')
-        spectrum_data = dict()
-        for key in self.binary_values:
-            encoded_mz_data, encoded_int_data = self.binary_values[key]['mz'], self.binary_values[key]['intensity']
-            if encoded_mz_data is not None or encoded_int_data is not None:
-                decoded_mz_data = base64.standard_b64decode(encoded_mz_data)
-                decoded_int_data = base64.standard_b64decode(encoded_int_data)  # # decodes the string
-                if self.compression[key]['mz']['compression'] == 'zlib compression':
-                    decompressed_mz_data = zlib.decompress(decoded_mz_data)
-                else:
-                    decompressed_mz_data = decoded_mz_data
-                if self.compression[key]['intensity']['compression'] == 'zlib compression':
-                    decompressed_int_data = zlib.decompress(decoded_int_data)  # decompresses the data
-                else:
-                    decompressed_int_data = decoded_int_data
-                if self.compression[key]['mz']['data_type'] == '32-bit float':
-                    mz_data = struct.unpack('<%sf' % (len(decompressed_mz_data) // 4),
-                                            decompressed_mz_data)  # unpacks 32-bit m/z values as floats
-                elif self.compression[key]['mz']['data_type'] == '64-bit float':
-                    mz_data = struct.unpack('<%sd' % (len(decompressed_mz_data) // 8),
-                                            decompressed_mz_data)
-                if self.compression[key]['intensity']['data_type'] == '32-bit float':
-                    int_data = struct.unpack('<%sf' % (len(decompressed_int_data) // 4),
-                                             decompressed_int_data)  # unpacks 32-bit intensity values as floats
-                elif self.compression[key]['intensity']['data_type'] == '64-bit float':
-                    int_data = struct.unpack('<%sd' % (len(decompressed_int_data) // 8),
-                                             decompressed_int_data)
-                spectrum_data[key] = {'mz': mz_data, 'intensity': int_data}
-            else:
-                spectrum_data[key] = {'mz': None, 'intensity': None}
+        """Takes the raw spectrum values and creates a mapping of decoded and uncompressed m/z and intensity values.
+        The mapping is a dictionary of per-spectrum arrays by default, a SpillStore when max_memory is set and a
+        PeakBuffer of contiguous native-precision buffers when compact is set."""
+        if self.max_memory is not None:
+            spectrum_data = SpillStore(self.max_memory)
+            spectrum_data.update(self.iter_decoded())
+        elif self.compact:
+            spectrum_data = PeakBuffer.from_items(self.iter_decoded())
+            logger.info(f'Decoded spectra held in {spectrum_data}')
+        else:
+            spectrum_data = dict(self.iter_decoded())
+        if self.max_memory is not None:
+            self.binary_values = None  # the encoded copies are not needed any more and would count against the budget
+            logger.info(f'Decoded spectra held in {spectrum_data}')
         self.spectrum_data = spectrum_data
         return
 
+    def get_declared_values(self, spectrum) -> np.ndarray:
+        """Reads base peak m/z, base peak intensity, total ion current, lowest and highest observed m/z of a spectrum
+        from the file. mzML values are looked up by CV accession, then by userParam name, and finally by the position
+        of the userParams. mzXML values are read from the scan attributes.
+
+        Parameters
+        ----------
+        spectrum: xml.dom.minidom.Element or xml.etree.ElementTree.Element
+            parsed, streamed or randomly accessed spectrum
+
+        Returns
+        -------
+        declared: np.ndarray
+            array of the five values, NaN where the file does not contain a value
+        """
+        declared = np.full(5, np.nan)
+        if isinstance(spectrum, ET.Element):
+            get = ET.Element.get
+            cv_params, user_params = spectrum.iter('cvParam'), list(spectrum.iter('userParam'))
+        else:
+            get = xml.dom.minidom.Element.getAttribute
+            cv_params, user_params = spectrum.getElementsByTagName('cvParam'), spectrum.getElementsByTagName('userParam')
+        if self.format == 'mzxml':
+            for position, name in enumerate(MZXML_SUMMARY_ATTRIBUTES):
+                value = get(spectrum, name)
+                if value:
+                    declared[position] = float(value)
+            return declared
+        for param in cv_params:
+            position = SUMMARY_ACCESSIONS.get(get(param, 'accession'))
+            if position is not None:
+                declared[position] = float(get(param, 'value'))
+        named = False
+        for param in user_params:
+            position = SUMMARY_NAMES.get(get(param, 'name'))
+            if position is not None and np.isnan(declared[position]):
+                declared[position] = float(get(param, 'value'))
+                named = True
+        if not named and np.isnan(declared).all() and len(user_params) >= 5:
+            declared[:] = [float(get(param, 'value')) for param in user_params[:5]]
+        return declared
+
+    @staticmethod
+    def to_element(spectrum) -> ET.Element:
+        """Converts a xml.dom.minidom.Element into a namespace-free xml.etree.ElementTree.Element."""
+        if isinstance(spectrum, ET.Element):
+            return spectrum
+        element = ET.fromstring(spectrum.toxml())
+        for child in element.iter():
+            child.tag = child.tag.rpartition('}')[2]
+        return element
+
+    def summary_frame(self, keys: List[int], summary: np.ndarray) -> pd.DataFrame:
+        """Builds the dataframe of the spectrum values directly from the summary columns.
+
+        Parameters
+        ----------
+        keys: List[int]
+            spectrum ids in file order
+        summary: np.ndarray
+            array of shape (n, 5) of the spectrum values
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
+            lowest and highest observed m/z.
+        """
+        df_values = pd.DataFrame(np.round(summary, 2), index=pd.Index(keys, dtype=np.int64),
+                                 columns=SPECTRUM_COLUMNS[1:])
+        df_values.insert(0, 'spectra_id', np.arange(len(keys), dtype=np.int64))
+        self.summary = df_values
+        logger.info('Successfully gathered spectrum values.')
+        return df_values
+
+    def get_summary(self, spectrum_dict: Dict[int, xml.dom.minidom.Element]) -> pd.DataFrame:
+        """Creates the dataframe of base peak m/z, base peak intensity, total ion current, lowest and highest observed
+        m/z. Values missing from the file are computed in bulk from the decoded peaks; spectra that were not decoded
+        yet are only decoded when one of their values is missing.
+
+        Parameters
+        ----------
+        spectrum_dict: Dict[int, xml.dom.minidom.Element]
+            dictionary with spectrum ids as key and xml.dom.minidom.Element as values
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
+            lowest and highest observed m/z.
+        """
+        keys = list(spectrum_dict)
+        declared = np.array([self.get_declared_values(spectrum_dict[key]) for key in keys]).reshape(len(keys), 5)
+        peaks = [None] * len(keys)
+        for row in np.flatnonzero(np.isnan(declared).any(axis=1)):
+            key = keys[row]
+            if self.spectrum_data is not None and key in self.spectrum_data:
+                data = self.spectrum_data[key]
+            else:
+                data = self.decode_element(self.to_element(spectrum_dict[key]))
+            if data['mz'] is not None:
+                peaks[row] = (data['mz'], data['intensity'])
+        return self.summary_frame(keys, fill_summary(declared, peaks))
+
     def get_values(self, spectrum_dict: Dict[int, xml.dom.minidom.Element]) -> Dict[int, Dict]:
         """Creates dictionary with spectrum ids and base peak m/z, base peak intensity, total ion current,
         lowest and highest observed m/z.
@@ -238,61 +554,942 @@ class Reader:
         value_dict: Dict[int, Dict]
             dictionary containing spectrum ids and the spectrum values
         """
-        value_dict = dict()
-        if self.format == 'mzml':
-            for index, key in enumerate(spectrum_dict):
-                if spectrum_dict[key].getAttribute('defaultArrayLength') != '0':
-                    vals = spectrum_dict[key].getElementsByTagName('userParam')
-                    bpmz = vals[0].getAttribute('value')
-                    bpi = vals[1].getAttribute('value')
-                    tic = vals[2].getAttribute('value')
-                    lomz = vals[3].getAttribute('value')
-                    homz = vals[4].getAttribute('value')
-                    value_dict[key] = {'spectra_id': int(index), 'base_peak_m/z': round(float(bpmz), 2),
-                                       'base_peak_intensity': round(float(bpi), 2),
-                                       'total_ion_current': round(float(tic), 2),
-                                       'lowest_observed_m/z': round(float(lomz), 2),
-                                       'highest_observed_m/z': round(float(homz), 2)}
-                else:
-                    value_dict[key] = {'base_peak_m/z': None, 'base_peak_intensity': None, 'total_ion_current': None,
-                                       'lowest_observed_m/z': None, 'highest_observed_m/z': None}
-        elif self.format == 'mzxml':
-            for index, key in enumerate(spectrum_dict):
-                if spectrum_dict[key].getAttribute('peaksCount') >= '0':
-                    bpmz = spectrum_dict[key].getAttribute('basePeakMz')
-                    bpi = spectrum_dict[key].getAttribute('basePeakIntensity')
-                    tic = spectrum_dict[key].getAttribute('totIonCurrent')
-                    lomz = spectrum_dict[key].getAttribute('lowMz')
-                    homz = spectrum_dict[key].getAttribute('highMz')
-                    value_dict[key] = {'spectra_id': int(index), 'base_peak_m/z': round(float(bpmz), 2),
-                                       'base_peak_intensity': round(float(bpi), 2),
-                                       'total_ion_current': round(float(tic), 2),
-                                       'lowest_observed_m/z': round(float(lomz), 2),
-                                       'highest_observed_m/z': round(float(homz), 2)}
+        value_dict = self.get_summary(spectrum_dict).to_dict(orient='index')
         self.values = value_dict
-        logger.info('Successfully gathered spectrum values.')
         return value_dict
 
-    def analyse_spectrum(self) -> pd.DataFrame:
+    def analyse_spectrum(self, decode: bool = True) -> pd.DataFrame:
         """Wrapper function for the parsing of an mzML file and the extraction of the m/z and intensity values.
+
+        Parameters
+        ----------
+        decode: bool
+            when False, only the spectrum values are extracted and no binary array is decoded
+
         Returns
         -------
         df_values: pd.DataFrame
             Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
             lowest and highest observed m/z.
         """
+        if self.cache is not None and self.check_extension():
+            key = self.cache.file_key(self.path)
+            cached = self.cache.load(key)
+            if cached is not None:
+                self.format, self.spectrum_data, self.summary = cached
+                logger.info(f'Loaded spectra of {self.path} from the cache.')
+                return self.summary
         parsed_file = self.parse_file()
         s_list = self.get_spectrum_list(parsed_file)
         spectrum_dictionary = self.get_spectrum_dict(s_list)
-        if self.format == 'mzml':
+        if decode:
             self.get_compression(spectrum_dictionary)
             self.get_binary_spectrum_values(spectrum_dictionary)
             self.decode_decompress()
-        values_spectrum = self.get_values(spectrum_dictionary)
-        df_values = pd.DataFrame.from_dict(values_spectrum, orient='index', columns=['spectra_id',
-                                                                                     'base_peak_m/z',
-                                                                                     'base_peak_intensity',
-                                                                                     'total_ion_current',
-                                                                                     'lowest_observed_m/z',
-                                                                                     'highest_observed_m/z'])
+        df_values = self.get_summary(spectrum_dictionary)
+        if self.cache is not None and decode:
+            self.cache.store(key, self.format, self.spectrum_data, df_values)
+        self.report_memory()
         return df_values
+
+    def report_memory(self) -> int:
+        """Logs the peak resident set size of the run.
+
+        Returns
+        -------
+        rss: int
+            peak resident set size in bytes, None if it cannot be measured on this platform
+        """
+        rss = peak_rss()
+        if rss is not None:
+            logger.info(f'Peak RSS after reading {self.path}: {rss / 1024 ** 2:.1f} MiB')
+        return rss
+
+    def iter_spectra(self) -> Iterator[Tuple[int, ET.Element]]:
+        """Streams the input file with iterparse and yields one spectrum at a time, so the full document is never
+        held in memory. Tag namespaces are stripped and every spectrum is cleared and detached from its parent once
+        the caller resumes the iteration, so the yielded element is only valid until the next one is requested.
+
+        For mzXML files nested scans are yielded in document order, each one as soon as its peaks are complete.
+
+        Yields
+        -------
+        spectrum: Tuple[int, xml.etree.ElementTree.Element]
+            spectrum id and the spectrum as xml.etree.ElementTree.Element
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if the input file has non-allowed extension
+        """
+        if not self.check_extension():
+            logger.warning('The parsed file format is not valid, mzML or mzXML file is required.')
+            raise argparse.ArgumentTypeError('Please parse an input file of either .mzML or .mzXML format.')
+        spectrum_tag, id_attribute = ('spectrum', 'index') if self.format == 'mzml' else ('scan', 'num')
+        stack = list()
+        yielded = set()
+        with self.open_file() as file:
+            for event, element in ET.iterparse(file, events=('start', 'end')):
+                if event == 'start':
+                    element.tag = element.tag.rpartition('}')[2]
+                    stack.append(element)
+                    continue
+                stack.pop()
+                parent = stack[-1] if stack else None
+                if element.tag == 'peaks' and parent is not None and parent.tag == spectrum_tag:
+                    yielded.add(id(parent))
+                    yield int(parent.get(id_attribute)), parent
+                elif element.tag == spectrum_tag:
+                    if id(element) not in yielded:
+                        yield int(element.get(id_attribute)), element
+                    yielded.discard(id(element))
+                    element.clear()
+                    if parent is not None:
+                        parent.remove(element)
+                elif element.tag in ('chromatogram', 'offset'):
+                    element.clear()
+                    if parent is not None:
+                        parent.remove(element)
+        logger.info(f'Successfully streamed file: {self.path}')
+
+    def get_element_compression(self, spectrum: ET.Element) -> Dict[str, Dict]:
+        """Gathers the encoding of the binary arrays of a single streamed spectrum.
+
+        Parameters
+        ----------
+        spectrum: xml.etree.ElementTree.Element
+            spectrum as yielded by iter_spectra
+
+        Returns
+        -------
+        compression: Dict[str, Dict]
+            compression dictionary with the same layout as the entries of self.compression, plus the encoded
+            'binary' content of each array
+        """
+        if self.format == 'mzxml':
+            peaks = spectrum.find('peaks')
+            if peaks is None:
+                return {'peaks': dict()}
+            params = self.get_peaks_compression(peaks.get('precision', ''), peaks.get('compressionType', ''),
+                                                peaks.get('byteOrder', ''))
+            params['binary'] = peaks.text
+            return {'peaks': params}
+        return self.get_binary_arrays(spectrum)
+
+    def decode_element(self, spectrum: ET.Element) -> Dict:
+        """Decodes the m/z and intensity values of a single streamed or randomly accessed spectrum.
+
+        Parameters
+        ----------
+        spectrum: xml.etree.ElementTree.Element
+            spectrum as yielded by iter_spectra or returned by get_spectrum
+
+        Returns
+        -------
+        spectrum_data: Dict
+            dictionary with the decoded 'mz' and 'intensity' values, None for empty spectra
+        """
+        arrays = self.get_element_compression(spectrum)
+        if self.format == 'mzxml':
+            if spectrum.get('peaksCount') != '0' and arrays['peaks'].get('binary'):
+                return self.decode_peaks(arrays['peaks']['binary'], arrays['peaks'])
+        elif spectrum.get('defaultArrayLength') != '0' and arrays['mz'] and arrays['intensity']:
+            return {'mz': self.decode_array(arrays['mz']['binary'], arrays['mz'].get('compression'),
+                                            arrays['mz'].get('data_type')),
+                    'intensity': self.decode_array(arrays['intensity']['binary'],
+                                                   arrays['intensity'].get('compression'),
+                                                   arrays['intensity'].get('data_type'))}
+        return {'mz': None, 'intensity': None}
+
+    def iter_spectrum_data(self) -> Iterator[Tuple[int, Dict]]:
+        """Streams the input file and yields the decoded m/z and intensity values of one spectrum at a time.
+
+        Yields
+        -------
+        spectrum_data: Tuple[int, Dict]
+            spectrum id and a dictionary with the decoded 'mz' and 'intensity' values
+        """
+        for key, spectrum in self.iter_spectra():
+            yield key, self.decode_element(spectrum)
+
+    def stream_spectrum(self, batch_size: int = 1024, peak_writer: PeakWriter = None) -> pd.DataFrame:
+        """Streaming counterpart of analyse_spectrum. Reads the input file one spectrum at a time and returns the
+        same dataframe, while peak memory stays flat as the file size grows. Spectra with values missing from the
+        file are decoded as they stream by and their values are computed in batches.
+
+        Parameters
+        ----------
+        batch_size: int
+            maximum number of decoded spectra held at a time
+        peak_writer: PeakWriter
+            when given, every spectrum is decoded and its peaks are passed to the writer as it streams by
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
+            lowest and highest observed m/z.
+        """
+        keys = list()
+        rows = list()
+        pending = list()  # position and peaks of spectra with missing values
+        for key, spectrum in self.iter_spectra():
+            declared = self.get_declared_values(spectrum)
+            if peak_writer is not None or np.isnan(declared).any():
+                data = self.decode_element(spectrum)
+                if peak_writer is not None:
+                    peak_writer.write(len(rows), data['mz'], data['intensity'])
+                if np.isnan(declared).any() and data['mz'] is not None:
+                    pending.append((len(rows), (data['mz'], data['intensity'])))
+            keys.append(key)
+            rows.append(declared)
+            if len(pending) >= batch_size:
+                self.fill_pending(rows, pending)
+        self.fill_pending(rows, pending)
+        summary = np.array(rows).reshape(len(rows), 5)
+        df_values = self.summary_frame(keys, summary)
+        self.report_memory()
+        return df_values
+
+    def export(self, output: str = None, peaks_output: str = None, stream: bool = False,
+               row_group_size: int = 1 << 17) -> pd.DataFrame:
+        """Writes the spectrum values and optionally the long-format peak table (spectra_id, m/z, intensity) as
+        columnar files. The peak table is written in row groups while the file is streamed, so it is never held in
+        memory as a whole; its spectra_id column matches the spectra_id column of the spectrum values.
+
+        Parameters
+        ----------
+        output: str
+            .parquet, .feather or .csv file of the spectrum values, not written if None
+        peaks_output: str
+            .parquet or .feather file of the peak table, not written if None
+        stream: bool
+            when True, the spectrum values are read with stream_spectrum, which is always used for the peak table
+        row_group_size: int
+            number of peaks per row group of the peak table
+
+        Returns
+        -------
+        df_values: pd.DataFrame
+            Dataframe containing spectrum ids and base peak m/z, base peak intensity, total ion current,
+            lowest and highest observed m/z.
+        """
+        if peaks_output is not None:
+            with PeakWriter(peaks_output, row_group_size=row_group_size) as peak_writer:
+                df_values = self.stream_spectrum(peak_writer=peak_writer)
+        elif stream:
+            df_values = self.stream_spectrum()
+        else:
+            df_values = self.analyse_spectrum()
+        if output is not None:
+            write_table(df_values, output)
+        return df_values
+
+    @staticmethod
+    def fill_pending(rows: List[np.ndarray], pending: List[Tuple[int, Tuple[np.ndarray, np.ndarray]]]):
+        """Computes the missing values of a batch of streamed spectra in place and empties the batch."""
+        if not pending:
+            return
+        filled = fill_summary(np.array([rows[position] for position, _ in pending]), [peaks for _, peaks in pending])
+        for (position, _), values in zip(pending, filled):
+            rows[position] = values
+        pending.clear()
+
+    def get_index_offsets(self, element: str = 'spectrum') -> Dict:
+        """Reads the spectrum byte offsets from the index at the end of an indexedmzML or indexed mzXML file.
+        indexedmzML offsets are listed in spectrum index order, mzXML offsets are keyed by scan num.
+
+        Gzip-compressed files are not searched for an index, since reaching their end means decompressing them
+        completely. Their offsets come from the sidecar index instead.
+
+        Parameters
+        ----------
+        element: str
+            'spectrum', or 'chromatogram' for the chromatogram offsets of indexedmzML files keyed by chromatogram id
+
+        Returns
+        -------
+        offsets: Dict
+            dictionary with spectrum or chromatogram ids as key and byte offsets as values, empty if the file has no
+            index
+        """
+        offsets = dict()
+        if self.gzipped or (element == 'chromatogram' and self.format != 'mzml'):
+            return offsets
+        with open(self.path, 'rb') as file:
+            file.seek(max(0, os.path.getsize(self.path) - 4096))
+            tail = file.read()
+            match = re.search(rb'<(?:indexListOffset|indexOffset)>\s*(\d+)\s*</', tail)
+            if match is None:
+                return offsets
+            file.seek(int(match.group(1)))
+            index_list = file.read()
+        index_name = element.encode() if self.format == 'mzml' else b'scan'
+        index = re.search(rb'<index\s+name="' + index_name + rb'"\s*>(.*?)</index>', index_list, re.DOTALL)
+        if index is None:
+            return offsets
+        entries = re.finditer(rb'<offset\s+(?:idRef|id)="([^"]*)"\s*>\s*(\d+)\s*</offset>', index.group(1))
+        for position, entry in enumerate(entries):
+            if element == 'chromatogram':
+                key = unescape(entry.group(1).decode(), {'&quot;': '"', '&apos;': "'"})
+            else:
+                key = position if self.format == 'mzml' else int(entry.group(1))
+            offsets[key] = int(entry.group(2))
+        return offsets
+
+    def get_sidecar_path(self) -> str:
+        """Returns the path of the persisted offset index of the input file under DATA_DIR."""
+        path = os.path.abspath(self.path)
+        name = hashlib.sha1(path.encode()).hexdigest()
+        return os.path.join(DATA_DIR, 'offsets', f'{os.path.basename(path)}.{name}.json')
+
+    def scan_offsets(self, chunk_size: int = 1 << 20, element: str = 'spectrum') -> Dict:
+        """Scans the raw bytes of the input file for spectrum start tags and records their byte offsets.
+
+        Parameters
+        ----------
+        chunk_size: int
+            number of bytes read at a time
+        element: str
+            'spectrum', or 'chromatogram' for the offsets of mzML chromatograms keyed by chromatogram id
+
+        Returns
+        -------
+        offsets: Dict
+            dictionary with spectrum or chromatogram ids as key and byte offsets as values
+        """
+        if element == 'chromatogram':
+            pattern = re.compile(rb'<chromatogram\s[^>]*?\bid="([^"]*)"')
+        elif self.format == 'mzml':
+            pattern = re.compile(rb'<spectrum\s[^>]*?\bindex="(\d+)"')
+        else:
+            pattern = re.compile(rb'<scan\s[^>]*?\bnum="(\d+)"')
+        overlap = 4096  # longest start tag that may be split between two chunks
+        offsets = dict()
+        position = 0  # file offset of the start of buffer
+        buffer = b''
+        with self.open_file() as file:
+            while True:
+                chunk = file.read(chunk_size)
+                buffer += chunk
+                limit = len(buffer) if not chunk else len(buffer) - overlap
+                for match in pattern.finditer(buffer):
+                    if match.start() >= limit:
+                        break
+                    if element == 'chromatogram':
+                        key = unescape(match.group(1).decode(), {'&quot;': '"', '&apos;': "'"})
+                    else:
+                        key = int(match.group(1))
+                    offsets[key] = position + match.start()
+                if not chunk:
+                    break
+                if limit > 0:
+                    buffer = buffer[limit:]
+                    position += limit
+        return offsets
+
+    def get_offsets(self) -> Dict[int, int]:
+        """Returns the byte offset of every spectrum in the input file. The offsets are taken from the index of
+        indexed files, otherwise a sidecar index is built on first use and persisted under DATA_DIR.
+
+        Returns
+        -------
+        offsets: Dict[int, int]
+            dictionary with spectrum ids as key and byte offsets as values
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if the input file has non-allowed extension
+        """
+        if self.offsets is not None:
+            return self.offsets
+        if not self.check_extension():
+            logger.warning('The parsed file format is not valid, mzML or mzXML file is required.')
+            raise argparse.ArgumentTypeError('Please parse an input file of either .mzML or .mzXML format.')
+        offsets = self.get_index_offsets()
+        if not offsets:
+            offsets = self.load_sidecar()
+        self.offsets = offsets
+        return offsets
+
+    def load_sidecar(self, rebuild: bool = False) -> Dict[int, int]:
+        """Loads the persisted offset index of the input file, building it if it is missing or out of date.
+
+        Parameters
+        ----------
+        rebuild: bool
+            when True, the offsets are scanned again even if an up to date sidecar exists
+
+        Returns
+        -------
+        offsets: Dict[int, int]
+            dictionary with spectrum ids as key and byte offsets as values
+        """
+        sidecar = self.get_sidecar_path()
+        stat = os.stat(self.path)
+        if not rebuild and os.path.exists(sidecar):
+            with open(sidecar) as file:
+                content = json.load(file)
+            if content['size'] == stat.st_size and content['mtime'] == stat.st_mtime:
+                return {int(key): offset for key, offset in content['offsets'].items()}
+        offsets = self.scan_offsets()
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        with open(sidecar, 'w') as file:
+            json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'offsets': offsets}, file)
+        logger.info(f'Created offset index for file: {self.path}')
+        return offsets
+
+    def get_namespaces(self, chunk_size: int = 1 << 16) -> Dict[str, str]:
+        """Reads the namespace prefixes declared on the root element of the input file, such as xsi, which
+        randomly accessed elements may use without declaring them.
+
+        Parameters
+        ----------
+        chunk_size: int
+            number of bytes read at a time until the root start tag is complete
+
+        Returns
+        -------
+        namespaces: Dict[str, str]
+            dictionary with prefixes as key and namespace URIs as values
+        """
+        if self.namespaces is not None:
+            return self.namespaces
+        head = b''
+        with self.open_file() as file:
+            while True:
+                chunk = file.read(chunk_size)
+                head += chunk
+                root = re.search(rb'<(?![?!])[^>]*>', head)
+                if root is not None or not chunk:
+                    break
+        declarations = NAMESPACE_DECLARATION.findall(root.group(0)) if root is not None else []
+        self.namespaces = {prefix.decode(): uri.decode() for prefix, _, uri in declarations}
+        return self.namespaces
+
+    @staticmethod
+    def read_element(file, offset: int, chunk_size: int = 1 << 16, namespaces: Dict[str, str] = None) -> ET.Element:
+        """Parses the single element that starts at the given byte offset of an open file. The parser is first fed a
+        wrapper start tag declaring the namespace prefixes of the root element, see get_namespaces, as the element
+        is parsed without its ancestors. The xsi prefix is always declared.
+
+        Parameters
+        ----------
+        file:
+            input file opened in binary mode
+        offset: int
+            byte offset of the start tag of the element
+        chunk_size: int
+            number of bytes fed to the parser at a time
+        namespaces: Dict[str, str]
+            namespace prefixes declared on the root element with their URIs
+
+        Returns
+        -------
+        element: xml.etree.ElementTree.Element
+            the parsed element with namespaces stripped from the tags
+        """
+        declarations = {'xsi': XSI_NAMESPACE, **(namespaces or {})}
+        file.seek(offset)
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        wrapper = ' '.join(f'xmlns:{prefix}={quoteattr(uri)}' for prefix, uri in declarations.items())
+        parser.feed(f'<wrapper {wrapper}>'.encode())
+        list(parser.read_events())  # discards the start of the wrapper
+        depth = 0
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ET.ParseError(f'Unexpected end of file while reading element at offset {offset}')
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    element.tag = element.tag.rpartition('}')[2]
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return element
+
+    def get_spectra(self, ids: List[int]) -> Dict[int, ET.Element]:
+        """Reads only the requested spectra by seeking to their byte offsets instead of parsing the whole file.
+        The spectra are read in offset order, so gzip-compressed files are decompressed in a single forward pass.
+
+        Parameters
+        ----------
+        ids: List[int]
+            spectrum ids ('index' for mzML, 'num' for mzXML)
+
+        Returns
+        -------
+        spectrum_dict: Dict[int, xml.etree.ElementTree.Element]
+            dictionary with spectrum ids as key and xml.etree.ElementTree.Element as values
+
+        Raises
+        -------
+        KeyError: if one of the ids is not present in the input file
+        """
+        offsets = self.get_offsets()
+        missing = [key for key in ids if key not in offsets]
+        if missing:
+            logger.warning(f'Spectra {missing} are not present in the parsed file.')
+            raise KeyError(f'Spectra {missing} are not present in the parsed file.')
+        id_attribute = 'index' if self.format == 'mzml' else 'num'
+        spectrum_dict = dict()
+        with self.open_file() as file:
+            for key in sorted(set(ids), key=offsets.get):
+                spectrum = self.read_element(file, offsets[key], namespaces=self.get_namespaces())
+                if spectrum.get(id_attribute) != str(key):
+                    logger.warning(f'Stale offset for spectrum {key}, rebuilding the offset index.')
+                    self.offsets = offsets = self.load_sidecar(rebuild=True)
+                    spectrum = self.read_element(file, offsets[key], namespaces=self.get_namespaces())
+                spectrum_dict[key] = spectrum
+        return {key: spectrum_dict[key] for key in ids}
+
+    def get_spectrum(self, index: int) -> ET.Element:
+        """Reads a single spectrum by seeking to its byte offset instead of parsing the whole file.
+
+        Parameters
+        ----------
+        index: int
+            spectrum id ('index' for mzML, 'num' for mzXML)
+
+        Returns
+        -------
+        spectrum: xml.etree.ElementTree.Element
+            the requested spectrum
+        """
+        return self.get_spectra([index])[index]
+
+    def get_chromatogram_offsets(self) -> Dict[str, int]:
+        """Returns the byte offset of every chromatogram of an mzML file, from the index of indexedmzML files or by
+        scanning the raw bytes otherwise. mzXML files have no chromatograms.
+
+        Returns
+        -------
+        offsets: Dict[str, int]
+            dictionary with chromatogram ids as key and byte offsets as values, in file order
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if the input file has non-allowed extension
+        """
+        if self.chromatogram_offsets is not None:
+            return self.chromatogram_offsets
+        if not self.check_extension():
+            logger.warning('The parsed file format is not valid, mzML or mzXML file is required.')
+            raise argparse.ArgumentTypeError('Please parse an input file of either .mzML or .mzXML format.')
+        offsets = dict()
+        if self.format == 'mzml':
+            offsets = self.get_index_offsets(element='chromatogram') or self.scan_offsets(element='chromatogram')
+        self.chromatogram_offsets = dict(sorted(offsets.items(), key=lambda item: item[1]))
+        return self.chromatogram_offsets
+
+    def get_chromatograms(self, ids: List[str]) -> Dict[str, ET.Element]:
+        """Reads only the requested chromatograms by seeking to their byte offsets, like get_spectra.
+
+        Parameters
+        ----------
+        ids: List[str]
+            chromatogram ids, e.g. 'TIC'
+
+        Returns
+        -------
+        chromatogram_dict: Dict[str, xml.etree.ElementTree.Element]
+            dictionary with chromatogram ids as key and xml.etree.ElementTree.Element as values
+
+        Raises
+        -------
+        KeyError: if one of the ids is not present in the input file
+        """
+        offsets = self.get_chromatogram_offsets()
+        missing = [key for key in ids if key not in offsets]
+        if missing:
+            logger.warning(f'Chromatograms {missing} are not present in the parsed file.')
+            raise KeyError(f'Chromatograms {missing} are not present in the parsed file.')
+        chromatogram_dict = dict()
+        with self.open_file() as file:
+            for key in sorted(set(ids), key=offsets.get):
+                chromatogram = self.read_element(file, offsets[key], namespaces=self.get_namespaces())
+                if chromatogram.get('id') != key:
+                    logger.warning(f'Stale offset for chromatogram {key}, scanning the file again.')
+                    self.chromatogram_offsets = offsets = self.scan_offsets(element='chromatogram')
+                    chromatogram = self.read_element(file, offsets[key], namespaces=self.get_namespaces())
+                chromatogram_dict[key] = chromatogram
+        return {key: chromatogram_dict[key] for key in ids}
+
+    def decode_chromatogram(self, chromatogram: ET.Element) -> Dict[str, np.ndarray]:
+        """Decodes the time and intensity arrays of a chromatogram with the decoding path of the spectra.
+
+        Parameters
+        ----------
+        chromatogram: xml.etree.ElementTree.Element
+            chromatogram as returned by get_chromatograms
+
+        Returns
+        -------
+        chromatogram_data: Dict[str, np.ndarray]
+            dictionary with the 'time' in seconds and 'intensity' values, empty arrays for empty chromatograms
+        """
+        arrays = self.get_binary_arrays(chromatogram)
+        data = dict()
+        for name in ('time', 'intensity'):
+            params = arrays.get(name)
+            if params and params.get('binary') and chromatogram.get('defaultArrayLength') != '0':
+                data[name] = self.decode_array(params['binary'], params.get('compression'), params.get('data_type'))
+            else:
+                data[name] = np.zeros(0)
+        for param in chromatogram.iter('cvParam'):
+            if param.get('accession') == TIME_ARRAY and (param.get('unitAccession') in MINUTE_UNITS
+                                                         or param.get('unitName') in MINUTE_UNITS):
+                data['time'] = data['time'] * 60
+        return data
+
+    def get_chromatogram(self, chromatogram_id: str) -> Dict[str, np.ndarray]:
+        """Reads and decodes a single chromatogram by its id.
+
+        Parameters
+        ----------
+        chromatogram_id: str
+            id of the chromatogram, e.g. 'TIC'
+
+        Returns
+        -------
+        chromatogram_data: Dict[str, np.ndarray]
+            dictionary with the 'time' in seconds and 'intensity' values
+        """
+        return self.decode_chromatogram(self.get_chromatograms([chromatogram_id])[chromatogram_id])
+
+    def get_chromatogram_frame(self, ids: List[str] = None) -> pd.DataFrame:
+        """Reads and decodes chromatograms into a single long table.
+
+        Parameters
+        ----------
+        ids: List[str]
+            chromatogram ids, all chromatograms of the file if None or empty
+
+        Returns
+        -------
+        df_chromatograms: pd.DataFrame
+            Dataframe with the chromatogram id, the retention time in seconds and the intensity of every point.
+        """
+        ids = list(ids) if ids else list(self.get_chromatogram_offsets())
+        chromatograms = self.get_chromatograms(ids)
+        decoded = [self.decode_chromatogram(chromatograms[key]) for key in ids]
+        return pd.DataFrame({'chromatogram_id': np.repeat(np.array(ids, dtype=object),
+                                                          [len(data['time']) for data in decoded]),
+                             'retention_time': np.concatenate([np.zeros(0)] + [data['time'] for data in decoded]),
+                             'intensity': np.concatenate([np.zeros(0)] + [data['intensity'] for data in decoded])})
+
+    def get_tic(self, rt_range: Tuple[float, float] = None) -> pd.DataFrame:
+        """Returns the total ion chromatogram of the run. The total ion current chromatogram stored in mzML files is
+        read by its offset, which takes milliseconds on indexed files, trying the id 'TIC' first. Files without one
+        fall back to summing the spectra of all MS levels with extract_xic.
+
+        Parameters
+        ----------
+        rt_range: Tuple[float, float]
+            first and last retention time in seconds, the whole run if None
+
+        Returns
+        -------
+        df_tic: pd.DataFrame
+            Dataframe with the retention time in seconds and the 'tic' intensity, in retention time order.
+        """
+        offsets = self.get_chromatogram_offsets()
+        with self.open_file() as file:
+            for key in sorted(offsets, key=lambda key: (key != 'TIC', offsets[key])):
+                chromatogram = self.read_element(file, offsets[key], namespaces=self.get_namespaces())
+                if any(param.get('accession') == TIC_CHROMATOGRAM for param in chromatogram.findall('cvParam')):
+                    data = self.decode_chromatogram(chromatogram)
+                    df_tic = pd.DataFrame({'retention_time': data['time'].astype(np.float64),
+                                           'tic': data['intensity'].astype(np.float64)})
+                    if rt_range is not None:
+                        df_tic = df_tic[df_tic['retention_time'].between(*rt_range)].reset_index(drop=True)
+                    logger.info(f'Read the total ion current chromatogram {key} of file: {self.path}')
+                    return df_tic
+        logger.info(f'No total ion current chromatogram in {self.path}, summing the spectra.')
+        return self.extract_xic([], rt_range=rt_range, ms_level=None).drop(columns='spectra_id')
+
+    def get_lazy_spectra(self) -> List[Spectrum]:
+        """Creates a list of Spectrum objects that decode their m/z and intensity arrays only on first access.
+        If the binary values were already extracted the spectra reference them, otherwise they reference the byte
+        offsets of the spectra in the input file and nothing is parsed until a spectrum is accessed.
+
+        Returns
+        -------
+        spectra: List[Spectrum]
+            one lazily decoded Spectrum per spectrum id, in file order
+        """
+        if self.binary_values is not None and self.compression is not None:
+            spectra = [Spectrum(self, key, payload=(self.binary_values[key], self.compression[key]))
+                       for key in self.binary_values]
+        else:
+            offsets = self.get_offsets()
+            spectra = [Spectrum(self, key, offset=offset) for key, offset in sorted(offsets.items(),
+                                                                                     key=lambda item: item[1])]
+        self.spectra = spectra
+        return spectra
+
+    def get_scan_metadata(self, spectrum: ET.Element) -> Tuple[float, int]:
+        """Reads the retention time and MS level of a single streamed or randomly accessed spectrum.
+
+        Parameters
+        ----------
+        spectrum: xml.etree.ElementTree.Element
+            spectrum as yielded by iter_spectra or returned by get_spectrum
+
+        Returns
+        -------
+        metadata: Tuple[float, int]
+            retention time in seconds, NaN if missing, and MS level, 0 if missing
+        """
+        retention_time, ms_level = np.nan, 0
+        if self.format == 'mzxml':
+            retention_time = parse_duration(spectrum.get('retentionTime', ''))
+            ms_level = int(spectrum.get('msLevel', 0))
+            return retention_time, ms_level
+        for param in spectrum.iter('cvParam'):
+            accession = param.get('accession')
+            if accession == MS_LEVEL:
+                ms_level = int(param.get('value'))
+            elif accession == SCAN_START_TIME and np.isnan(retention_time):
+                retention_time = float(param.get('value'))
+                if param.get('unitAccession') in MINUTE_UNITS or param.get('unitName') in MINUTE_UNITS:
+                    retention_time *= 60
+        return retention_time, ms_level
+
+    def scan_headers(self, chunk_size: int = 1 << 20) -> pd.DataFrame:
+        """Scans the raw bytes of the input file for the metadata of every spectrum, e.g. to plan a search. Encoded
+        binary arrays are skipped without being parsed or decoded and no XML tree is built, so the scan runs close
+        to disk read speed.
+
+        Parameters
+        ----------
+        chunk_size: int
+            number of bytes read at a time
+
+        Returns
+        -------
+        df_headers: pd.DataFrame
+            Dataframe with the spectrum id, retention time in seconds, MS level, precursor m/z and charge, spectrum
+            type and number of peaks of every spectrum in file order.
+
+        Raises
+        -------
+        argparse.ArgumentTypeError: if the input file has non-allowed extension
+        """
+        if not self.check_extension():
+            logger.warning('The parsed file format is not valid, mzML or mzXML file is required.')
+            raise argparse.ArgumentTypeError('Please parse an input file of either .mzML or .mzXML format.')
+        with self.open_file() as file:
+            rows = [read_header(segment, self.format) for segment in iter_header_segments(file, self.format,
+                                                                                          chunk_size)]
+        df_headers = pd.DataFrame(rows, columns=HEADER_COLUMNS)
+        df_headers = df_headers.astype({'spectra_id': np.int64, 'retention_time': np.float64, 'ms_level': np.int64,
+                                        'precursor_m/z': np.float64, 'precursor_charge': np.int64,
+                                        'peaks_count': np.int64})
+        logger.info(f'Scanned the headers of {len(df_headers)} spectra of file: {self.path}')
+        return df_headers
+
+    def get_precursor(self, spectrum: ET.Element) -> Tuple[float, int]:
+        """Reads the m/z and charge of the first precursor of a single streamed or randomly accessed spectrum.
+
+        Parameters
+        ----------
+        spectrum: xml.etree.ElementTree.Element
+            spectrum as yielded by iter_spectra or returned by get_spectrum
+
+        Returns
+        -------
+        precursor: Tuple[float, int]
+            precursor m/z, NaN if the spectrum has no precursor, and charge, 0 if unknown
+        """
+        precursor_mz, charge = np.nan, 0
+        if self.format == 'mzxml':
+            precursor = spectrum.find('precursorMz')
+            if precursor is not None and precursor.text:
+                precursor_mz = float(precursor.text)
+                charge = int(precursor.get('precursorCharge') or 0)
+            return precursor_mz, charge
+        selected_ion = next(spectrum.iter('selectedIon'), None)
+        if selected_ion is not None:
+            for param in selected_ion.iter('cvParam'):
+                if param.get('accession') == SELECTED_ION_MZ:
+                    precursor_mz = float(param.get('value'))
+                elif param.get('accession') == CHARGE_STATE:
+                    charge = int(float(param.get('value')))
+        return precursor_mz, charge
+
+    def get_index(self) -> SpectrumIndex:
+        """Streams the input file once and builds the retention time and m/z range index of its spectra, used to
+        extract ion chromatograms.
+
+        Returns
+        -------
+        index: SpectrumIndex
+            index over the decoded peaks of all spectra
+        """
+        if self.index is not None:
+            return self.index
+        keys, metadata, peaks = list(), list(), list()
+        empty = np.zeros(0)
+        for key, spectrum in self.iter_spectra():
+            keys.append(key)
+            metadata.append(self.get_scan_metadata(spectrum))
+            data = self.decode_element(spectrum)
+            peaks.append((data['mz'], data['intensity']) if data['mz'] is not None else (empty, empty))
+        retention_times = np.array([retention_time for retention_time, _ in metadata], dtype=np.float64)
+        ms_levels = np.array([ms_level for _, ms_level in metadata], dtype=np.int64)
+        self.index = SpectrumIndex(keys, retention_times, ms_levels, *concatenate_peaks(peaks))
+        logger.info(f'Indexed {len(keys)} spectra of file: {self.path}')
+        return self.index
+
+    def extract_xic(self, targets: List[float], ppm: float = 10.0, rt_range: Tuple[float, float] = None,
+                    ms_level: int = 1) -> pd.DataFrame:
+        """Extracts ion chromatograms of target m/z values, or the total ion chromatogram if no target is given.
+
+        Parameters
+        ----------
+        targets: List[float]
+            target m/z values, the total ion chromatogram is extracted if empty
+        ppm: float
+            half width of the m/z window in parts per million of the target
+        rt_range: Tuple[float, float]
+            first and last retention time in seconds, the whole run if None
+        ms_level: int
+            MS level of the spectra, all levels if None
+
+        Returns
+        -------
+        df_xic: pd.DataFrame
+            Dataframe with the spectrum id, the retention time and one intensity column per target m/z or a 'tic'
+            column, in retention time order.
+        """
+        index = self.get_index()
+        if targets:
+            keys, retention_times, intensities = index.extract_xic(targets, ppm, rt_range, ms_level)
+            columns = {f'{target:.4f}': values for target, values in zip(targets, intensities)}
+        else:
+            keys, retention_times, totals = index.extract_tic(rt_range, ms_level)
+            columns = {'tic': totals}
+        return pd.DataFrame({'spectra_id': keys, 'retention_time': retention_times, **columns})
+
+    def is_profile(self, spectrum: ET.Element) -> bool:
+        """Checks whether a streamed or randomly accessed spectrum is declared as profile spectrum, i.e. with the
+        'profile spectrum' cvParam in mzML or centroided="0" in mzXML. Spectra of unknown type are not centroided.
+
+        Parameters
+        ----------
+        spectrum: xml.etree.ElementTree.Element
+            spectrum as yielded by iter_spectra or returned by get_spectrum
+
+        Returns
+        -------
+        bool: True if the spectrum holds profile data
+        """
+        if self.format == 'mzxml':
+            return spectrum.get('centroided') == '0'
+        return any(param.get('accession') == PROFILE_SPECTRUM for param in spectrum.findall('cvParam'))
+
+    def centroid_spectra(self, min_intensity: float = 0.0) -> Dict[int, Dict]:
+        """Streams the input file once and centroids all profile spectra in a single bulk pass, while centroided
+        spectra are kept as they are.
+
+        Parameters
+        ----------
+        min_intensity: float
+            local maxima below this intensity are dropped as noise
+
+        Returns
+        -------
+        centroided: Dict[int, Dict]
+            dictionary with spectrum ids as key and the centroided 'mz' and 'intensity' values, None for empty spectra
+        """
+        centroided = dict()
+        profile_keys, profile_peaks = list(), list()
+        points = 0
+        for key, spectrum in self.iter_spectra():
+            data = self.decode_element(spectrum)
+            centroided[key] = data
+            if data['mz'] is not None:
+                points += len(data['mz'])
+                if self.is_profile(spectrum):
+                    profile_keys.append(key)
+                    profile_peaks.append((data['mz'], data['intensity']))
+        if profile_peaks:
+            mz, intensity, offsets = centroid_peaks(*concatenate_peaks(profile_peaks), min_intensity=min_intensity)
+            for position, key in enumerate(profile_keys):
+                start, end = offsets[position], offsets[position + 1]
+                centroided[key] = {'mz': mz[start:end], 'intensity': intensity[start:end]}
+        peaks = sum(len(data['mz']) for data in centroided.values() if data['mz'] is not None)
+        logger.info(f'Centroided {len(profile_keys)} profile spectra, {points} points reduced to {peaks} peaks.')
+        self.centroided = centroided
+        return centroided
+
+    def write_centroided(self, output_path: str, min_intensity: float = 0.0) -> str:
+        """Writes a centroided copy of the input file as mzML, e.g. as input of the peptide search. Spectrum metadata
+        such as precursors and retention times is copied from the input file with pyopenms.
+
+        Parameters
+        ----------
+        output_path: str
+            path of the centroided mzML file
+        min_intensity: float
+            local maxima below this intensity are dropped as noise
+
+        Returns
+        -------
+        output_path: str
+            path of the written file
+        """
+        import pyopenms
+
+        centroided = self.centroid_spectra(min_intensity) if self.centroided is None else self.centroided
+        experiment = pyopenms.MSExperiment()
+        file_class = pyopenms.MzMLFile if self.format == 'mzml' else pyopenms.MzXMLFile
+        file_class().load(str(self.path), experiment)
+        spectra = experiment.getSpectra()
+        if len(spectra) != len(centroided):
+            logger.warning(f'pyopenms read {len(spectra)} spectra but the file contains {len(centroided)}.')
+            raise ValueError(f'Could not match the spectra of {self.path} to write the centroided file.')
+        for spectrum, data in zip(spectra, centroided.values()):
+            if data['mz'] is not None:
+                spectrum.set_peaks((np.asarray(data['mz'], dtype=np.float64),
+                                    np.asarray(data['intensity'], dtype=np.float32)))
+            spectrum.setType(pyopenms.SpectrumSettings.SpectrumType.CENTROID)
+        experiment.setSpectra(spectra)
+        pyopenms.MzMLFile().store(str(output_path), experiment)
+        logger.info(f'Wrote centroided spectra of {self.path} to {output_path}')
+        return output_path
+
+    def bin_spectra(self, bin_width: float = 1.0, mz_range: Tuple[float, float] = None,
+                    normalize: str = None) -> SpectrumMatrix:
+        """Bins all spectra at the given m/z resolution into a sparse spectra x bins matrix. Already decoded spectra
+        are taken from spectrum_data, otherwise the file is streamed.
+
+        Parameters
+        ----------
+        bin_width: float
+            width of the m/z bins
+        mz_range: Tuple[float, float]
+            lowest and highest binned m/z, the m/z range of all peaks if None
+        normalize: str
+            None, or 'max', 'sum' or 'l2' to scale every spectrum to a base peak, total or euclidean norm of 1
+
+        Returns
+        -------
+        matrix: SpectrumMatrix
+            binned spectra with one row per spectrum id
+        """
+        spectrum_data = self.spectrum_data.items() if self.spectrum_data is not None else self.iter_spectrum_data()
+        keys, peaks = list(), list()
+        empty = np.zeros(0)
+        for key, data in spectrum_data:
+            keys.append(key)
+            peaks.append((data['mz'], data['intensity']) if data['mz'] is not None else (empty, empty))
+        mz, intensity, offsets = concatenate_peaks(peaks)
+        if mz_range is None:
+            mz_range = (float(mz.min()), float(mz.max())) if len(mz) else (0.0, 0.0)
+        matrix = bin_peaks(mz, intensity, offsets, bin_width, mz_range, normalize)
+        logger.info(f'Binned {len(keys)} spectra into {matrix.shape[1]} bins of width {bin_width}.')
+        return SpectrumMatrix(matrix, keys, bin_width, mz_range[0])
+
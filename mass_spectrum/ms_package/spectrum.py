@@ -0,0 +1,67 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class Spectrum:
+    """Lightweight handle on a single spectrum of a Reader that decodes its m/z and intensity arrays only when they
+    are first accessed and keeps them afterwards.
+
+    A spectrum either references its byte offset in the input file, or the encoded binary values and compression
+    already extracted by the Reader.
+    """
+    __slots__ = ('reader', 'key', 'offset', 'payload', '_data')
+
+    def __init__(self, reader, key: int, offset: Optional[int] = None, payload: Optional[Tuple[Dict, Dict]] = None):
+        """
+        parameters:
+            reader = Reader of the input file
+            key = spectrum id ('index' for mzML, 'num' for mzXML)
+            offset = byte offset of the spectrum in the input file
+            payload = entries of Reader.binary_values and Reader.compression of the spectrum
+        """
+        self.reader = reader
+        self.key = key
+        self.offset = offset
+        self.payload = payload
+        self._data = None
+
+    def __repr__(self) -> str:
+        state = 'decoded' if self._data is not None else 'encoded'
+        return f'Spectrum(key={self.key}, {state})'
+
+    @property
+    def decoded(self) -> bool:
+        """True once the binary arrays of the spectrum have been decoded."""
+        return self._data is not None
+
+    def decode(self) -> Dict[str, Optional[np.ndarray]]:
+        """Decodes the m/z and intensity arrays on first call and returns the cached result afterwards.
+
+        Returns
+        -------
+        spectrum_data: Dict[str, Optional[np.ndarray]]
+            dictionary with the decoded 'mz' and 'intensity' values, None for empty spectra
+        """
+        if self._data is None:
+            if self.payload is not None:
+                self._data = self.reader.decode_values(self.reader.format, *self.payload)
+            else:
+                with self.reader.open_file() as file:
+                    element = self.reader.read_element(file, self.offset, namespaces=self.reader.get_namespaces())
+                self._data = self.reader.decode_element(element)
+        return self._data
+
+    @property
+    def mz(self) -> Optional[np.ndarray]:
+        """Decoded m/z values of the spectrum."""
+        return self.decode()['mz']
+
+    @property
+    def intensity(self) -> Optional[np.ndarray]:
+        """Decoded intensity values of the spectrum."""
+        return self.decode()['intensity']
@@ -0,0 +1,110 @@
+import os
+import sys
+import logging
+import tempfile
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class SpillStore(MutableMapping):
+    """Dictionary of decoded spectra that keeps at most max_memory bytes of arrays in RAM.
+
+    Spectra added while the budget is used up are appended to a temporary file instead and are returned as
+    read-only memory-mapped views of it, so callers use the store like the plain spectrum_data dictionary.
+    """
+
+    def __init__(self, max_memory: int, spill_dir: Optional[str] = None):
+        """
+        parameters:
+            max_memory = maximum number of bytes of decoded arrays held in RAM
+            spill_dir = directory of the temporary spill file, the system temporary directory if None
+        """
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self.memory = 0  # bytes of arrays held in RAM
+        self.spilled = 0  # bytes of arrays written to the spill file
+        self.entries = dict()  # spectrum id to in-memory arrays or spill file locations
+        self.file = None  # temporary spill file, created on first spill
+        self.mapped = None  # memory map of the spill file, remapped after it grew
+
+    def __repr__(self) -> str:
+        return (f'SpillStore({len(self)} spectra, {self.memory / 1e6:.1f} MB in memory, '
+                f'{self.spilled / 1e6:.1f} MB spilled)')
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.entries)
+
+    def __setitem__(self, key, data: Dict[str, Optional[np.ndarray]]):
+        if key in self.entries:
+            del self[key]
+        size = sum(array.nbytes for array in data.values() if array is not None)
+        if self.memory + size <= self.max_memory:
+            self.entries[key] = (True, data)
+            self.memory += size
+        else:
+            self.entries[key] = (False, {name: self.spill(array) for name, array in data.items()})
+
+    def __getitem__(self, key) -> Dict[str, Optional[np.ndarray]]:
+        in_memory, data = self.entries[key]
+        if in_memory:
+            return data
+        return {name: self.view(location) for name, location in data.items()}
+
+    def __delitem__(self, key):
+        in_memory, data = self.entries.pop(key)
+        if in_memory:
+            self.memory -= sum(array.nbytes for array in data.values() if array is not None)
+
+    def spill(self, array: Optional[np.ndarray]) -> Optional[tuple]:
+        """Appends an array to the spill file and returns its offset, dtype and length."""
+        if array is None:
+            return None
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix='spectra-', suffix='.spill', dir=self.spill_dir)
+            logger.info(f'Decoded spectra exceed {self.max_memory} bytes, spilling to a memory-mapped file.')
+        offset = self.file.seek(0, os.SEEK_END)
+        offset += self.file.write(b'\0' * (-offset % 8))  # keeps every array 8-byte aligned
+        self.file.write(np.ascontiguousarray(array).tobytes())
+        self.spilled += array.nbytes
+        return offset, array.dtype.str, len(array)
+
+    def view(self, location: Optional[tuple]) -> Optional[np.ndarray]:
+        """Returns a read-only view of a spilled array on the memory map of the spill file."""
+        if location is None:
+            return None
+        offset, dtype, length = location
+        end = offset + np.dtype(dtype).itemsize * length
+        if end == offset:
+            return np.zeros(0, dtype=dtype)
+        if self.mapped is None or len(self.mapped) < end:
+            self.file.flush()
+            self.mapped = np.memmap(self.file, dtype=np.uint8, mode='r')
+        return self.mapped[offset:end].view(dtype)
+
+    def close(self):
+        """Releases the memory map and deletes the spill file."""
+        self.mapped = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of the process and its finished worker processes in bytes, None on
+    platforms without the resource module."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
@@ -0,0 +1,100 @@
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# position of the spectrum values in a summary row, by PSI-MS accession, userParam name and mzXML scan attribute
+SUMMARY_ACCESSIONS = {'MS:1000504': 0, 'MS:1000505': 1, 'MS:1000285': 2, 'MS:1000528': 3, 'MS:1000527': 4}
+SUMMARY_NAMES = {'base peak m/z': 0, 'base peak intensity': 1, 'total ion current': 2, 'lowest observed m/z': 3,
+                 'highest observed m/z': 4}
+MZXML_SUMMARY_ATTRIBUTES = ['basePeakMz', 'basePeakIntensity', 'totIonCurrent', 'lowMz', 'highMz']
+
+
+def concatenate_peaks(peaks: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenates the m/z and intensity arrays of several spectra into one peak buffer with segment offsets.
+
+    Parameters
+    ----------
+    peaks: List[Tuple[np.ndarray, np.ndarray]]
+        m/z and intensity array of each spectrum
+
+    Returns
+    -------
+    buffer: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        concatenated float64 m/z and intensity values and the int64 offsets of the spectra, of length n + 1
+    """
+    lengths = np.fromiter((len(mz) for mz, _ in peaks), dtype=np.int64, count=len(peaks))
+    offsets = np.zeros(len(peaks) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if not peaks:
+        return np.zeros(0), np.zeros(0), offsets
+    mz = np.concatenate([mz for mz, _ in peaks]).astype(np.float64, copy=False)
+    intensity = np.concatenate([intensity for _, intensity in peaks]).astype(np.float64, copy=False)
+    return mz, intensity, offsets
+
+
+def compute_summary(mz: np.ndarray, intensity: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Computes base peak m/z, base peak intensity, total ion current, lowest and highest observed m/z of every
+    spectrum of a concatenated peak buffer with segment reductions, without a Python loop over spectra.
+
+    Parameters
+    ----------
+    mz: np.ndarray
+        concatenated m/z values
+    intensity: np.ndarray
+        concatenated intensity values
+    offsets: np.ndarray
+        start of every spectrum in the buffer followed by the total number of peaks
+
+    Returns
+    -------
+    summary: np.ndarray
+        array of shape (n, 5), rows of empty spectra are NaN
+    """
+    n = len(offsets) - 1
+    summary = np.full((n, 5), np.nan)
+    lengths = np.diff(offsets)
+    rows = np.flatnonzero(lengths > 0)
+    if len(rows) == 0:
+        return summary
+    starts = offsets[:-1][rows]
+    base_peak_intensity = np.maximum.reduceat(intensity, starts)
+    segment = np.repeat(np.arange(len(rows)), lengths[rows])
+    maxima = np.flatnonzero(intensity == base_peak_intensity[segment])
+    first = maxima[np.r_[True, segment[maxima][1:] != segment[maxima][:-1]]]  # first base peak of each segment
+    summary[rows, 0] = mz[first]
+    summary[rows, 1] = base_peak_intensity
+    summary[rows, 2] = np.add.reduceat(intensity, starts)
+    summary[rows, 3] = np.minimum.reduceat(mz, starts)
+    summary[rows, 4] = np.maximum.reduceat(mz, starts)
+    return summary
+
+
+def fill_summary(declared: np.ndarray, peaks: List[Optional[Tuple[np.ndarray, np.ndarray]]]) -> np.ndarray:
+    """Fills the spectrum values that are missing from the file with values computed from the decoded peaks.
+
+    Parameters
+    ----------
+    declared: np.ndarray
+        array of shape (n, 5) of the values found in the file, NaN where missing
+    peaks: List[Optional[Tuple[np.ndarray, np.ndarray]]]
+        m/z and intensity arrays of every spectrum with missing values, None for the other spectra
+
+    Returns
+    -------
+    summary: np.ndarray
+        array of shape (n, 5) with the declared values and the computed values in place of missing ones
+    """
+    rows = [row for row, spectrum in enumerate(peaks) if spectrum is not None]
+    if not rows:
+        return declared
+    computed = compute_summary(*concatenate_peaks([peaks[row] for row in rows]))
+    missing = np.isnan(declared[rows])
+    block = declared[rows]
+    block[missing] = computed[missing]
+    declared[rows] = block
+    logger.info(f'Computed missing spectrum values of {len(rows)} spectra from their peaks.')
+    return declared
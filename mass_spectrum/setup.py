@@ -10,7 +10,9 @@ requirements = ["pyopenms",
                 "click",
                 "werkzeug",
                 "pandas",
-                "numpy"
+                "numpy",
+                "scipy",
+                "pyarrow"
                 ]
 
 
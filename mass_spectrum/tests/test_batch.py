@@ -0,0 +1,42 @@
+"""Batch module tests."""
+
+import argparse
+
+import pandas as pd
+import pytest
+
+from ms_package.batch import BatchReader
+from ms_package.reader import Reader
+from .constants import TEST_DATA_DIR, TEST_MZML_FILE, TEST_MZXML_FILE
+
+test1 = BatchReader(str(TEST_DATA_DIR), workers=2, stream=True)
+
+
+class TestBatchReader:
+    """A test class which conducts pytests on the BatchReader class."""
+
+    def test_get_paths(self):
+        """Tests whether only mzML and mzXML files of the directory are collected and that an error is raised
+        when nothing matches."""
+        assert test1.get_paths() == sorted([str(TEST_MZML_FILE), str(TEST_MZXML_FILE)])
+        assert BatchReader(str(TEST_DATA_DIR.joinpath('*.mzML'))).get_paths() == [str(TEST_MZML_FILE)]
+        with pytest.raises(argparse.ArgumentTypeError):
+            BatchReader(str(TEST_DATA_DIR.joinpath('*.fasta'))).get_paths()
+
+    def test_analyse(self):
+        """Tests whether the combined table holds the spectrum values of every file under its file name."""
+        combined = test1.analyse()
+        assert list(combined.columns)[:2] == ['file', 'spectra_id']
+        assert test1.failed == dict()
+        single = combined[combined['file'] == TEST_MZML_FILE.name].drop(columns='file').reset_index(drop=True)
+        expected = Reader(str(TEST_MZML_FILE)).stream_spectrum().reset_index(drop=True)
+        pd.testing.assert_frame_equal(single, expected)
+
+    def test_write(self, tmp_path):
+        """Tests whether one CSV file per input file is written when split is True."""
+        if test1.summaries is None:
+            test1.analyse()
+        written = test1.write(str(tmp_path), split=True)
+        assert sorted(path.rsplit('/', 1)[1] for path in written) == [TEST_MZXML_FILE.name + '.csv',
+                                                                      TEST_MZML_FILE.name + '.csv']
+        assert len(pd.read_csv(written[0])) == len(test1.summaries[test1.paths[0]])
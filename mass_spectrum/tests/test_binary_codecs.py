@@ -0,0 +1,49 @@
+"""Binary codecs module tests."""
+
+import base64
+import zlib
+
+import numpy as np
+
+from ms_package.binary_codecs import classify_param, combine_compressions, decode, get_dtype
+
+# m/z [100.0, 200.5, 301.25, 402.125] and intensity [5.0, 120.0, 3000.0, 1.0] encoded by OpenMS
+LINEAR_MZ = base64.b64decode('QWRtziAAAAAkJNc/gf//fyub2CL81kE=')
+SLOF_INTENSITY = base64.b64decode('QL/4AAAAAABIOVGZ9/8pFg==')
+PIC_INTENSITY = base64.b64decode('dWh1i7cQ')
+
+
+class TestBinaryCodecs:
+    """A test class which conducts pytests on the CV-accession codec registry."""
+
+    def test_classify_param(self):
+        """Tests whether cvParams are classified by accession first and by name otherwise."""
+        assert classify_param('MS:1000523', '') == ('data_type', '64-bit float')
+        assert classify_param('MS:1002312', '') == ('compression', 'MS-Numpress linear prediction compression')
+        assert classify_param('', 'intensity array') == ('array', 'intensity')
+        assert classify_param('MS:1000511', 'ms level') == (None, None)
+
+    def test_combine_compressions(self):
+        """Tests whether a numpress and a separate zlib cvParam are combined into the combined term."""
+        assert combine_compressions([]) == 'no compression'
+        assert combine_compressions(['zlib compression']) == 'zlib compression'
+        assert combine_compressions(['MS-Numpress positive integer compression', 'zlib compression']) == \
+            'MS-Numpress positive integer compression followed by zlib compression'
+
+    def test_decode_plain(self):
+        """Tests whether uncompressed and zlib compressed arrays are decoded in the precision of the data type."""
+        values = np.array([1.5, 2.5, 3.5], dtype='<f4')
+        assert decode(values.tobytes(), 'no compression', get_dtype('32-bit float')).tolist() == [1.5, 2.5, 3.5]
+        decoded = decode(zlib.compress(values.tobytes()), 'MS:1000574', get_dtype('MS:1000521'))
+        assert decoded.dtype == np.float32
+        assert decoded.tolist() == [1.5, 2.5, 3.5]
+
+    def test_decode_numpress(self):
+        """Tests whether MS-Numpress linear, slof and pic arrays are decoded, also followed by zlib."""
+        mz = decode(LINEAR_MZ, 'MS-Numpress linear prediction compression', np.dtype('<f8'))
+        assert np.allclose(mz, [100.0, 200.5, 301.25, 402.125], rtol=1e-9)
+        intensity = decode(SLOF_INTENSITY, 'MS:1002314', np.dtype('<f8'))
+        assert np.allclose(intensity, [5.0, 120.0, 3000.0, 1.0], rtol=1e-3)
+        assert decode(PIC_INTENSITY, 'MS:1002313', np.dtype('<f8')).tolist() == [5.0, 120.0, 3000.0, 1.0]
+        assert decode(zlib.compress(PIC_INTENSITY), 'MS:1002747', np.dtype('<f8')).tolist() == \
+            [5.0, 120.0, 3000.0, 1.0]
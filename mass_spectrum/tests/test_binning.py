@@ -0,0 +1,43 @@
+"""Binning module tests."""
+
+import numpy as np
+import pytest
+
+from ms_package.binning import SpectrumMatrix, bin_peaks
+from ms_package.summary import concatenate_peaks
+
+peaks = [(np.array([100.2, 100.7, 102.5]), np.array([1.0, 3.0, 4.0])),
+         (np.array([]), np.array([])),
+         (np.array([101.9, 99.0, 101.1]), np.array([2.0, 5.0, 6.0]))]
+buffer = concatenate_peaks(peaks)
+
+
+class TestBinning:
+    """A test class which conducts pytests on the sparse binned spectrum matrix."""
+
+    def test_bin_peaks(self):
+        """Tests whether peaks are summed per bin, unsorted spectra are handled and peaks outside the m/z range are
+        dropped."""
+        matrix = bin_peaks(*buffer, bin_width=1.0, mz_range=(100.0, 102.9))
+        assert matrix.shape == (3, 3)
+        assert matrix.toarray().tolist() == [[4.0, 0.0, 4.0], [0.0, 0.0, 0.0], [0.0, 8.0, 0.0]]
+        assert matrix.nnz == 3
+
+    def test_normalize(self):
+        """Tests whether every non-empty spectrum is scaled to a base peak, total or euclidean norm of 1."""
+        dense = bin_peaks(*buffer, bin_width=1.0, normalize='max').toarray()
+        assert dense.max(axis=1).tolist() == [1.0, 0.0, 1.0]
+        assert np.allclose(bin_peaks(*buffer, normalize='sum').toarray().sum(axis=1), [1.0, 0.0, 1.0])
+        assert np.allclose(np.linalg.norm(bin_peaks(*buffer, normalize='l2').toarray(), axis=1), [1.0, 0.0, 1.0])
+        with pytest.raises(ValueError):
+            bin_peaks(*buffer, normalize='median')
+
+    def test_save_load(self, tmp_path):
+        """Tests whether a saved matrix is loaded with the same values, spectrum ids and bins."""
+        matrix = SpectrumMatrix(bin_peaks(*buffer, bin_width=0.5), [4, 5, 6], 0.5, 99.0)
+        path = str(tmp_path.joinpath('matrix.npz'))
+        matrix.save(path)
+        loaded = SpectrumMatrix.load(path)
+        assert (loaded.matrix != matrix.matrix).nnz == 0
+        assert list(loaded.keys) == [4, 5, 6]
+        assert loaded.bin_mz[:2].tolist() == [99.0, 99.5]
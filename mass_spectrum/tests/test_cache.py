@@ -0,0 +1,94 @@
+"""Spectrum cache module tests."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ms_package.cache import SearchCache, SpectrumCache
+from ms_package.reader import Reader
+from .constants import TEST_FASTA_FILE, TEST_MZML_FILE
+
+
+class TestSpectrumCache:
+    """A test class which conducts pytests on the SpectrumCache class."""
+
+    def test_file_key(self, tmp_path):
+        """Tests whether the file key contains the content hash and size and is stable between calls."""
+        cache = SpectrumCache(tmp_path)
+        key = cache.file_key(str(TEST_MZML_FILE))
+        assert key.endswith(f'-{os.path.getsize(TEST_MZML_FILE)}')
+        assert cache.file_key(str(TEST_MZML_FILE)) == key
+
+    def test_store_load(self, tmp_path):
+        """Tests whether a cached run is loaded with the same spectrum values and peaks as a parsed run."""
+        parsed = Reader(str(TEST_MZML_FILE))
+        df_parsed = parsed.analyse_spectrum()
+        for _ in range(2):  # first run fills the cache, second run loads from it
+            cached = Reader(str(TEST_MZML_FILE), cache=True)
+            cached.cache = SpectrumCache(tmp_path)
+            df_cached = cached.analyse_spectrum()
+        pd.testing.assert_frame_equal(df_cached, df_parsed)
+        assert isinstance(cached.spectrum_data[0]['mz'], np.memmap)
+        assert np.array_equal(cached.spectrum_data[0]['mz'], parsed.spectrum_data[0]['mz'])
+        pd.testing.assert_frame_equal(cached.summary, parsed.summary)
+
+    def test_evict(self, tmp_path):
+        """Tests whether entries are evicted once the cache grows over its maximum size."""
+        cache = SpectrumCache(tmp_path)
+        reader = Reader(str(TEST_MZML_FILE))
+        reader.analyse_spectrum()
+        cache.store('entry', reader.format, reader.spectrum_data, reader.summary)
+        assert [name for name, _, _ in cache.entries()] == ['entry']
+        cache.max_size = 0
+        cache.evict()
+        assert cache.entries() == []
+
+    def test_concurrent_store(self, tmp_path):
+        """Tests whether concurrent stores of the same key and concurrent hashing leave a complete entry and a
+        valid hash file behind."""
+        cache = SpectrumCache(tmp_path)
+        reader = Reader(str(TEST_MZML_FILE))
+        reader.analyse_spectrum()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: cache.store('entry', reader.format, reader.spectrum_data, reader.summary),
+                              range(8)))
+            keys = set(executor.map(lambda _: cache.file_key(str(TEST_MZML_FILE)), range(8)))
+        assert len(keys) == 1
+        assert sorted(os.listdir(tmp_path)) == ['entry', 'hashes.json']
+        pd.testing.assert_frame_equal(cache.load('entry')[2], reader.summary)
+
+
+class TestSearchCache:
+    """A test class which conducts pytests on the SearchCache class."""
+
+    peptide_df = pd.DataFrame({'Hit_id': np.arange(2), 'Peptide ID m/z': [520.26, 722.33],
+                               'Peptide ID rt': [1203.4, 1510.02], 'Peptide hit sequence': ['DLGEEHFK', 'LVNELTEFAK'],
+                               'Peptide hit score': [0.52, 0.61]})
+    peptide_list = ['DLGEEHFK', 'LVNELTEFAK', 'YLYEIAR']
+
+    def test_search_key(self, tmp_path):
+        """Tests whether the search key is stable and changes with the search parameters."""
+        cache = SearchCache(tmp_path)
+        key = cache.search_key(str(TEST_FASTA_FILE), str(TEST_MZML_FILE), {'centroid': False})
+        assert cache.search_key(str(TEST_FASTA_FILE), str(TEST_MZML_FILE), {'centroid': False}) == key
+        assert cache.search_key(str(TEST_FASTA_FILE), str(TEST_MZML_FILE), {'centroid': True}) != key
+
+    def test_store_load(self, tmp_path):
+        """Tests whether cached search results are loaded with the same hit table and sequences."""
+        cache = SearchCache(tmp_path)
+        assert cache.load('search') is None
+        cache.store('search', self.peptide_df, self.peptide_list)
+        peptide_df, peptide_list = cache.load('search')
+        pd.testing.assert_frame_equal(peptide_df, self.peptide_df)
+        assert peptide_list == self.peptide_list
+
+    def test_evict(self, tmp_path):
+        """Tests whether the least recently used search is evicted once the cache grows over its maximum size."""
+        cache = SearchCache(tmp_path)
+        cache.store('first', self.peptide_df, self.peptide_list)
+        cache.max_size = cache.size()
+        os.utime(cache.entry_dir('first'), (0, 0))
+        cache.store('second', self.peptide_df, self.peptide_list)
+        assert [name for name, _, _ in cache.entries()] == ['second']
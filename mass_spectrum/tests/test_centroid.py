@@ -0,0 +1,33 @@
+"""Centroid module tests."""
+
+import numpy as np
+
+from ms_package.centroid import centroid_peaks
+from ms_package.summary import concatenate_peaks
+
+grid = np.arange(499.9, 500.1, 0.01)
+profile = 1000.0 * np.exp(-0.5 * ((grid - 500.003) / 0.02) ** 2)
+peaks = [(grid, profile),
+         (np.array([]), np.array([])),
+         (np.array([100.0, 100.1, 100.2, 100.3, 100.4]), np.array([9.0, 2.0, 5.0, 1.0, 4.0]))]
+
+
+class TestCentroid:
+    """A test class which conducts pytests on the vectorized centroiding."""
+
+    def test_centroid_peaks(self):
+        """Tests whether a Gaussian profile peak becomes one centroid at its interpolated apex, and whether local
+        maxima on the spectrum edges keep their raw point."""
+        mz, intensity, offsets = centroid_peaks(*concatenate_peaks(peaks))
+        assert list(offsets) == [0, 1, 1, 4]
+        assert abs(mz[0] - 500.003) < 0.001
+        assert profile.max() <= intensity[0] <= 1000.0 + 1e-6
+        assert mz[1] == 100.0 and intensity[1] == 9.0
+        assert mz[3] == 100.4 and intensity[3] == 4.0
+        assert 100.1 < mz[2] < 100.3
+
+    def test_min_intensity(self):
+        """Tests whether local maxima below min_intensity are dropped."""
+        mz, intensity, offsets = centroid_peaks(*concatenate_peaks(peaks), min_intensity=6.0)
+        assert list(offsets) == [0, 1, 1, 2]
+        assert list(intensity[1:]) == [9.0]
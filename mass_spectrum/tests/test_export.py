@@ -0,0 +1,60 @@
+"""Export module tests."""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+from ms_package.export import PeakWriter, write_table
+from ms_package.reader import Reader
+from .constants import TEST_MZML_FILE, TEST_MZXML_FILE
+
+
+class TestExport:
+    """A test class which conducts pytests on the columnar export."""
+
+    def test_write_table(self, tmp_path):
+        """Tests whether the spectrum values are written without index in the format given by the extension and
+        that unknown extensions raise an error."""
+        df_values = Reader(str(TEST_MZML_FILE)).stream_spectrum()
+        for name in ('values.parquet', 'values.feather', 'values.csv'):
+            path = str(tmp_path.joinpath(name))
+            write_table(df_values, path)
+            read = {'parquet': pd.read_parquet, 'feather': pd.read_feather, 'csv': pd.read_csv}[name.split('.')[1]]
+            pd.testing.assert_frame_equal(read(path), df_values.reset_index(drop=True), check_exact=False)
+        with pytest.raises(argparse.ArgumentTypeError):
+            write_table(df_values, str(tmp_path.joinpath('values.xlsx')))
+
+    def test_peak_writer(self, tmp_path):
+        """Tests whether the peaks are split into row groups of the given size and empty spectra are skipped."""
+        path = str(tmp_path.joinpath('peaks.parquet'))
+        with PeakWriter(path, row_group_size=4) as writer:
+            writer.write(0, np.arange(3.0), np.ones(3, dtype=np.float32))
+            writer.write(1, None, None)
+            writer.write(2, np.arange(7.0), np.ones(7))
+        table = pq.read_table(path)
+        assert pq.ParquetFile(path).num_row_groups == 3
+        assert table.column('spectra_id').to_pylist() == [0] * 3 + [2] * 7
+        assert table.column('m/z').to_pylist() == [0.0, 1.0, 2.0] + list(np.arange(7.0))
+        with pytest.raises(argparse.ArgumentTypeError):
+            PeakWriter(str(tmp_path.joinpath('peaks.csv')))
+
+    def test_export(self, tmp_path):
+        """Tests whether the exported peak table holds every decoded peak under the spectra_id of the spectrum
+        values."""
+        for path in (TEST_MZML_FILE, TEST_MZXML_FILE):
+            reader = Reader(str(path))
+            peaks_path = str(tmp_path.joinpath('peaks.feather'))
+            df_values = reader.export(str(tmp_path.joinpath('values.parquet')), peaks_output=peaks_path,
+                                      row_group_size=1000)
+            peaks = feather.read_table(peaks_path).to_pandas()
+            decoded = list(reader.iter_spectrum_data())
+            assert len(peaks) == sum(len(data['mz']) for _, data in decoded if data['mz'] is not None)
+            position = next(position for position, (_, data) in enumerate(decoded) if data['mz'] is not None)
+            spectrum = peaks[peaks['spectra_id'] == df_values['spectra_id'].iloc[position]]
+            assert np.array_equal(spectrum['intensity'], decoded[position][1]['intensity'])
+            pd.testing.assert_frame_equal(pd.read_parquet(str(tmp_path.joinpath('values.parquet'))),
+                                          df_values.reset_index(drop=True))
@@ -0,0 +1,67 @@
+"""Headers module tests."""
+
+import io
+
+import numpy as np
+
+from ms_package.headers import iter_header_segments, parse_duration, read_header
+
+MZML = (b'<mzML><run><spectrumList count="2">'
+        b'<spectrum index="0" id="scan=1" defaultArrayLength="3">'
+        b'<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="1"/>'
+        b'<cvParam cvRef="MS" accession="MS:1000128" name="profile spectrum" value=""/>'
+        b'<scanList count="1"><scan><cvParam cvRef="MS" accession="MS:1000016" name="scan start time" value="0.5" '
+        b'unitCvRef="UO" unitAccession="UO:0000031" unitName="minute"/></scan></scanList>'
+        b'<binaryDataArrayList count="1"><binaryDataArray encodedLength="8"><binary>AAAAAAA=</binary>'
+        b'</binaryDataArray></binaryDataArrayList></spectrum>'
+        b'<spectrum defaultArrayLength="0" index="1" id="scan=2">'
+        b'<cvParam value="2" name="ms level" accession="MS:1000511" cvRef="MS"/>'
+        b'<precursorList count="1"><precursor><selectedIonList count="1"><selectedIon>'
+        b'<cvParam cvRef="MS" accession="MS:1000744" name="selected ion m/z" value="445.12"/>'
+        b'<cvParam cvRef="MS" accession="MS:1000041" name="charge state" value="2"/>'
+        b'</selectedIon></selectedIonList></precursor></precursorList>'
+        b'<binaryDataArrayList count="1"><binaryDataArray encodedLength="0"><binary/></binaryDataArray>'
+        b'</binaryDataArrayList></spectrum></spectrumList>'
+        b'<chromatogramList count="1"><chromatogram index="0" id="TIC">'
+        b'<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="3"/></chromatogram></chromatogramList>'
+        b'</run></mzML>')
+MZXML = (b'<mzXML><msRun scanCount="2">'
+         b'<scan num="1" msLevel="1" peaksCount="2" centroided="1" retentionTime="PT1M3.5S">'
+         b'<peaks precision="32" byteOrder="network">AAAAAAAA</peaks>'
+         b'<scan num="2" msLevel="2" peaksCount="1" retentionTime="PT64S">'
+         b'<precursorMz precursorIntensity="10" precursorCharge="3"> 512.5 </precursorMz>'
+         b'<peaks precision="32" byteOrder="network">AAAA</peaks></scan></scan></msRun></mzXML>')
+
+
+class TestHeaders:
+    """A test class which conducts pytests on the header scan functions."""
+
+    def test_parse_duration(self):
+        """Tests whether xs:durations are converted to seconds and invalid values to NaN."""
+        assert parse_duration('PT1M3.5S') == 63.5
+        assert parse_duration('P1DT1H') == 90000
+        assert np.isnan(parse_duration(''))
+        assert np.isnan(parse_duration(None))
+
+    def test_iter_header_segments(self):
+        """Tests whether every spectrum header is found without its payload, whatever the chunk size, and that
+        chromatograms are not part of the last spectrum."""
+        for chunk_size in (1, 7, 1 << 20):
+            segments = list(iter_header_segments(io.BytesIO(MZML), 'mzml', chunk_size))
+            assert len(segments) == 2
+            assert b'AAAAAAA=' not in segments[0] and b'<binary></binary>' in segments[0]
+            assert b'chromatogram' not in segments[1]
+            scans = list(iter_header_segments(io.BytesIO(MZXML), 'mzxml', chunk_size))
+            assert [segment[:12] for segment in scans] == [b'<scan num="1', b'<scan num="2']
+
+    def test_read_header(self):
+        """Tests whether the metadata of mzML and mzXML spectra is read independent of the attribute order."""
+        first, second = iter_header_segments(io.BytesIO(MZML), 'mzml')
+        assert read_header(first, 'mzml')[:3] == (0, 30.0, 1)
+        assert np.isnan(read_header(first, 'mzml')[3])
+        assert read_header(first, 'mzml')[4:] == (0, 'profile', 3)
+        assert read_header(second, 'mzml')[2:] == (2, 445.12, 2, '', 0)
+        first, second = iter_header_segments(io.BytesIO(MZXML), 'mzxml')
+        assert read_header(first, 'mzxml')[:3] == (1, 63.5, 1)
+        assert read_header(first, 'mzxml')[4:] == (0, 'centroid', 2)
+        assert read_header(second, 'mzxml') == (2, 64.0, 2, 512.5, 3, '', 1)
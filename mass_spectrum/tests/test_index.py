@@ -0,0 +1,44 @@
+"""Index module tests."""
+
+import numpy as np
+
+from ms_package.index import SpectrumIndex
+from ms_package.summary import concatenate_peaks
+
+peaks = [(np.array([100.0, 200.0, 300.0]), np.array([5.0, 20.0, 20.0])),
+         (np.array([]), np.array([])),
+         (np.array([250.0, 150.0]), np.array([3.0, 7.0])),
+         (np.array([200.001, 400.0]), np.array([2.0, 9.0]))]
+test1 = SpectrumIndex([0, 1, 2, 3], np.array([30.0, 10.0, 20.0, np.nan]), np.array([1, 1, 2, 1]),
+                      *concatenate_peaks(peaks))
+
+
+class TestSpectrumIndex:
+    """A test class which conducts pytests on the retention time and m/z range index."""
+
+    def test_init(self):
+        """Tests whether spectra are sorted by retention time, unsorted peaks are sorted and m/z ranges are set."""
+        assert list(test1.keys) == [1, 2, 0, 3]
+        assert list(test1.mz[test1.starts[1]:test1.ends[1]]) == [150.0, 250.0]
+        assert list(test1.mz_min) == [np.inf, 150.0, 100.0, 200.001]
+        assert list(test1.mz_max) == [-np.inf, 250.0, 300.0, 400.0]
+
+    def test_select(self):
+        """Tests whether the retention time window and MS level select the expected spectra."""
+        assert list(test1.keys[test1.select((15.0, 30.0))]) == [2, 0]
+        assert list(test1.keys[test1.select(None, ms_level=1)]) == [1, 0, 3]
+
+    def test_extract_xic(self):
+        """Tests whether the intensities within the ppm window of each target are summed per spectrum."""
+        keys, retention_times, intensities = test1.extract_xic([200.0, 150.0], ppm=10, ms_level=None)
+        assert list(keys) == [1, 2, 0, 3]
+        assert intensities.tolist() == [[0.0, 0.0, 20.0, 2.0], [0.0, 7.0, 0.0, 0.0]]
+        keys, _, intensities = test1.extract_xic([200.0], ppm=1, rt_range=(0.0, 40.0))
+        assert list(keys) == [1, 0]
+        assert intensities.tolist() == [[0.0, 20.0]]
+
+    def test_extract_tic(self):
+        """Tests whether the total ion chromatogram sums all intensities of the selected spectra."""
+        keys, _, totals = test1.extract_tic(ms_level=None)
+        assert list(keys) == [1, 2, 0, 3]
+        assert totals.tolist() == [0.0, 10.0, 45.0, 11.0]
@@ -0,0 +1,79 @@
+"""Library search module tests."""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ms_package.library_search import LibrarySearch
+from .constants import TEST_FASTA_FILE, TEST_MZML_FILE
+
+MSP_LIBRARY = """Name: PEPTIDEK/2
+PrecursorMZ: 500.25
+Num peaks: 3
+200.1\t10.0\t"b2"
+300.2\t100.0
+400.3\t50.0
+
+Name: SAMPLER/1
+Comment: Parent=500.26 Mods=0
+Num peaks: 2
+150.0 5.0
+250.0 7.0
+
+Name: DECOY/3
+Charge: 2
+PrecursorMZ: 900.0
+Num peaks: 1
+500.0 1.0
+"""
+
+
+def write_library(tmp_path) -> str:
+    """Writes the MSP test library and returns its path."""
+    path = tmp_path.joinpath('library.msp')
+    path.write_text(MSP_LIBRARY)
+    return str(path)
+
+
+class TestLibrarySearch:
+    """A test class which conducts unit tests for LibrarySearch class."""
+
+    def test_read_msp(self, tmp_path):
+        """Checks whether names, precursors, charges and peaks of an MSP library are read."""
+        spectra = LibrarySearch.read_msp(write_library(tmp_path))
+        assert [spectrum['name'] for spectrum in spectra] == ['PEPTIDEK/2', 'SAMPLER/1', 'DECOY/3']
+        assert [spectrum['precursor_mz'] for spectrum in spectra] == [500.25, 500.26, 900.0]
+        assert [spectrum['charge'] for spectrum in spectra] == [2, 1, 2]
+        assert list(spectra[0]['intensity']) == [10.0, 100.0, 50.0]
+
+    def test_get_candidates(self, tmp_path):
+        """Checks whether candidates are found within the precursor tolerance and with a matching charge."""
+        search = LibrarySearch(write_library(tmp_path), str(TEST_MZML_FILE), precursor_tolerance=0.05,
+                               tolerance_unit='Da')
+        queries, candidates = search.get_candidates(np.array([500.24, 500.26, 700.0]), np.array([2, 0, 2]))
+        assert list(queries) == [0, 1, 1]
+        assert list(search.library['names'][candidates]) == ['PEPTIDEK/2', 'PEPTIDEK/2', 'SAMPLER/1']
+        with pytest.raises(argparse.ArgumentTypeError):
+            LibrarySearch(str(TEST_FASTA_FILE), str(TEST_MZML_FILE)).read_library()
+
+    def test_library_wrapper(self, tmp_path):
+        """Checks whether spectra of the input file are matched to themselves when they are in the library."""
+        queries = LibrarySearch.read_spectra(str(TEST_MZML_FILE))
+        queries = [query for query in queries if len(query['mz'])][:5]
+        path = tmp_path.joinpath('self.msp')
+        with open(path, 'w') as file:
+            for query in queries:
+                file.write(f"Name: SPECTRUM{query['key']}\nPrecursorMZ: {float(query['precursor_mz'])!r}\n"
+                           f"Num peaks: {len(query['mz'])}\n")
+                file.writelines(f'{float(mz)!r} {float(intensity)!r}\n'
+                                for mz, intensity in zip(query['mz'], query['intensity']))
+                file.write('\n')
+        library_df, peptide_list = LibrarySearch(str(path), str(TEST_MZML_FILE), min_score=0.99).library_wrapper()
+        assert isinstance(library_df, pd.DataFrame)
+        assert list(library_df.columns) == ['Hit_id', 'Spectrum ID', 'Peptide ID m/z', 'Peptide ID rt',
+                                            'Peptide hit sequence', 'Peptide hit score']
+        for query in queries:
+            assert f"SPECTRUM{query['key']}" in library_df[library_df['Spectrum ID'] == query['key']][
+                'Peptide hit sequence'].tolist()
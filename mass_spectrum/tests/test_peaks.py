@@ -0,0 +1,32 @@
+"""Peaks module tests."""
+
+import numpy as np
+
+from ms_package.peaks import PeakBuffer
+
+items = [(4, {'mz': np.array([1.0, 2.0], dtype='>f4'), 'intensity': np.array([5.0, 6.0], dtype='>f4')}),
+         (7, {'mz': None, 'intensity': None}),
+         (9, {'mz': np.array([3.0, 4.0, 5.0], dtype=np.float32), 'intensity': np.array([1.0, 2.0, 3.0])})]
+
+
+class TestPeakBuffer:
+    """A test class which conducts pytests on the contiguous peak storage."""
+
+    def test_from_items(self):
+        """Tests whether spectra are stored in contiguous native byte order buffers of the source precision and
+        returned as zero-copy views, growing the buffers past their initial capacity."""
+        buffer = PeakBuffer.from_items(items, capacity=1)
+        assert list(buffer) == [4, 7, 9]
+        assert list(buffer.offsets) == [0, 2, 2, 5]
+        assert buffer.mz.dtype == np.dtype('=f4')
+        assert buffer.intensity.dtype == np.float64
+        assert buffer[4]['mz'].tolist() == [1.0, 2.0]
+        assert buffer[7] == {'mz': None, 'intensity': None}
+        assert buffer[9]['intensity'].tolist() == [1.0, 2.0, 3.0]
+        assert np.shares_memory(buffer[9]['mz'], buffer.mz)
+
+    def test_nbytes(self):
+        """Tests whether the buffer holds 4 bytes per float32 and 8 bytes per float64 value plus the index."""
+        buffer = PeakBuffer.from_items(items)
+        assert buffer.mz.nbytes == 20
+        assert buffer.nbytes == 20 + 40 + 3 * 8 + 3 + 4 * 8
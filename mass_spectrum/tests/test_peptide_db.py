@@ -0,0 +1,76 @@
+"""Peptide database module tests."""
+
+import argparse
+
+import numpy as np
+import pyopenms
+import pytest
+
+from ms_package.peptide_db import PeptideDatabase, PeptideIndex, compute_masses, digest, get_cleavage, \
+    get_residue_masses, read_fasta
+from .constants import TEST_FASTA_FILE
+
+accession, sequence = next(read_fasta(str(TEST_FASTA_FILE)))
+index = PeptideIndex.build(str(TEST_FASTA_FILE), fixed_modifications=['Carbamidomethyl (C)'])
+
+
+class TestPeptideDatabase:
+    """A test class which conducts pytests on the peptide database module."""
+
+    def test_read_fasta(self):
+        """Tests whether the accession and the joined sequence of a protein are read."""
+        assert accession == 'sp|P02769|ALBU_BOVIN'
+        assert sequence.startswith('MKWVTFISLLLLFSSAYSRGVFRRDTHK') and '\n' not in sequence
+
+    def test_digest(self):
+        """Tests whether the in-silico digestion gives the peptides of the OpenMS digestion."""
+        for enzyme, missed_cleavages in (('Trypsin', 0), ('Trypsin', 2), ('Lys-C', 1)):
+            digestion = pyopenms.ProteaseDigestion()
+            digestion.setEnzyme(enzyme)
+            digestion.setMissedCleavages(missed_cleavages)
+            expected = list()
+            digestion.digest(pyopenms.AASequence.fromString(sequence), expected, 7, 40)
+            peptides = digest(sequence, get_cleavage(enzyme), missed_cleavages, 7, 40)
+            assert sorted(peptides) == sorted(str(peptide.toString()) for peptide in expected)
+        assert digest('PEPTIDE', get_cleavage('unspecific cleavage'), min_length=6, max_length=7) == \
+            ['PEPTID', 'PEPTIDE', 'EPTIDE']
+        with pytest.raises(argparse.ArgumentTypeError):
+            get_cleavage('Nonsense')
+
+    def test_compute_masses(self):
+        """Tests whether the bulk masses match the OpenMS masses, with fixed modifications and ambiguous residues."""
+        peptides = ['PEPTIDEK', 'CAMCK', 'PEPXIDE']
+        residues = np.frombuffer(''.join(peptides).encode(), dtype=np.uint8)
+        offsets = np.cumsum([0] + [len(peptide) for peptide in peptides])
+        masses = compute_masses(residues, offsets, get_residue_masses(['Carbamidomethyl (C)']))
+        assert masses[0] == pytest.approx(pyopenms.AASequence.fromString('PEPTIDEK').getMonoWeight(), abs=1e-4)
+        assert masses[1] == pytest.approx(pyopenms.AASequence.fromString(
+            'C(Carbamidomethyl)AMC(Carbamidomethyl)K').getMonoWeight(), abs=1e-4)
+        assert np.isnan(masses[2])
+
+    def test_get_candidates(self):
+        """Tests whether the candidates of a precursor mass are the peptides within the tolerance."""
+        assert np.all(np.diff(index.masses) >= 0)
+        position = len(index) // 2
+        mass = float(index.masses[position])
+        candidates = index.get_candidates(mass, 10.0)
+        assert position in candidates
+        assert np.all(np.abs(index.masses[candidates] - mass) <= mass * 1e-5)
+        outside = np.setdiff1d(np.arange(len(index)), candidates)
+        assert np.all(np.abs(index.masses[outside] - mass) > mass * 1e-5)
+        assert index.get_sequence(position) in digest(sequence, get_cleavage('Trypsin'))
+        assert len(index.get_candidates(mass + 0.5, 0.1, unit='Da')) == \
+            np.sum(np.abs(index.masses - mass - 0.5) <= 0.1)
+
+    def test_get_index(self, tmp_path):
+        """Tests whether an index is built once and memory-mapped with the same peptides afterwards."""
+        database = PeptideDatabase(tmp_path)
+        built = database.get_index(str(TEST_FASTA_FILE), fixed_modifications=['Carbamidomethyl (C)'])
+        loaded = database.get_index(str(TEST_FASTA_FILE), fixed_modifications=['Carbamidomethyl (C)'])
+        assert len(database.entries()) == 1
+        assert isinstance(loaded.masses, np.memmap)
+        assert np.array_equal(loaded.masses, index.masses) and np.array_equal(built.masses, index.masses)
+        assert loaded.get_sequences(range(3)) == index.get_sequences(range(3))
+        assert loaded.accessions == [accession]
+        database.get_index(str(TEST_FASTA_FILE), missed_cleavages=2)
+        assert len(database.entries()) == 2
@@ -2,7 +2,9 @@
 
 
 from .constants import TEST_FASTA_FILE, TEST_MZML_FILE
-from ms_package.peptide_prediction import PeptideSearch
+from ms_package.peptide_prediction import PEPTIDE_COLUMNS, PeptideSearch
+from ms_package.cache import SearchCache
+from pyopenms import MSExperiment, MzMLFile
 import pytest
 import pandas as pd
 
@@ -60,3 +62,72 @@ class TestPeptideSearch:
         assert row_0['Peptide ID rt'] == float(1738.03)
         assert row_0['Peptide hit sequence'] == str('DDSPDLPK')
         assert row_0['Peptide hit score'] == float(0.03)
+
+    def test_extract_hits(self):
+        """Checks whether all hits are extracted in one pass with rank, charge and proteins, and whether the peptide
+        list holds the sequences of the rows."""
+        peptide_ids = PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE),
+                                    parameters={'top_hits': 3}).peptide_search()[1]
+        peptide_df, peptide_list = PeptideSearch.extract_hits(peptide_ids)
+        assert list(peptide_df.columns) == PEPTIDE_COLUMNS
+        assert len(peptide_df) == sum(len(peptide_id.getHits()) for peptide_id in peptide_ids)
+        assert peptide_list == peptide_df['Peptide hit sequence'].tolist()
+        first = peptide_df.groupby('Peptide ID')['Peptide hit rank'].min()
+        assert (first == 1).all() and peptide_df['Peptide hit rank'].max() <= 3
+        assert (peptide_df['Peptide hit charge'] > 0).all()
+        assert peptide_df['Protein accessions'].str.contains('ALBU_BOVIN').all()
+        top = PeptideSearch.extract_hits(peptide_ids, top_n=1)[0]
+        assert len(top) == len(first) and (top['Peptide hit rank'] == 1).all()
+
+    def test_write_shards(self, tmp_path):
+        """Checks whether every MS2 spectrum ends up in exactly one shard, in precursor m/z ranges or round-robin."""
+        for shard_by in ('mz', 'round_robin'):
+            search = PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE), shards=3,
+                                   shard_by=shard_by)
+            directory = tmp_path.joinpath(shard_by)
+            directory.mkdir()
+            shard_paths, positions = search.write_shards(str(TEST_MZML_FILE), str(directory))
+            assert len(shard_paths) == 3
+            shards = list()
+            for shard_path in shard_paths:
+                experiment = MSExperiment()
+                MzMLFile().load(shard_path, experiment)
+                shards.append([str(spectrum.getNativeID()) for spectrum in experiment.getSpectra()])
+            assert sorted(native_id for shard in shards for native_id in shard) == sorted(positions)
+            assert all([positions[native_id] for native_id in shard] == sorted(positions[native_id]
+                                                                                for native_id in shard)
+                       for shard in shards)
+
+    def test_sharded_search(self):
+        """Checks whether the sharded parallel search gives the same peptide hits as the single search."""
+        single = test.peptide_wrapper()
+        for shard_by in ('mz', 'round_robin'):
+            sharded = PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE), workers=2,
+                                    shards=3, shard_by=shard_by).peptide_wrapper()
+            pd.testing.assert_frame_equal(sharded[0], single[0])
+            assert sharded[1] == single[1]
+        with pytest.raises(ValueError):
+            PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE), shard_by='charge')
+
+    def test_cached_search(self, tmp_path, monkeypatch):
+        """Checks whether a repeated search is loaded from the cache with the same peptide hits."""
+        search = PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE), cache=True)
+        search.cache = SearchCache(tmp_path)
+        searched = search.peptide_wrapper()
+        assert len(search.cache.entries()) == 1
+        monkeypatch.setattr(search, 'peptide_search', lambda: pytest.fail('the cached search was run again'))
+        cached = search.peptide_wrapper()
+        pd.testing.assert_frame_equal(cached[0], searched[0])
+        assert cached[1] == searched[1]
+
+    def test_prefilter(self):
+        """Checks whether the precursor mass prefilter drops spectra without changing the peptide hits."""
+        experiment = MSExperiment()
+        MzMLFile().load(str(TEST_MZML_FILE), experiment)
+        filtered = test.filter_spectra(experiment)
+        assert 0 < filtered.getNrSpectra() <= sum(spectrum.getMSLevel() == 2 for spectrum in experiment.getSpectra())
+        single = test.peptide_wrapper()
+        prefiltered = PeptideSearch(fasta_path=str(TEST_FASTA_FILE), mzml_path=str(TEST_MZML_FILE),
+                                    prefilter=True).peptide_wrapper()
+        pd.testing.assert_frame_equal(prefiltered[0], single[0])
+        assert prefiltered[1] == single[1]
@@ -0,0 +1,85 @@
+"""Search pipeline module tests."""
+
+import numpy as np
+import pandas as pd
+import pyopenms
+import pytest
+
+from ms_package.pipeline import SearchPipeline
+from ms_package.peptide_prediction import PeptideSearch
+from ms_package.reader import Reader
+from .constants import TEST_FASTA_FILE, TEST_MZML_FILE
+
+grid = np.arange(499.9, 500.1, 0.01)
+profile = 1000.0 * np.exp(-0.5 * ((grid - 500.003) / 0.02) ** 2)
+
+
+@pytest.fixture
+def run_path(tmp_path) -> str:
+    """Writes a run of a profile MS1 spectrum, a centroided MS2 spectrum and a TIC chromatogram with pyopenms."""
+    experiment = pyopenms.MSExperiment()
+    for position, (level, peaks, spectrum_type) in enumerate([
+            (1, (grid, profile), pyopenms.SpectrumSettings.SpectrumType.PROFILE),
+            (2, (np.array([100.0, 200.0, 300.0]), np.array([5.0, 20.0, 10.0])),
+             pyopenms.SpectrumSettings.SpectrumType.CENTROID)]):
+        spectrum = pyopenms.MSSpectrum()
+        spectrum.setMSLevel(level)
+        spectrum.setRT(10.0 * (position + 1))
+        spectrum.setNativeID(f'scan={position + 1}')
+        spectrum.set_peaks(peaks)
+        spectrum.setType(spectrum_type)
+        experiment.addSpectrum(spectrum)
+    chromatogram = pyopenms.MSChromatogram()
+    chromatogram.setNativeID('TIC')
+    chromatogram.setChromatogramType(pyopenms.ChromatogramSettings.ChromatogramType.TOTAL_ION_CURRENT_CHROMATOGRAM)
+    chromatogram.set_peaks((np.array([10.0, 20.0]), np.array([profile.sum(), 35.0])))
+    experiment.addChromatogram(chromatogram)
+    path = str(tmp_path.joinpath('run.mzML'))
+    pyopenms.MzMLFile().store(path, experiment)
+    return path
+
+
+class TestSearchPipeline:
+    """A test class which conducts pytests on the SearchPipeline class."""
+
+    def test_get_summary(self, run_path):
+        """Tests whether the spectrum values of the in-memory run match the values extracted by Reader."""
+        pipeline = SearchPipeline(str(TEST_FASTA_FILE), run_path)
+        pd.testing.assert_frame_equal(pipeline.get_summary(), Reader(run_path).analyse_spectrum())
+        assert pipeline.get_summary() is pipeline.summary
+        assert list(pipeline.get_spectrum_data()) == [0, 1]
+
+    def test_get_tic(self, run_path):
+        """Tests whether the stored total ion current chromatogram is returned."""
+        tic = SearchPipeline(str(TEST_FASTA_FILE), run_path).get_tic()
+        assert tic['retention_time'].tolist() == [10.0, 20.0]
+        assert tic['tic'].tolist() == pytest.approx([profile.sum(), 35.0], rel=1e-6)
+
+    def test_centroid_experiment(self, run_path):
+        """Tests whether profile spectra are centroided in memory like Reader.centroid_spectra, while the loaded run
+        and centroided spectra are left unchanged."""
+        pipeline = SearchPipeline(str(TEST_FASTA_FILE), run_path)
+        experiment = pipeline.load_experiment()
+        centroided = PeptideSearch.centroid_experiment(experiment)
+        expected = Reader(run_path).centroid_spectra()
+        for position, spectrum in enumerate(centroided.getSpectra()):
+            mz, intensity = spectrum.get_peaks()
+            assert np.allclose(mz, expected[position]['mz'])
+            assert np.allclose(intensity, expected[position]['intensity'], rtol=1e-6)
+            assert spectrum.getType() == pyopenms.SpectrumSettings.SpectrumType.CENTROID
+        assert len(experiment.getSpectrum(0).get_peaks()[0]) == len(grid)
+
+    def test_run(self):
+        """Tests whether the pipeline gives the spectrum values of Reader and the peptide hits of PeptideSearch."""
+        parameters = {'precursor_tolerance': 10.0, 'missed_cleavages': 1}
+        values, peptide_df, peptide_list = SearchPipeline(str(TEST_FASTA_FILE), str(TEST_MZML_FILE),
+                                                          parameters=parameters).run()
+        expected = PeptideSearch(str(TEST_FASTA_FILE), str(TEST_MZML_FILE), parameters=parameters).peptide_wrapper()
+        pd.testing.assert_frame_equal(peptide_df, expected[0])
+        assert peptide_list == expected[1]
+        assert len(values) == len(Reader(str(TEST_MZML_FILE)).analyse_spectrum())
+
+    def test_parameters(self):
+        """Tests whether unknown search parameters are rejected."""
+        with pytest.raises(ValueError):
+            SearchPipeline(str(TEST_FASTA_FILE), str(TEST_MZML_FILE), parameters={'tolerance': 10.0})
@@ -1,10 +1,14 @@
 """Reader module tests."""
 
 import pytest
+import numpy as np
 import pandas as pd
 from ms_package.reader import Reader
 import xml.dom.minidom
+import xml.etree.ElementTree as ET
 import argparse
+import gzip
+import shutil
 from .constants import TEST_FASTA_FILE, TEST_MZML_FILE, TEST_MZXML_FILE
 
 
@@ -68,7 +72,7 @@ class TestReader:
 
     def test_get_compression(self):
         """Tests whether the get_compression method extracts the compression from the input file correctly and creates
-        the compression dictionary correctly. Checks whether an error is raised if run on an mzXML file."""
+        the compression dictionary correctly for mzML and mzXML files."""
         file1 = test1.parse_file()
         list1 = test1.get_spectrum_list(file1)
         dict1 = test1.get_spectrum_dict(list1)
@@ -80,12 +84,15 @@ class TestReader:
         file2 = test2.parse_file()
         list2 = test2.get_spectrum_list(file2)
         dict2 = test2.get_spectrum_dict(list2)
-        with pytest.raises(argparse.ArgumentTypeError):
-            test2.get_compression(dict2)
+        test2.get_compression(dict2)
+        assert len(test2.compression) == 7161
+        assert list(test2.compression[1].keys()) == ['peaks']
+        assert test2.compression[1]['peaks']['data_type'] in ('32-bit float', '64-bit float')
+        assert test2.compression[1]['peaks']['byte_order'] == 'network'
 
     def test_get_binary_spectrum_values(self):
         """Tests whether the get_binary_spectrum_values method extracts the binary arrays from the input file and
-        sets the self.binary_values attribute correctly. Checks whether an error is raised if run on an mzXML file."""
+        sets the self.binary_values attribute correctly for mzML and mzXML files."""
         file1 = test1.parse_file()
         list1 = test1.get_spectrum_list(file1)
         dict1 = test1.get_spectrum_dict(list1)
@@ -96,8 +103,9 @@ class TestReader:
         file2 = test2.parse_file()
         list2 = test2.get_spectrum_list(file2)
         dict2 = test2.get_spectrum_dict(list2)
-        with pytest.raises(argparse.ArgumentTypeError):
-            test2.get_binary_spectrum_values(dict2)
+        test2.get_binary_spectrum_values(dict2)
+        assert len(test2.binary_values) == 7161
+        assert list(test2.binary_values[1].keys()) == ['peaks']
 
     def test_get_values(self):
         """Tests whether the base peak m/z, base peak intensity, total ion current and the lowest and highest observed
@@ -124,3 +132,231 @@ class TestReader:
         """Tests whether the wrapper method analyse_spectrum returns a pandas dataframe."""
         result1 = test1.analyse_spectrum()
         assert isinstance(result1, pd.DataFrame)
+
+    def test_iter_spectra(self):
+        """Tests whether the iter_spectra method streams all spectra as namespace-free
+        xml.etree.ElementTree.Element objects."""
+        spectra1 = [key for key, spectrum in test1.iter_spectra()]
+        assert len(spectra1) == 1684
+        assert spectra1[0] == 0
+        key, spectrum = next(test2.iter_spectra())
+        assert isinstance(spectrum, ET.Element)
+        assert spectrum.tag == 'scan'
+        assert len(list(test2.iter_spectra())) == 7161
+        with pytest.raises(argparse.ArgumentTypeError):
+            next(test3.iter_spectra())
+
+    def test_iter_spectrum_data(self):
+        """Tests whether the streamed m/z and intensity values match the values from decode_decompress."""
+        test1.analyse_spectrum()
+        streamed = dict(test1.iter_spectrum_data())
+        assert len(streamed) == 1684
+        assert np.array_equal(streamed[0]['mz'], test1.spectrum_data[0]['mz'])
+        assert np.array_equal(streamed[0]['intensity'], test1.spectrum_data[0]['intensity'])
+
+    def test_stream_spectrum(self):
+        """Tests whether the streaming stream_spectrum method returns the same dataframe as analyse_spectrum."""
+        pd.testing.assert_frame_equal(test1.stream_spectrum(), test1.analyse_spectrum())
+        pd.testing.assert_frame_equal(test2.stream_spectrum(), test2.analyse_spectrum())
+
+    def test_get_offsets(self):
+        """Tests whether the get_offsets method returns a byte offset for every spectrum in the input file."""
+        offsets1 = test1.get_offsets()
+        assert isinstance(offsets1, dict)
+        assert len(offsets1) == 1684
+        offsets2 = test2.get_offsets()
+        assert len(offsets2) == 7161
+        assert offsets2 == test2.scan_offsets()
+
+    def test_get_spectrum(self):
+        """Tests whether the get_spectrum method reads the requested spectrum by its byte offset."""
+        spectrum = test1.get_spectrum(5)
+        assert isinstance(spectrum, ET.Element)
+        assert spectrum.tag == 'spectrum'
+        assert spectrum.get('index') == '5'
+        assert round(test1.get_declared_values(test1.get_spectrum(0))[0], 2) == 391.28
+        assert test2.get_spectrum(1).get('num') == '1'
+        with pytest.raises(KeyError):
+            test1.get_spectrum(100000)
+
+    def test_get_spectrum_nested(self, tmp_path):
+        """Tests whether nested mzXML scans using the xsi prefix declared on the root element are read by their byte
+        offsets."""
+        import pyopenms
+        experiment = pyopenms.MSExperiment()
+        for position, (level, n_peaks) in enumerate([(1, 5), (2, 0), (2, 3)]):
+            spectrum = pyopenms.MSSpectrum()
+            spectrum.setMSLevel(level)
+            spectrum.setRT(10.0 * (position + 1))
+            if n_peaks:
+                spectrum.set_peaks((np.linspace(100.0, 500.0, n_peaks), np.arange(1.0, n_peaks + 1)))
+            experiment.addSpectrum(spectrum)
+        path = str(tmp_path.joinpath('nested.mzXML'))
+        pyopenms.MzXMLFile().store(path, experiment)
+        reader = Reader(path)
+        assert reader.get_namespaces()['xsi'] == 'http://www.w3.org/2001/XMLSchema-instance'
+        spectrum = reader.get_spectrum(1)
+        assert spectrum.get('num') == '1' and spectrum.find('scan').find('peaks').get(
+            '{http://www.w3.org/2001/XMLSchema-instance}nil') == 'true'
+        assert [element.get('num') for element in reader.get_spectra([1, 2, 3]).values()] == ['1', '2', '3']
+
+    def test_get_spectra(self):
+        """Tests whether the get_spectra method returns the requested spectra in the requested order."""
+        spectra = test1.get_spectra([10, 2, 7])
+        assert list(spectra.keys()) == [10, 2, 7]
+        assert [spectrum.get('index') for spectrum in spectra.values()] == ['10', '2', '7']
+
+    def test_decode_decompress(self):
+        """Tests whether decode_decompress stores the m/z and intensity values as NumPy arrays in the precision
+        of the input file."""
+        test1.analyse_spectrum()
+        assert isinstance(test1.spectrum_data[0]['mz'], np.ndarray)
+        assert test1.spectrum_data[0]['mz'].dtype == np.float64
+        assert len(test1.spectrum_data[0]['mz']) == len(test1.spectrum_data[0]['intensity'])
+        assert test1.spectrum_data[0]['mz'].max() == pytest.approx(2008.46, abs=0.01)
+
+    def test_decode_decompress_mzxml(self):
+        """Tests whether the interleaved mzXML peaks are decoded into separate m/z and intensity arrays."""
+        test2.analyse_spectrum()
+        assert len(test2.spectrum_data) == 7161
+        spectrum = test2.spectrum_data[1]
+        assert isinstance(spectrum['mz'], np.ndarray)
+        assert len(spectrum['mz']) == len(spectrum['intensity'])
+        assert spectrum['mz'].min() >= test2.summary.loc[1, 'lowest_observed_m/z'] - 0.01
+        assert spectrum['mz'].max() <= test2.summary.loc[1, 'highest_observed_m/z'] + 0.01
+
+    def test_decode_decompress_workers(self):
+        """Tests whether decoding in a process pool gives the same spectrum data, in the same order, as the serial
+        decoding."""
+        test1.analyse_spectrum()
+        parallel = Reader(str(TEST_MZML_FILE), workers=2)
+        parallel.analyse_spectrum()
+        assert list(parallel.spectrum_data.keys()) == list(test1.spectrum_data.keys())
+        assert np.array_equal(parallel.spectrum_data[0]['mz'], test1.spectrum_data[0]['mz'])
+        assert np.array_equal(parallel.spectrum_data[1683]['intensity'], test1.spectrum_data[1683]['intensity'])
+
+    def test_get_summary(self):
+        """Tests whether get_summary fills the dataframe columns directly and computes values that are missing from
+        the file from the decoded peaks."""
+        file1 = test1.parse_file()
+        dict1 = test1.get_spectrum_dict(test1.get_spectrum_list(file1))
+        summary = test1.get_summary(dict1)
+        assert isinstance(summary, pd.DataFrame)
+        assert list(summary.columns) == ['spectra_id', 'base_peak_m/z', 'base_peak_intensity', 'total_ion_current',
+                                         'lowest_observed_m/z', 'highest_observed_m/z']
+        assert list(summary['spectra_id']) == list(range(1684))
+        assert summary.loc[0, 'base_peak_m/z'] == 391.28
+        for param in dict1[0].getElementsByTagName('userParam'):
+            param.parentNode.removeChild(param)
+        test1.spectrum_data = None
+        computed = test1.get_summary({0: dict1[0]})
+        assert computed.loc[0, 'base_peak_m/z'] == pytest.approx(391.28, abs=0.01)
+        assert computed.loc[0, 'highest_observed_m/z'] == pytest.approx(2008.46, abs=0.01)
+
+    def test_gzip(self, tmp_path):
+        """Tests whether a gzip-compressed file is recognised, streamed and randomly accessed like the original."""
+        path = str(tmp_path.joinpath(TEST_MZML_FILE.name + '.gz'))
+        with open(TEST_MZML_FILE, 'rb') as source, gzip.open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        reader = Reader(path)
+        assert reader.check_extension() is True
+        assert reader.format == 'mzml'
+        assert reader.gzipped is True
+        pd.testing.assert_frame_equal(reader.stream_spectrum(), test1.stream_spectrum())
+        assert reader.get_spectrum(5).get('index') == '5'
+
+    def test_extract_xic(self):
+        """Tests whether ion chromatograms and the total ion chromatogram are extracted in retention time order."""
+        tic = test1.extract_xic([], ms_level=None)
+        assert list(tic.columns) == ['spectra_id', 'retention_time', 'tic']
+        assert len(tic) == 1684
+        assert tic['retention_time'].is_monotonic_increasing
+        xic = test2.extract_xic([445.12, 600.0], ppm=20, rt_range=(0.0, 600.0))
+        assert list(xic.columns) == ['spectra_id', 'retention_time', '445.1200', '600.0000']
+        assert (xic['retention_time'] <= 600.0).all()
+
+    def test_centroid_spectra(self):
+        """Tests whether centroid_spectra returns a centroided spectrum per spectrum id, never with more peaks."""
+        centroided = test1.centroid_spectra()
+        assert len(centroided) == 1684
+        spectrum = test1.decode_element(test1.get_spectrum(3))
+        if spectrum['mz'] is not None:
+            assert len(centroided[3]['mz']) <= len(spectrum['mz'])
+
+    def test_bin_spectra(self):
+        """Tests whether bin_spectra returns one row per spectrum and the binned total ion current per row."""
+        matrix = test2.bin_spectra(bin_width=1.0)
+        assert matrix.matrix.shape[0] == 7161
+        key = int(matrix.keys[0])
+        spectrum = test2.decode_element(test2.get_spectrum(key))
+        if spectrum['mz'] is not None:
+            assert np.isclose(matrix.matrix[0].sum(), spectrum['intensity'].sum(), rtol=1e-5)
+
+    def test_get_precursor(self):
+        """Tests whether precursor m/z and charge are read, and NaN is returned for spectra without precursor."""
+        precursors = [test1.get_precursor(test1.get_spectrum(index)) for index in range(20)]
+        assert any(np.isnan(precursor_mz) for precursor_mz, _ in precursors)
+        assert any(precursor_mz > 0 for precursor_mz, _ in precursors)
+
+    def test_max_memory(self):
+        """Tests whether spectra decoded over the memory budget are spilled and give the same spectrum values."""
+        reader = Reader(str(TEST_MZML_FILE), max_memory=0)
+        pd.testing.assert_frame_equal(reader.analyse_spectrum(), test1.analyse_spectrum())
+        assert reader.spectrum_data.memory == 0
+        assert reader.spectrum_data.spilled > 0
+        key = next(key for key in reader.spectrum_data if reader.spectrum_data[key]['mz'] is not None)
+        assert np.array_equal(reader.spectrum_data[key]['mz'], test1.spectrum_data[key]['mz'])
+
+    def test_compact(self):
+        """Tests whether compact storage keeps the precision of the file and gives the same spectrum values."""
+        reader = Reader(str(TEST_MZML_FILE), compact=True)
+        pd.testing.assert_frame_equal(reader.analyse_spectrum(), test1.analyse_spectrum())
+        key = next(key for key in reader.spectrum_data if reader.spectrum_data[key]['mz'] is not None)
+        assert reader.spectrum_data[key]['mz'].dtype == test1.spectrum_data[key]['mz'].dtype
+        assert np.array_equal(reader.spectrum_data[key]['intensity'], test1.spectrum_data[key]['intensity'])
+
+    def test_scan_headers(self):
+        """Tests whether the header scan gives the same metadata as the parsed spectra, for mzML and mzXML files."""
+        for reader in (Reader(str(TEST_MZML_FILE)), Reader(str(TEST_MZXML_FILE))):
+            headers = reader.scan_headers()
+            expected = [(key, *reader.get_scan_metadata(spectrum), *reader.get_precursor(spectrum))
+                        for key, spectrum in reader.iter_spectra()]
+            assert len(headers) == len(expected)
+            columns = ['spectra_id', 'retention_time', 'ms_level', 'precursor_m/z', 'precursor_charge']
+            pd.testing.assert_frame_equal(headers[columns], pd.DataFrame(expected, columns=columns),
+                                          check_dtype=False)
+            assert set(headers['spectrum_type']) <= {'profile', 'centroid', ''}
+
+    def test_chromatograms(self, tmp_path):
+        """Tests whether stored chromatograms are found by id through the index and the byte scan, decoded, and
+        used as total ion chromatogram."""
+        import pyopenms
+        experiment = pyopenms.MSExperiment()
+        chromatogram_type = pyopenms.ChromatogramSettings.ChromatogramType
+        for chromatogram_id, scale in (('TIC', 1.0), ('SRM SIC 445.1,300.2', 0.5)):
+            chromatogram = pyopenms.MSChromatogram()
+            chromatogram.setNativeID(chromatogram_id)
+            chromatogram.set_peaks((np.array([1.0, 2.0, 3.0]), np.array([10.0, 30.0, 20.0]) * scale))
+            if chromatogram_id == 'TIC':
+                chromatogram.setChromatogramType(chromatogram_type.TOTAL_ION_CURRENT_CHROMATOGRAM)
+            experiment.addChromatogram(chromatogram)
+        path = str(tmp_path.joinpath('chromatograms.mzML'))
+        pyopenms.MzMLFile().store(path, experiment)
+        reader = Reader(path)
+        offsets = reader.get_chromatogram_offsets()
+        assert list(offsets) == ['TIC', 'SRM SIC 445.1,300.2']
+        assert reader.scan_offsets(element='chromatogram') == offsets
+        srm = reader.get_chromatogram('SRM SIC 445.1,300.2')
+        assert srm['time'].tolist() == [1.0, 2.0, 3.0] and srm['intensity'].tolist() == [5.0, 15.0, 10.0]
+        assert reader.get_tic(rt_range=(1.5, 3.0))['tic'].tolist() == [30.0, 20.0]
+        assert len(reader.get_chromatogram_frame()) == 6
+        with pytest.raises(KeyError):
+            reader.get_chromatogram('BPC')
+
+    def test_get_tic(self):
+        """Tests whether files without stored chromatograms fall back to summing the spectra of all MS levels."""
+        tic = test2.get_tic()
+        expected = test2.extract_xic([], ms_level=None)
+        assert test2.get_chromatogram_offsets() == dict()
+        assert tic['tic'].tolist() == expected['tic'].tolist()
+
@@ -0,0 +1,77 @@
+"""Spectrum module tests."""
+
+import numpy as np
+
+from ms_package.reader import Reader
+from ms_package.spectrum import Spectrum
+from .constants import TEST_MZML_FILE, TEST_MZXML_FILE
+
+test1 = Reader(str(TEST_MZML_FILE))
+test2 = Reader(str(TEST_MZXML_FILE))
+
+
+class TestSpectrum:
+    """A test class which conducts pytests on the lazily decoded Spectrum objects."""
+
+    def test_get_lazy_spectra(self):
+        """Tests whether get_lazy_spectra returns one undecoded Spectrum per spectrum id without parsing the file."""
+        spectra = Reader(str(TEST_MZML_FILE)).get_lazy_spectra()
+        assert len(spectra) == 1684
+        assert isinstance(spectra[0], Spectrum)
+        assert spectra[0].key == 0
+        assert not any(spectrum.decoded for spectrum in spectra)
+        assert not hasattr(spectra[0], '__dict__')
+
+    def test_decode_on_access(self):
+        """Tests whether a Spectrum decodes the same values as decode_decompress on first access and keeps them."""
+        test1.analyse_spectrum()
+        spectrum = Reader(str(TEST_MZML_FILE)).get_lazy_spectra()[0]
+        mz = spectrum.mz
+        assert spectrum.decoded
+        assert np.array_equal(mz, test1.spectrum_data[0]['mz'])
+        assert np.array_equal(spectrum.intensity, test1.spectrum_data[0]['intensity'])
+        assert spectrum.mz is mz
+
+    def test_payload_spectra(self):
+        """Tests whether spectra created after extracting the binary values reference the encoded payload."""
+        reader = Reader(str(TEST_MZXML_FILE))
+        spectrum_dict = reader.get_spectrum_dict(reader.get_spectrum_list(reader.parse_file()))
+        reader.get_compression(spectrum_dict)
+        reader.get_binary_spectrum_values(spectrum_dict)
+        spectra = reader.get_lazy_spectra()
+        assert spectra[0].payload is not None
+        test2.analyse_spectrum()
+        assert np.array_equal(spectra[0].mz, test2.spectrum_data[spectra[0].key]['mz'])
+
+    def test_nested_scans(self, tmp_path):
+        """Tests whether lazy spectra of nested mzXML scans using the xsi prefix of the root element decode the
+        values of the parsed file."""
+        import pyopenms
+        experiment = pyopenms.MSExperiment()
+        for position, (level, n_peaks) in enumerate([(1, 5), (2, 0), (2, 3)]):
+            spectrum = pyopenms.MSSpectrum()
+            spectrum.setMSLevel(level)
+            spectrum.setRT(10.0 * (position + 1))
+            if n_peaks:
+                spectrum.set_peaks((np.linspace(100.0, 500.0, n_peaks), np.arange(1.0, n_peaks + 1)))
+            experiment.addSpectrum(spectrum)
+        path = str(tmp_path.joinpath('nested.mzXML'))
+        pyopenms.MzXMLFile().store(path, experiment)
+        parsed = Reader(path)
+        parsed.analyse_spectrum()
+        spectra = Reader(path).get_lazy_spectra()
+        assert [spectrum.key for spectrum in spectra] == [1, 2, 3]
+        for spectrum in spectra:
+            assert spectrum.offset is not None
+            for name in ('mz', 'intensity'):
+                expected = parsed.spectrum_data[spectrum.key][name]
+                assert (getattr(spectrum, name) is None) if expected is None else \
+                    np.array_equal(getattr(spectrum, name), expected)
+
+    def test_summary_only(self):
+        """Tests whether analyse_spectrum without decoding returns the values but decodes no spectrum."""
+        reader = Reader(str(TEST_MZML_FILE))
+        values = reader.analyse_spectrum(decode=False)
+        assert reader.spectrum_data is None
+        assert reader.binary_values is None
+        assert len(values) == 1684
@@ -0,0 +1,35 @@
+"""Spill module tests."""
+
+import numpy as np
+
+from ms_package.spill import SpillStore, peak_rss
+
+
+class TestSpillStore:
+    """A test class which conducts pytests on the memory-budgeted spectrum store."""
+
+    def test_spill(self):
+        """Tests whether spectra over the budget are spilled and read back unchanged as memory-mapped views."""
+        store = SpillStore(max_memory=100)
+        first = {'mz': np.arange(10, dtype=np.float64), 'intensity': np.ones(2, dtype=np.float32)}
+        second = {'mz': np.arange(5, dtype=np.float32), 'intensity': np.arange(5, dtype='>f8')}
+        store[3] = first
+        store[1] = second
+        store[2] = {'mz': None, 'intensity': None}
+        assert list(store) == [3, 1, 2]
+        assert store.memory == 88
+        assert store.spilled == 60
+        assert store[3] is first
+        assert isinstance(store[1]['mz'], np.memmap)
+        assert store[1]['mz'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert store[1]['intensity'].dtype == np.dtype('>f8')
+        assert store[1]['intensity'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert store[2] == {'mz': None, 'intensity': None}
+        del store[3]
+        assert store.memory == 0
+        assert len(store) == 2
+        store.close()
+
+    def test_peak_rss(self):
+        """Tests whether the peak resident set size is reported in bytes."""
+        assert peak_rss() > 1024 ** 2
@@ -0,0 +1,37 @@
+"""Summary module tests."""
+
+import numpy as np
+
+from ms_package.summary import concatenate_peaks, compute_summary, fill_summary
+
+peaks = [(np.array([100.0, 200.0, 300.0]), np.array([5.0, 20.0, 20.0])),
+         (np.array([], dtype=np.float32), np.array([], dtype=np.float32)),
+         (np.array([150.0, 250.0], dtype=np.float32), np.array([7.0, 3.0], dtype=np.float32))]
+
+
+class TestSummary:
+    """A test class which conducts pytests on the vectorized spectrum value computation."""
+
+    def test_concatenate_peaks(self):
+        """Tests whether the peaks are concatenated into one float64 buffer with segment offsets."""
+        mz, intensity, offsets = concatenate_peaks(peaks)
+        assert mz.dtype == np.float64
+        assert list(offsets) == [0, 3, 3, 5]
+        assert list(intensity) == [5.0, 20.0, 20.0, 7.0, 3.0]
+
+    def test_compute_summary(self):
+        """Tests whether base peak, total ion current and m/z range are computed per segment, taking the first of
+        equally intense base peaks and leaving empty spectra NaN."""
+        summary = compute_summary(*concatenate_peaks(peaks))
+        assert summary.shape == (3, 5)
+        assert list(summary[0]) == [200.0, 20.0, 45.0, 100.0, 300.0]
+        assert np.isnan(summary[1]).all()
+        assert list(summary[2]) == [150.0, 7.0, 10.0, 150.0, 250.0]
+
+    def test_fill_summary(self):
+        """Tests whether only the missing values are replaced by computed values."""
+        declared = np.array([[1.0, np.nan, 2.0, 3.0, 4.0], [np.nan] * 5, [np.nan] * 5])
+        filled = fill_summary(declared, [peaks[0], None, peaks[2]])
+        assert list(filled[0]) == [1.0, 20.0, 2.0, 3.0, 4.0]
+        assert np.isnan(filled[1]).all()
+        assert list(filled[2]) == [150.0, 7.0, 10.0, 150.0, 250.0]